@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga: app_secure.py (WSGI/gunicorn) vs app_secure_asgi.py (ASGI/hypercorn).
+
+Levanta cada servidor en 127.0.0.1 con una users.db y un directorio de datos
+temporales, genera carga con N clientes keep-alive durante D segundos por
+escenario y reporta requests/s y latencias p50/p99.
+
+Uso:
+    python3 scripts/bench_app_secure.py
+    python3 scripts/bench_app_secure.py --concurrency 128 --duration 15
+    python3 scripts/bench_app_secure.py --scenario ping --threads 16
+
+Requiere gunicorn (vulnerable_app/requirements.txt) y quart + hypercorn
+(vulnerable_app/requirements-asgi.txt).
+"""
+import argparse
+import http.client
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "vulnerable_app"
+
+SCENARIOS = {
+    "user": ("GET", "/user/alice"),
+    "file": ("GET", "/file?name=readme.txt"),
+    "ping": ("GET", "/ping?host=127.0.0.1"),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_data(tmp):
+    db = tmp / "users.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT)")
+    conn.executemany(
+        "INSERT INTO users (username, email) VALUES (?, ?)",
+        [(f"user{i}", f"user{i}@example.com") for i in range(1000)] + [("alice", "a@example.com")],
+    )
+    conn.commit()
+    conn.close()
+    data = tmp / "data"
+    data.mkdir()
+    (data / "readme.txt").write_text("Bunker DevSecOps\n" * 64)
+    return db, data
+
+
+def server_command(kind, port, threads):
+    if kind == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "-w", "1", "--threads", str(threads),
+            "-b", f"127.0.0.1:{port}", "--log-level", "warning", "app_secure:create_app()",
+        ]
+    return [
+        sys.executable, "-m", "hypercorn", "-w", "1", "-b", f"127.0.0.1:{port}",
+        "--log-level", "warning", "app_secure_asgi:create_app()",
+    ]
+
+
+def wait_ready(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/stats")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"El servidor en :{port} no respondio en {timeout}s")
+
+
+def run_load(port, method, path, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local = []
+        local_errors = 0
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request(method, path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    workers = [threading.Thread(target=client) for _ in range(concurrency)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "errors": errors[0],
+    }
+
+
+def bench_server(kind, scenarios, args, env):
+    port = free_port()
+    proc = subprocess.Popen(
+        server_command(kind, port, args.threads), cwd=APP_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        wait_ready(port)
+        results = {}
+        for name in scenarios:
+            method, path = SCENARIOS[name]
+            run_load(port, method, path, args.concurrency, min(1.0, args.duration))  # warm-up
+            results[name] = run_load(port, method, path, args.concurrency, args.duration)
+        return results
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, default=8, help="threads del worker gunicorn")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    args = parser.parse_args()
+    scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db, data = prepare_data(Path(tmp))
+        env = {
+            **os.environ,
+            "USERS_DB_PATH": str(db),
+            "BASE_DATA_DIR": str(data),
+            # Probe nativo contra loopback y sin cache: mide el camino completo
+            "PING_MODE": "tcp",
+            "PING_TCP_PORT": str(free_port()),
+            "PING_CACHE_TTL": "0",
+            "PING_MAX_PENDING": str(max(16, args.concurrency)),
+            # Mide la app, no el limitador (todos los clientes son 127.0.0.1)
+            "RATE_LIMIT_ENABLED": "false",
+        }
+        results = {kind: bench_server(kind, scenarios, args, env) for kind in ("wsgi", "asgi")}
+
+    print(f"\nconcurrency={args.concurrency} duration={args.duration}s gunicorn threads={args.threads}\n")
+    print(f"{'escenario':<10} {'servidor':<6} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    for name in scenarios:
+        for kind in ("wsgi", "asgi"):
+            r = results[kind][name]
+            print(
+                f"{name:<10} {kind:<6} {r['requests']:>9} {r['rps']:>9.0f} "
+                f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['errors']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark de status.json con logs y listas de vulnerabilidades grandes.
+
+Genera un status.json sintetico (10k entradas de activity_log y 10k
+vulnerabilidades por defecto) y mide, con json de la stdlib y con el
+modelo tipado de dashboard_model (orjson si esta instalado):
+  - parse:     bytes -> dict / Status validado
+  - update:    aplicar un evento stage + log (replay) sobre el estado cargado
+  - serialize: estado -> bytes, indentado y compacto
+  - tamano:    bytes en disco indentado vs compacto
+  - memoria:   activity_log como dicts vs LogEntry con __slots__
+
+Uso:
+    python3 scripts/bench_dashboard_status.py
+    python3 scripts/bench_dashboard_status.py --entries 50000 --vulns 20000 --runs 5
+"""
+import argparse
+import copy
+import json
+import statistics
+import time
+import tracemalloc
+
+import dashboard_model
+from update_dashboard_status import INITIAL_STATUS, make_event, replay
+
+SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+LEVELS = ("info", "success", "warning", "error")
+
+
+def synthetic_status(entries, vulns):
+    data = copy.deepcopy(INITIAL_STATUS)
+    data["pipeline"]["last_run"] = "2026-01-01T00:00:00Z"
+    data["activity_log"] = [
+        {
+            "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "event": f"stage_{i % 6}",
+            "message": f"Entrada de log numero {i} con algo de texto — ñ",
+            "level": LEVELS[i % 4],
+        }
+        for i in range(entries)
+    ]
+    data["vulnerabilities"] = [
+        {
+            "id": f"VULN-{i:05d}",
+            "severity": SEVERITIES[i % 4],
+            "tool": "bandit" if i % 2 else "semgrep",
+            "file": f"vulnerable_app/module_{i % 50}.py",
+            "line": i % 400 + 1,
+            "cwe": f"CWE-{79 + i % 20}",
+            "description": "Hallazgo sintetico para el benchmark",
+        }
+        for i in range(vulns)
+    ]
+    return data
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def fmt(values):
+    return f"{statistics.median(values):9.2f} ms  (min {min(values):.2f})"
+
+
+def allocated(fn):
+    tracemalloc.start()
+    obj = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parse/update/serialize de status.json")
+    parser.add_argument("--entries", type=int, default=10000, help="entradas de activity_log")
+    parser.add_argument("--vulns", type=int, default=10000, help="vulnerabilidades")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    raw = synthetic_status(args.entries, args.vulns)
+    indented = json.dumps(raw, ensure_ascii=False, indent=2).encode("utf-8")
+    compact = dashboard_model.dumps(raw, compact=True)
+    status = dashboard_model.loads(indented)
+    events = [make_event("stage", ["bandit-sast", "failed", "3"]),
+              make_event("log", ["info", "bench", "update"])]
+    backend = "orjson" if dashboard_model.orjson is not None else "json (stdlib)"
+
+    print(f"\n{args.entries} entradas de log, {args.vulns} vulnerabilidades, "
+          f"{args.runs} corridas (mediana) — dashboard_model usa {backend}\n")
+    rows = [
+        ("parse json.loads -> dict", lambda: json.loads(indented)),
+        ("parse model.loads (indent)", lambda: dashboard_model.loads(indented)),
+        ("parse model.loads (compact)", lambda: dashboard_model.loads(compact)),
+        ("update replay (stage + log)", lambda: replay(status, events)),
+        ("serialize json indent=2", lambda: json.dumps(raw, ensure_ascii=False, indent=2).encode("utf-8")),
+        ("serialize json compact", lambda: json.dumps(raw, ensure_ascii=False, separators=(",", ":"))),
+        ("serialize model.dumps indent", lambda: dashboard_model.dumps(status)),
+        ("serialize model.dumps compact", lambda: dashboard_model.dumps(status, compact=True)),
+    ]
+    for name, fn in rows:
+        print(f"{name:<32}{fmt(timed(fn, args.runs))}")
+
+    print(f"\n{'tamano indentado':<32}{len(indented) / 1024:9.1f} KiB")
+    print(f"{'tamano compacto':<32}{len(compact) / 1024:9.1f} KiB"
+          f"  ({100 - 100 * len(compact) // len(indented)}% menos)")
+
+    log = raw["activity_log"]
+    as_dicts = allocated(lambda: [dict(e) for e in log])
+    as_slots = allocated(lambda: [dashboard_model.LogEntry.from_dict(e) for e in log])
+    print(f"\n{'activity_log como dicts':<32}{as_dicts / 1024:9.1f} KiB")
+    print(f"{'activity_log como LogEntry':<32}{as_slots / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
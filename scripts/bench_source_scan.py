@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cache incremental de tests/source_scanner.py.
+
+Genera un arbol sintetico (10k archivos .py por defecto, copias de los .py
+del repo con una linea distinta cada uno) y mide el escaneo como lo hace
+el fixture source_findings, cada sesion con un ScanCache nuevo cargado
+del disco:
+  - frio:       sin cache, se escanean todos los archivos
+  - sin cambios: solo stat() por archivo
+  - touch 1%:   cambia el mtime pero no el contenido (se hashea)
+  - editado 1%: cambia el contenido (se reescanea)
+
+Uso:
+    python3 scripts/bench_source_scan.py
+    python3 scripts/bench_source_scan.py --files 20000 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "tests"))
+
+import source_scanner
+
+
+def make_tree(root, count):
+    sources = sorted(p for p in REPO_ROOT.rglob("*.py") if ".venv" not in p.parts)
+    contents = [p.read_text(errors="ignore") for p in sources]
+    files = []
+    for i in range(count):
+        path = root / f"pkg{i // 500}" / f"module_{i}.py"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f"# modulo sintetico {i}\n" + contents[i % len(contents)])
+        files.append(path)
+    return files
+
+
+def session(files, cache_path):
+    """Una sesion de pytest: carga el cache, escanea y guarda."""
+    source_scanner._memory = source_scanner.ScanCache()
+    start = time.perf_counter()
+    cache = source_scanner.ScanCache(cache_path)
+    source_scanner.scan_files(files, cache)
+    cache.save()
+    return (time.perf_counter() - start) * 1000, cache.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del cache incremental de source_scanner")
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        files = make_tree(root, args.files)
+        size = sum(f.stat().st_size for f in files)
+        cache_path = root / "cache" / "findings.json"
+        # mtime viejo: si no, todas las entradas caen en la ventana RACY_NS
+        past = time.time() - 60
+        for f in files:
+            os.utime(f, (past, past))
+        # 1% de los archivos (al menos uno), repartidos por todo el arbol
+        sample = files[::100][:max(1, len(files) // 100)]
+
+        def cold():
+            cache_path.unlink(missing_ok=True)
+
+        def touched():
+            for f in sample:
+                f.touch()
+
+        def edited():
+            for i, f in enumerate(sample):
+                with f.open("a") as out:
+                    out.write(f"# editado {time.perf_counter_ns()} {i}\n")
+
+        scenarios = [("frio (sin cache)", cold), ("sin cambios", None),
+                     ("touch 1%", touched), ("editado 1%", edited)]
+        print(f"\n{len(files)} archivos, {size / 2**20:.1f} MiB, {args.runs} corridas (mediana)\n")
+        print(f"{'escenario':<20}{'tiempo':>12}{'hits':>8}{'hash':>8}{'escaneo':>9}")
+        baseline = None
+        for name, prepare in scenarios:
+            timings = []
+            for _ in range(args.runs):
+                session(files, cache_path)   # deja el cache al dia
+                if prepare is not None:
+                    prepare()
+                elapsed, stats = session(files, cache_path)
+                timings.append(elapsed)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            print(f"{name:<20}{median:>9.0f} ms{stats['hits']:>8}{stats['rehashed']:>8}{stats['scanned']:>9}"
+                  f"   x{baseline / median:.1f}")
+        print(f"\ncache en disco: {cache_path.stat().st_size / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
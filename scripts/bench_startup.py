@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frio de app_secure.py.
+
+Cada medicion corre en un interprete nuevo (sin modulos ya importados):
+  - import:        import app_secure (incluye la app por defecto, app_secure:app)
+  - create_app:    create_app() con la configuracion del entorno
+  - first request: primer y segundo request por ruta (test client), para ver
+                   el costo de crear los recursos lazy en el primer uso
+  - gunicorn:      desde el spawn de `gunicorn "app_secure:create_app()"`
+                   hasta la primera respuesta 200 (time-to-first-response)
+
+Uso:
+    python3 scripts/bench_startup.py
+    python3 scripts/bench_startup.py --runs 20 --skip-gunicorn
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "vulnerable_app"
+
+ROUTES = {
+    "user": ("GET", "/user/alice", None),
+    "users_batch": ("POST", "/users/batch", {"usernames": ["alice", "bob"]}),
+    "ping": ("GET", "/ping?host=999.0.0.1", None),
+    "load": ("POST", "/load", {"a": 1}),
+    "file": ("GET", "/file?name=readme.txt", None),
+    "fetch": ("GET", "/fetch?url=file:///etc/passwd", None),
+}
+
+# Se ejecuta con `python -c` en un proceso limpio; imprime un JSON
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app_secure
+t1 = time.perf_counter()
+app = app_secure.create_app()
+t2 = time.perf_counter()
+client = app.test_client()
+routes = json.loads(sys.argv[1])
+first = {}
+for name, (method, path, body) in routes.items():
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        client.open(path, method=method, json=body)
+        timings.append((time.perf_counter() - start) * 1000)
+    first[name] = timings
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "routes": first,
+}))
+"""
+
+
+def prepare_data(tmp):
+    db = tmp / "users.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT)")
+    conn.executemany(
+        "INSERT INTO users (username, email) VALUES (?, ?)",
+        [("alice", "a@example.com"), ("bob", "b@example.com")],
+    )
+    conn.commit()
+    conn.close()
+    data = tmp / "data"
+    data.mkdir()
+    (data / "readme.txt").write_text("Bunker DevSecOps\n")
+    return db, data
+
+
+def run_probe(env):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(ROUTES)],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_response(env, timeout=30):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning", "app_secure:create_app()"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("GET", "/user/alice")
+                status = conn.getresponse().status
+                conn.close()
+                if status == 200:
+                    return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("gunicorn no respondio a tiempo")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def fmt(values):
+    return f"{statistics.median(values):8.1f} ms  (min {min(values):.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de app_secure.py")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--skip-gunicorn", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db, data = prepare_data(Path(tmp))
+        env = {**os.environ, "USERS_DB_PATH": str(db), "BASE_DATA_DIR": str(data)}
+
+        samples = [run_probe(env) for _ in range(args.runs)]
+        print(f"\n{args.runs} procesos nuevos (mediana)\n")
+        print(f"{'import app_secure':<28}{fmt([s['import_ms'] for s in samples])}")
+        print(f"{'create_app()':<28}{fmt([s['create_app_ms'] for s in samples])}")
+        print(f"\n{'ruta':<14}{'1er request':>14}{'2do request':>14}")
+        for name in ROUTES:
+            first = statistics.median(s["routes"][name][0] for s in samples)
+            second = statistics.median(s["routes"][name][1] for s in samples)
+            print(f"{name:<14}{first:>11.2f} ms{second:>11.2f} ms")
+
+        if not args.skip_gunicorn:
+            ttfr = [time_to_first_response(env) for _ in range(max(1, args.runs // 2))]
+            print(f"\n{'gunicorn -> primer 200':<28}{fmt(ttfr)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Historial de corridas del pipeline en SQLite para update_dashboard_status.py.
+
+Cada `pipeline complete|failed` agrega una corrida (runs) con una fila por
+stage (stage_runs: status, duracion, findings, si estuvo en el camino
+critico). Consultas:
+  - percentiles(): p50/p95 de duracion por stage en las ultimas N corridas
+  - finding_deltas(): findings por stage entre dos commits
+  - runs(): ultimas corridas en el formato de timing_report()
+
+Retencion: se guardan las ultimas `keep_runs` corridas con detalle; las
+mas viejas se resumen en `daily` (por dia y stage: corridas, suma, minimo
+y maximo de duracion, suma de findings; todo sumable, asi resumir de a una
+corrida da lo mismo que resumir el dia completo) y los dias de mas de
+`keep_days` se borran. auto_vacuum incremental devuelve el espacio libre.
+"""
+import json
+import sqlite3
+from datetime import UTC, datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished_at TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration_seconds REAL NOT NULL,
+    critical_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_sha, id);
+CREATE TABLE IF NOT EXISTS stage_runs (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration_seconds REAL,
+    findings INTEGER NOT NULL,
+    critical INTEGER NOT NULL,
+    PRIMARY KEY (run_id, stage)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stage_runs_stage ON stage_runs (stage, run_id);
+CREATE TABLE IF NOT EXISTS daily (
+    day TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    timed INTEGER NOT NULL,
+    duration_sum REAL NOT NULL,
+    duration_min REAL,
+    duration_max REAL,
+    findings_sum INTEGER NOT NULL,
+    PRIMARY KEY (day, stage)
+) WITHOUT ROWID;
+"""
+
+# Fila de `daily` para la duracion total de la corrida
+TOTAL = "(total)"
+
+
+def percentile(values, q):
+    """Percentil con interpolacion lineal (q entre 0 y 1); None sin valores."""
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    low = int(k)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (k - low)
+
+
+class RunStore:
+    """Corridas terminadas en un archivo SQLite (un escritor a la vez)."""
+
+    def __init__(self, path, keep_runs=200, keep_days=365, timeout=5.0):
+        self.path = str(path)
+        self.keep_runs = keep_runs
+        self.keep_days = keep_days
+        self.conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'runs'").fetchone():
+            # Solo tiene efecto antes de crear la primera tabla
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, status):
+        """Guarda la corrida de un Status con el pipeline terminado; retorna su id."""
+        pipeline = status.pipeline
+        critical = set(pipeline.critical_path)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            run_id = self.conn.execute(
+                "INSERT INTO runs (finished_at, commit_sha, branch, status, duration_seconds, critical_path) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (pipeline.last_run, pipeline.commit, pipeline.branch, pipeline.status,
+                 pipeline.duration_seconds, json.dumps(pipeline.critical_path)),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO stage_runs (run_id, stage, status, duration_seconds, findings, critical) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, name, s.status, s.duration_seconds if s.finished is not None else None,
+                     s.findings, name in critical)
+                    for name, s in pipeline.stages.items()
+                ],
+            )
+            self._downsample()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("PRAGMA incremental_vacuum")
+        return run_id
+
+    def _downsample(self):
+        """Resume en `daily` las corridas que exceden keep_runs y poda los dias viejos."""
+        cutoff = self.conn.execute(
+            "SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?", (self.keep_runs,)
+        ).fetchone()
+        if cutoff is not None:
+            # Los NULL no cuentan en SUM/MIN/MAX/COUNT(col): solo stages con tiempo
+            self.conn.execute(
+                "INSERT INTO daily AS d (day, stage, runs, timed, duration_sum, duration_min, duration_max, findings_sum) "
+                "SELECT substr(r.finished_at, 1, 10), s.stage, COUNT(*), COUNT(s.duration_seconds), "
+                "       COALESCE(SUM(s.duration_seconds), 0), MIN(s.duration_seconds), MAX(s.duration_seconds), "
+                "       SUM(s.findings) "
+                "FROM stage_runs s JOIN runs r ON r.id = s.run_id WHERE r.id <= ? "
+                "GROUP BY 1, 2 "
+                "UNION ALL "
+                "SELECT substr(finished_at, 1, 10), ?, COUNT(*), COUNT(*), SUM(duration_seconds), "
+                "       MIN(duration_seconds), MAX(duration_seconds), 0 "
+                "FROM runs WHERE id <= ? GROUP BY 1 "
+                "ON CONFLICT (day, stage) DO UPDATE SET "
+                "    runs = d.runs + excluded.runs, timed = d.timed + excluded.timed, "
+                "    duration_sum = d.duration_sum + excluded.duration_sum, "
+                "    duration_min = MIN(COALESCE(d.duration_min, excluded.duration_min), "
+                "                       COALESCE(excluded.duration_min, d.duration_min)), "
+                "    duration_max = MAX(COALESCE(d.duration_max, excluded.duration_max), "
+                "                       COALESCE(excluded.duration_max, d.duration_max)), "
+                "    findings_sum = d.findings_sum + excluded.findings_sum",
+                (cutoff[0], TOTAL, cutoff[0]),
+            )
+            self.conn.execute("DELETE FROM runs WHERE id <= ?", (cutoff[0],))
+        oldest = (datetime.now(UTC) - timedelta(days=self.keep_days)).strftime("%Y-%m-%d")
+        self.conn.execute("DELETE FROM daily WHERE day < ?", (oldest,))
+
+    # ── Consultas ──
+    def runs(self, last=None):
+        """Ultimas corridas con detalle, de la mas vieja a la mas nueva."""
+        rows = self.conn.execute(
+            "SELECT id, finished_at, commit_sha, branch, status, duration_seconds, critical_path "
+            "FROM runs ORDER BY id DESC LIMIT ?", (-1 if last is None else last,)
+        ).fetchall()[::-1]
+        if not rows:
+            return []
+        stages = {}
+        for run_id, stage, seconds in self.conn.execute(
+            "SELECT run_id, stage, duration_seconds FROM stage_runs "
+            "WHERE run_id >= ? AND duration_seconds IS NOT NULL ORDER BY run_id", (rows[0][0],)
+        ):
+            stages.setdefault(run_id, {})[stage] = seconds
+        return [
+            {"timestamp": finished_at, "commit": commit, "branch": branch, "status": status,
+             "duration_seconds": duration, "critical_path": json.loads(critical_path),
+             "stages": stages.get(run_id, {})}
+            for run_id, finished_at, commit, branch, status, duration, critical_path in rows
+        ]
+
+    def percentiles(self, last=20):
+        """{stage: {"runs", "p50", "p95"}} de la duracion en las ultimas `last` corridas.
+
+        Incluye TOTAL (duracion de la corrida). Los stages sin tiempo
+        registrado (sin `start`) no aparecen, y TOTAL solo cuenta las
+        corridas con duracion (> 0).
+        """
+        first = self.conn.execute(
+            "SELECT MIN(id) FROM (SELECT id FROM runs ORDER BY id DESC LIMIT ?)", (last,)
+        ).fetchone()[0]
+        if first is None:
+            return {}
+        durations = {}
+        for (seconds,) in self.conn.execute(
+            "SELECT duration_seconds FROM runs WHERE id >= ? AND duration_seconds > 0", (first,)
+        ):
+            durations.setdefault(TOTAL, []).append(seconds)
+        for stage, seconds in self.conn.execute(
+            "SELECT stage, duration_seconds FROM stage_runs "
+            "WHERE run_id >= ? AND duration_seconds IS NOT NULL", (first,)
+        ):
+            durations.setdefault(stage, []).append(seconds)
+        return {
+            stage: {"runs": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+            for stage, values in durations.items()
+        }
+
+    def commits(self):
+        """Commits con corridas, del mas nuevo al mas viejo."""
+        return [c for (c,) in self.conn.execute(
+            "SELECT commit_sha FROM runs GROUP BY commit_sha ORDER BY MAX(id) DESC")]
+
+    def finding_deltas(self, base=None, head=None):
+        """(base, head, {stage: (findings base, findings head, delta)}).
+
+        Compara la ultima corrida de cada commit; por defecto los dos
+        commits mas recientes. None si no hay corridas suficientes.
+        """
+        if head is None or base is None:
+            recent = self.commits()
+            head = head or (recent[0] if recent else None)
+            base = base or next((c for c in recent if c != head), None)
+        findings = {}
+        for side, commit in (("base", base), ("head", head)):
+            row = self.conn.execute(
+                "SELECT MAX(id) FROM runs WHERE commit_sha = ?", (commit,)
+            ).fetchone()
+            if row[0] is None:
+                return None
+            findings[side] = dict(self.conn.execute(
+                "SELECT stage, findings FROM stage_runs WHERE run_id = ?", (row[0],)))
+        stages = list(dict.fromkeys([*findings["base"], *findings["head"]]))
+        return base, head, {
+            stage: (findings["base"].get(stage, 0), findings["head"].get(stage, 0),
+                    findings["head"].get(stage, 0) - findings["base"].get(stage, 0))
+            for stage in stages
+        }
+
+    def daily(self, stage=TOTAL):
+        """[(dia, corridas, duracion media, maxima)] de las corridas resumidas."""
+        return [
+            (day, runs, total / timed if timed else None, maximum)
+            for day, runs, timed, total, maximum in self.conn.execute(
+                "SELECT day, runs, timed, duration_sum, duration_max FROM daily "
+                "WHERE stage = ? ORDER BY day", (stage,))
+        ]
@@ -0,0 +1,272 @@
+"""
+Modelo tipado de status.json para update_dashboard_status.py.
+
+Dataclasses con __slots__ (Stage, LogEntry, Node, Connection, Pipeline,
+Status): menos memoria por entrada que un dict y acceso por atributo.
+Status.from_dict valida el esquema y lanza SchemaError (un ValueError) con
+la ruta del campo invalido; to_dict arma el JSON con el mismo formato que
+leen dashboard.html y los clientes de /events.
+
+loads()/dumps() usan orjson si esta instalado (opcional) y si no la stdlib.
+dumps(compact=True) omite la indentacion: ~30% menos bytes en status.json.
+"""
+import json
+from dataclasses import dataclass, field
+
+try:
+    import orjson
+except ImportError:  # opcional: json de la stdlib
+    orjson = None
+
+STAGE_STATUSES = frozenset({"pending", "running", "passed", "warning", "failed", "skipped"})
+STAGE_DONE = frozenset({"passed", "warning", "failed", "skipped"})
+PIPELINE_STATUSES = frozenset({"running", "passed", "warning", "failed"})
+LEVELS = frozenset({"info", "success", "warning", "error"})
+
+
+class SchemaError(ValueError):
+    """status.json (o un evento) no cumple el esquema."""
+
+
+def _expect(value, kind, path):
+    if not isinstance(value, kind) or isinstance(value, bool) and kind is not bool:
+        name = kind.__name__ if isinstance(kind, type) else "/".join(k.__name__ for k in kind)
+        raise SchemaError(f"{path}: se esperaba {name}, llego {type(value).__name__}")
+    return value
+
+
+def _choice(value, choices, path):
+    if value not in choices:
+        raise SchemaError(f"{path}: {value!r} no es uno de {', '.join(sorted(choices))}")
+    return value
+
+
+def _get(d, key, path):
+    try:
+        return d[key]
+    except KeyError:
+        raise SchemaError(f"{path}.{key}: campo requerido") from None
+
+
+@dataclass(slots=True)
+class Stage:
+    """Un stage del pipeline.
+
+    started/finished son time.monotonic() del host (comun a todos los
+    procesos hasta el proximo reboot); solo aparecen en el JSON una vez
+    que el stage arranco / termino.
+    """
+
+    status: str = "pending"
+    duration_seconds: float = 0
+    findings: int = 0
+    started: float | None = None
+    finished: float | None = None
+
+    @classmethod
+    def from_dict(cls, d, path="stage"):
+        _expect(d, dict, path)
+        stage = cls(d.get("status", "pending"), d.get("duration_seconds", 0), d.get("findings", 0),
+                    d.get("started"), d.get("finished"))
+        stage.validate(path)
+        return stage
+
+    def validate(self, path="stage"):
+        _choice(self.status, STAGE_STATUSES, f"{path}.status")
+        _expect(self.duration_seconds, (int, float), f"{path}.duration_seconds")
+        if _expect(self.findings, int, f"{path}.findings") < 0:
+            raise SchemaError(f"{path}.findings: debe ser >= 0")
+        for name in ("started", "finished"):
+            if getattr(self, name) is not None:
+                _expect(getattr(self, name), (int, float), f"{path}.{name}")
+
+    def to_dict(self):
+        d = {"status": self.status, "duration_seconds": self.duration_seconds, "findings": self.findings}
+        if self.started is not None:
+            d["started"] = self.started
+        if self.finished is not None:
+            d["finished"] = self.finished
+        return d
+
+
+@dataclass(slots=True)
+class LogEntry:
+    timestamp: str
+    event: str
+    message: str
+    level: str
+
+    @classmethod
+    def from_dict(cls, d, path="activity_log[]"):
+        _expect(d, dict, path)
+        try:
+            entry = cls(d["timestamp"], d["event"], d["message"], d["level"])
+        except KeyError as e:
+            raise SchemaError(f"{path}.{e.args[0]}: campo requerido") from None
+        entry.validate(path)
+        return entry
+
+    def validate(self, path="activity_log[]"):
+        # Camino caliente al cargar logs largos: type() en vez de isinstance()
+        if not (type(self.timestamp) is type(self.event) is type(self.message) is str):
+            for name in ("timestamp", "event", "message"):
+                _expect(getattr(self, name), str, f"{path}.{name}")
+        _choice(self.level, LEVELS, f"{path}.level")
+
+    def to_dict(self):
+        return {"timestamp": self.timestamp, "event": self.event, "message": self.message, "level": self.level}
+
+
+@dataclass(slots=True)
+class Node:
+    id: str
+    label: str
+    type: str
+    ip: str
+    status: str
+    services: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, d, path="architecture.nodes[]"):
+        _expect(d, dict, path)
+        node = cls(*(_expect(_get(d, k, path), str, f"{path}.{k}")
+                     for k in ("id", "label", "type", "ip", "status")),
+                   list(_expect(d.get("services", []), list, f"{path}.services")))
+        return node
+
+    def to_dict(self):
+        return {"id": self.id, "label": self.label, "type": self.type, "ip": self.ip,
+                "status": self.status, "services": list(self.services)}
+
+
+@dataclass(slots=True)
+class Connection:
+    source: str      # "from" en el JSON
+    target: str      # "to" en el JSON
+    protocol: str
+    port: int
+
+    @classmethod
+    def from_dict(cls, d, path="architecture.connections[]"):
+        _expect(d, dict, path)
+        return cls(
+            _expect(_get(d, "from", path), str, f"{path}.from"),
+            _expect(_get(d, "to", path), str, f"{path}.to"),
+            _expect(_get(d, "protocol", path), str, f"{path}.protocol"),
+            _expect(_get(d, "port", path), int, f"{path}.port"),
+        )
+
+    def to_dict(self):
+        return {"from": self.source, "to": self.target, "protocol": self.protocol, "port": self.port}
+
+
+@dataclass(slots=True)
+class Pipeline:
+    status: str
+    last_run: str
+    commit: str
+    branch: str
+    duration_seconds: float
+    trigger: str
+    stages: dict = field(default_factory=dict)   # nombre -> Stage, en orden
+    critical_path: list = field(default_factory=list)   # nombres de stage, en orden
+
+    @classmethod
+    def from_dict(cls, d, path="pipeline"):
+        _expect(d, dict, path)
+        stages = _expect(_get(d, "stages", path), dict, f"{path}.stages")
+        pipeline = cls(
+            _choice(_get(d, "status", path), PIPELINE_STATUSES, f"{path}.status"),
+            _expect(d.get("last_run", ""), str, f"{path}.last_run"),
+            _expect(d.get("commit", ""), str, f"{path}.commit"),
+            _expect(d.get("branch", ""), str, f"{path}.branch"),
+            _expect(d.get("duration_seconds", 0), (int, float), f"{path}.duration_seconds"),
+            _expect(d.get("trigger", ""), str, f"{path}.trigger"),
+            {name: Stage.from_dict(s, f"{path}.stages.{name}") for name, s in stages.items()},
+            list(_expect(d.get("critical_path", []), list, f"{path}.critical_path")),
+        )
+        return pipeline
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "last_run": self.last_run,
+            "commit": self.commit,
+            "branch": self.branch,
+            "duration_seconds": self.duration_seconds,
+            "trigger": self.trigger,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+            "critical_path": list(self.critical_path),
+        }
+
+
+@dataclass(slots=True)
+class Status:
+    """Raiz de status.json.
+
+    vulnerabilities y scan_summary vienen de herramientas externas y se
+    guardan tal cual (solo se valida que sean lista de objetos / objeto).
+    `journal` es el marcador "_journal" del snapshot (inodo y offset del
+    journal ya aplicados); no se muestra en el dashboard.
+    """
+
+    pipeline: Pipeline
+    activity_log: list
+    vulnerabilities: list = field(default_factory=list)
+    scan_summary: dict = field(default_factory=dict)
+    nodes: list = field(default_factory=list)
+    connections: list = field(default_factory=list)
+    journal: dict | None = None
+
+    @classmethod
+    def from_dict(cls, d):
+        _expect(d, dict, "status")
+        log = _expect(_get(d, "activity_log", "status"), list, "activity_log")
+        vulnerabilities = _expect(d.get("vulnerabilities", []), list, "vulnerabilities")
+        for i, v in enumerate(vulnerabilities):
+            _expect(v, dict, f"vulnerabilities[{i}]")
+        architecture = _expect(d.get("architecture", {}), dict, "architecture")
+        journal = d.get("_journal")
+        return cls(
+            Pipeline.from_dict(_get(d, "pipeline", "status")),
+            [LogEntry.from_dict(e, f"activity_log[{i}]") for i, e in enumerate(log)],
+            vulnerabilities,
+            _expect(d.get("scan_summary", {}), dict, "scan_summary"),
+            [Node.from_dict(n, f"architecture.nodes[{i}]")
+             for i, n in enumerate(_expect(architecture.get("nodes", []), list, "architecture.nodes"))],
+            [Connection.from_dict(c, f"architecture.connections[{i}]")
+             for i, c in enumerate(_expect(architecture.get("connections", []), list,
+                                           "architecture.connections"))],
+            _expect(journal, dict, "_journal") if journal is not None else None,
+        )
+
+    def to_dict(self):
+        d = {
+            "pipeline": self.pipeline.to_dict(),
+            "vulnerabilities": self.vulnerabilities,
+            "scan_summary": self.scan_summary,
+            "architecture": {
+                "nodes": [n.to_dict() for n in self.nodes],
+                "connections": [c.to_dict() for c in self.connections],
+            },
+            "activity_log": [e.to_dict() for e in self.activity_log],
+        }
+        if self.journal is not None:
+            d["_journal"] = self.journal
+        return d
+
+
+def loads(raw):
+    """bytes/str de status.json -> Status validado (SchemaError si no cumple)."""
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return Status.from_dict(data)
+
+
+def dumps(status, compact=False):
+    """Status (o dict) -> bytes UTF-8; indentado a 2 espacios salvo compact=True."""
+    data = status.to_dict() if isinstance(status, Status) else status
+    if orjson is not None:
+        return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
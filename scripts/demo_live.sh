@@ -136,8 +136,21 @@ run_cmd() {
 }
 
 # ── Actualizar status.json (best-effort) ─────────────────────
+STATUS_SOCK="${DASHBOARD_SOCKET:-$STATUS_JSON.sock}"
+
 update_status() {
     local updater="$SCRIPT_DIR/update_dashboard_status.py"
+    # Con el daemon corriendo: curl por el socket Unix, sin arrancar Python
+    if [ -S "$STATUS_SOCK" ] && command -v curl &>/dev/null; then
+        local cmd="$1"; shift
+        local args=()
+        for arg in "$@"; do args+=(--data-urlencode "arg=$arg"); done
+        if curl -sf --max-time 5 --unix-socket "$STATUS_SOCK" -X POST \
+                ${args[@]+"${args[@]}"} "http://localhost/$cmd" > /dev/null 2>&1; then
+            return 0
+        fi
+        set -- "$cmd" "$@"
+    fi
     if [ -f "$updater" ]; then
         python3 "$updater" "$STATUS_JSON" "$@" 2>/dev/null || true
     fi
@@ -257,8 +270,19 @@ echo ""
 echo -e "  ${BOLD}Dashboard:${NC} ${CYAN}http://localhost:8080/dashboard.html${NC}"
 pkill -f "python3 -m http.server 8080" 2>/dev/null || true
 sleep 0.3
-(cd "$PROJECT_DIR/monitoring" && nohup python3 -m http.server 8080 > /dev/null 2>&1 &)
-echo -e "    ${GREEN}[OK]${NC} Servidor HTTP iniciado en puerto 8080"
+# Daemon de status.json: estado en memoria y dashboard en :8080 con push
+# por SSE (/events); el navegador aplica solo los cambios
+python3 "$SCRIPT_DIR/update_dashboard_status.py" "$STATUS_JSON" serve --http 127.0.0.1:8080 > /dev/null 2>&1 &
+STATUS_DAEMON_PID=$!
+trap 'kill "$STATUS_DAEMON_PID" 2>/dev/null' EXIT
+for _ in $(seq 50); do [ -S "$STATUS_SOCK" ] && break; sleep 0.05; done
+if kill -0 "$STATUS_DAEMON_PID" 2>/dev/null; then
+    echo -e "    ${GREEN}[OK]${NC} Dashboard en vivo (SSE) en puerto 8080"
+else
+    # Sin daemon: archivos estaticos y polling de status.json
+    (cd "$PROJECT_DIR/monitoring" && nohup python3 -m http.server 8080 > /dev/null 2>&1 &)
+    echo -e "    ${GREEN}[OK]${NC} Servidor HTTP iniciado en puerto 8080"
+fi
 
 update_status reset
 
@@ -333,6 +357,7 @@ stage_header "1-2" "SECRET SCANNING — Gitleaks" "🔑" "A07:2021 — Identific
 
 typing "  Escaneando el repositorio en busca de secrets hardcodeados..." 0.03
 countdown "Iniciando scan"
+update_status start "secret-scan"
 
 GITLEAKS_BIN=$(find_tool gitleaks 2>/dev/null || echo "")
 
@@ -401,6 +426,7 @@ stage_header "3" "SAST — Bandit (Python Security Linter)" "🐍" "A03:2021 —
 
 typing "  Ejecutando analisis estatico con Bandit..." 0.03
 countdown "Escaneando"
+update_status start "bandit-sast"
 
 BANDIT_BIN=$(find_tool bandit 2>/dev/null || echo "")
 
@@ -446,6 +472,7 @@ stage_header "4" "SAST — Semgrep (Multi-language Scanner)" "🔎" "A03:2021 
 
 typing "  Ejecutando Semgrep con reglas de la comunidad..." 0.03
 countdown "Descargando reglas"
+update_status start "semgrep-sast"
 
 SEMGREP_BIN=$(find_tool semgrep 2>/dev/null || echo "")
 
@@ -487,6 +514,7 @@ stage_header "5" "DEPENDENCY AUDIT — Safety + pip-audit" "📦" "A06:2021 —
 
 typing "  Verificando dependencias contra bases de datos de CVEs..." 0.03
 countdown "Consultando vulnerabilidades"
+update_status start "safety-deps"
 
 echo -e "  ${BOLD}Dependencias en vulnerable_app/requirements.txt:${NC}"
 while IFS= read -r line; do
@@ -724,6 +752,7 @@ echo ""
 echo -e "  ${BOLD}Comparando versiones:${NC}"
 echo -e "    ${RED}[-] vulnerable_app/app.py${NC}       (7 vulnerabilidades)"
 echo -e "    ${GREEN}[+] vulnerable_app/app_secure.py${NC}  (0 findings Medium+)"
+echo -e "        ${DIM}+ secure_resources.py / secure_validation.py (FIX 2, 3 y 5)${NC}"
 echo ""
 
 diff --color=always -u "$VULN_APP/app.py" "$VULN_APP/app_secure.py" 2>/dev/null | head -60 || true
@@ -732,6 +761,13 @@ echo ""
 echo -e "  ${DIM}(mostrando primeras 60 lineas del diff)${NC}"
 echo ""
 
+# Queries, probe y validacion de rutas los comparte app_secure_asgi.py:
+# viven en modulos propios y se muestran aparte
+echo -e "  ${BOLD}FIX 2, 3 y 5 (compartidos por la app WSGI y la ASGI):${NC}"
+grep --color=always -h -A12 "^# ── FIX [235]" \
+    "$VULN_APP/secure_resources.py" "$VULN_APP/secure_validation.py" 2>/dev/null | head -80 || true
+echo ""
+
 echo -e "  ${BOLD}Resumen de correcciones:${NC}"
 echo -e "    ${GREEN}[1]${NC} Secrets → ${CYAN}os.environ.get()${NC}"
 echo -e "    ${GREEN}[2]${NC} SQL Injection → ${CYAN}Parameterized queries (?)${NC}"
@@ -743,16 +779,17 @@ echo -e "    ${GREEN}[7]${NC} Debug Mode → ${CYAN}env var FLASK_DEBUG + bind 1
 
 echo ""
 
-# Verificar que app_secure.py pasa limpia
+# Verificar que app_secure.py y sus modulos de remediacion pasan limpios
 if [ -n "$BANDIT_BIN" ]; then
     echo -e "  ${BOLD}Verificacion con Bandit:${NC}"
-    run_cmd "bandit vulnerable_app/app_secure.py -ll"
-    "$BANDIT_BIN" "$VULN_APP/app_secure.py" -ll 2>/dev/null
+    run_cmd "bandit vulnerable_app/{app_secure,secure_resources,secure_validation}.py -ll"
+    "$BANDIT_BIN" "$VULN_APP/app_secure.py" "$VULN_APP/secure_resources.py" \
+        "$VULN_APP/secure_validation.py" -ll 2>/dev/null
     echo ""
-    result_box "pass" "app_secure.py: 0 findings Medium+"
+    result_box "pass" "app_secure.py + secure_resources.py + secure_validation.py: 0 findings Medium+"
 fi
 
-update_status log "success" "verification" "Remediacion: 7/7 vulnerabilidades corregidas en app_secure.py"
+update_status log "success" "verification" "Remediacion: 7/7 vulnerabilidades corregidas en app_secure.py (+ secure_resources.py, secure_validation.py)"
 
 wait_for_enter
 
@@ -811,6 +848,7 @@ send_discord \
     "$DISCORD_FIELDS"
 
 update_status log "success" "notification" "Reporte final enviado a Telegram y Discord"
+update_status compact
 
 wait_for_enter
 
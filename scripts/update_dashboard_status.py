@@ -3,15 +3,103 @@
 Helper para actualizar status.json en tiempo real durante el demo.
 
 Uso:
-    python3 update_dashboard_status.py <status.json> reset
+    python3 update_dashboard_status.py <status.json> reset [--commit SHA] [--branch NAME]
+    python3 update_dashboard_status.py <status.json> start <name>
     python3 update_dashboard_status.py <status.json> stage <name> <status> <findings>
     python3 update_dashboard_status.py <status.json> log <level> <event> <message>
     python3 update_dashboard_status.py <status.json> pipeline <complete|failed>
+    python3 update_dashboard_status.py <status.json> compact
+    python3 update_dashboard_status.py <status.json> show
+    python3 update_dashboard_status.py <status.json> history
+    python3 update_dashboard_status.py <status.json> timings [N]
+    python3 update_dashboard_status.py <status.json> trends [N]
+    python3 update_dashboard_status.py <status.json> diff [<commit base> <commit head>]
+    python3 update_dashboard_status.py <status.json> serve [--http HOST:PORT]
+
+stage, log y pipeline agregan un evento a <status.json>.journal (NDJSON,
+append-only) y rematerializan status.json, el snapshot que leen
+dashboard.html y `python3 -m http.server`. Con el daemon (`serve`) el
+snapshot se escribe con debounce. `show` imprime el estado actual
+(snapshot + journal).
+
+Seguro con varios jobs del pipeline en paralelo: flock sobre
+<status.json>.lock (compartido para agregar, exclusivo para compactar) y
+snapshot con archivo temporal + rename, asi el dashboard nunca lee JSON
+truncado.
+
+activity_log es un ring buffer: al compactar se conservan las ultimas
+DASHBOARD_LOG_MAX entradas y el resto se archiva en segmentos NDJSON
+comprimidos (<status.json>.archive.ndjson.gz, rotados a .1, .2, ...).
+`history` imprime el archivo completo, del mas viejo al mas nuevo.
+
+Tiempos: `start` marca el inicio de un stage (tambien `stage ... running`
+si no habia arrancado) y `stage` con status final (passed, warning, failed,
+skipped) el fin; duration_seconds sale de time.monotonic(). `pipeline`
+calcula la duracion total y el camino critico entre stages en paralelo, y
+guarda la corrida en el historial SQLite (<status.json>.history.db, ver
+dashboard_history.py): asi `reset` ya no pierde las corridas anteriores.
+  timings [N]  ultima corrida vs mediana de las N anteriores, por stage
+  trends [N]   p50/p95 de duracion por stage en las ultimas N corridas
+  diff         findings por stage entre los dos ultimos commits (o los dados)
+`reset` registra commit y branch de la corrida: --commit/--branch, si no
+GITHUB_SHA/GITHUB_REF_NAME (GitHub Actions) y si no `git rev-parse HEAD`.
+
+`serve` arranca un daemon con el estado en memoria (ver "Daemon" abajo).
+Mientras corre, los demas comandos se le envian por el socket Unix en vez
+de tocar los archivos; sin daemon funcionan en modo archivo directo. Con
+--http ademas sirve dashboard.html, /status.json (ETag/304) y /events
+(deltas JSON Patch por server-sent events).
+
+Variables de entorno (opcionales):
+    DASHBOARD_LOG_MAX=200                  entradas en status.json
+    DASHBOARD_LOG_RETENTION=info=50,success=50
+                                           maximo por nivel; los niveles no
+                                           listados (error, warning) solo
+                                           cuentan para DASHBOARD_LOG_MAX
+    DASHBOARD_ARCHIVE_SEGMENT_BYTES=262144 tamano para rotar el segmento
+    DASHBOARD_ARCHIVE_KEEP=5               segmentos rotados a conservar
+    DASHBOARD_SOCKET=<status.json>.sock    socket Unix del daemon
+    DASHBOARD_COMPACT=false                status.json sin indentar
+    DASHBOARD_COMPACT_BYTES=65536          journal con el que el daemon lo rota
+    DASHBOARD_HISTORY_DB=<status.json>.history.db
+                                           historial de corridas (SQLite)
+    DASHBOARD_HISTORY_RUNS=200             corridas con detalle por stage;
+                                           las anteriores se resumen por dia
+    DASHBOARD_HISTORY_DAYS=365             dias de resumen a conservar
 """
+import collections
+import copy
+import fcntl
+import gzip
+import http.client
+import http.server
 import json
+import os
+import signal
+import socket
+import socketserver
+import sqlite3
+import statistics
+import subprocess
 import sys
-from datetime import datetime, timezone
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import UTC, datetime
 from pathlib import Path
+from urllib.parse import parse_qs, urlencode
+
+import dashboard_history
+import dashboard_model
+from dashboard_model import (
+    LEVELS,
+    STAGE_DONE,
+    STAGE_STATUSES,
+    LogEntry,
+    SchemaError,
+    Status,
+)
 
 INITIAL_STATUS = {
     "pipeline": {
@@ -29,6 +117,7 @@ INITIAL_STATUS = {
             "container-security": {"status": "skipped", "duration_seconds": 0, "findings": 0},
             "iac-security": {"status": "skipped", "duration_seconds": 0, "findings": 0},
         },
+        "critical_path": [],
     },
     "vulnerabilities": [],
     "scan_summary": {},
@@ -55,86 +144,1066 @@ INITIAL_STATUS = {
 }
 
 
+def _parse_retention(raw):
+    """Parsea DASHBOARD_LOG_RETENTION: info=50,success=50 -> {"info": 50, ...}."""
+    retention = {}
+    for item in raw.split(","):
+        if item.strip():
+            level, _, limit = item.partition("=")
+            retention[level.strip()] = int(limit)
+    return retention
+
+
+LOG_MAX = int(os.environ.get("DASHBOARD_LOG_MAX", "200"))
+LOG_RETENTION = _parse_retention(os.environ.get("DASHBOARD_LOG_RETENTION", ""))
+ARCHIVE_SEGMENT_BYTES = int(os.environ.get("DASHBOARD_ARCHIVE_SEGMENT_BYTES", str(256 * 1024)))
+ARCHIVE_KEEP = int(os.environ.get("DASHBOARD_ARCHIVE_KEEP", "5"))
+# status.json sin indentar (menos bytes para el dashboard y /status.json)
+COMPACT_JSON = os.environ.get("DASHBOARD_COMPACT", "false").lower() == "true"
+HISTORY_RUNS = int(os.environ.get("DASHBOARD_HISTORY_RUNS", "200"))
+HISTORY_DAYS = int(os.environ.get("DASHBOARD_HISTORY_DAYS", "365"))
+
+
 def now_iso():
-    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def journal_path(path):
+    return Path(path).with_name(Path(path).name + ".journal")
+
+
+def history_path(path):
+    return Path(os.environ.get("DASHBOARD_HISTORY_DB") or Path(path).with_name(Path(path).name + ".history.db"))
 
 
 def load_status(path):
+    """Solo el snapshot (status.json) como Status; ver read_status() para el estado actual.
+
+    Un archivo ausente, corrupto o con otro esquema se reemplaza por el
+    estado inicial.
+    """
     try:
-        return json.loads(Path(path).read_text())
-    except Exception:
-        return INITIAL_STATUS.copy()
+        return dashboard_model.loads(Path(path).read_bytes())
+    except (OSError, ValueError):
+        # Copia profunda: los comandos mutan el resultado y no deben tocar la plantilla
+        return Status.from_dict(copy.deepcopy(INITIAL_STATUS))
 
 
-def save_status(path, data):
-    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False))
+def save_status(path, data, compact=None):
+    """Escritura atomica (Status o dict): temporal en el mismo directorio + os.replace()."""
+    path = Path(path)
+    body = dashboard_model.dumps(data, compact=COMPACT_JSON if compact is None else compact)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crea 0600; el dashboard se sirve por HTTP y necesita leerlo
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
 
 
-def cmd_reset(path):
-    data = json.loads(json.dumps(INITIAL_STATUS))
-    data["pipeline"]["last_run"] = now_iso()
-    data["activity_log"][0]["timestamp"] = now_iso()
-    save_status(path, data)
+@contextmanager
+def status_lock(path, exclusive=True, blocking=True):
+    """flock sobre <status.json>.lock mientras dura el bloque.
 
+    Compartido para agregar al journal o leer, exclusivo para compactar o
+    reiniciar. El lock va en un archivo aparte porque os.replace() cambia
+    el inodo de status.json y del journal. Con blocking=False cede None si
+    otro proceso tiene el lock.
+    """
+    lock_path = Path(path).with_name(Path(path).name + ".lock")
+    with open(lock_path, "a") as lock:
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        try:
+            fcntl.flock(lock.fileno(), flags if blocking else flags | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield None
+            return
+        try:
+            yield lock
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
 
-def cmd_stage(path, name, status, findings):
+
+# ── Journal de eventos ──
+# Cada comando agrega una linea NDJSON a <status.json>.journal (O(1)) en vez
+# de reescribir todo status.json. compact() aplica el journal al snapshot y
+# empieza un journal nuevo; read_status() = snapshot + eventos pendientes.
+# El snapshot guarda en "_journal" el inodo y offset ya aplicados: si el
+# compactor muere entre guardar el snapshot y rotar el journal, los eventos
+# no se aplican dos veces.
+
+# El daemon empieza un journal nuevo cuando el actual supera este tamano
+COMPACT_BYTES = int(os.environ.get("DASHBOARD_COMPACT_BYTES", str(64 * 1024)))
+
+
+def apply_event(data, event, new_entries):
+    """Aplica un evento al Status; las lineas de log se acumulan en new_entries."""
+    op = event["op"]
+    pipeline = data.pipeline
+    if op == "start":
+        stage = pipeline.stages.get(event["name"])
+        if stage is not None:
+            stage.status = "running"
+            stage.started, stage.finished, stage.duration_seconds = event["mono"], None, 0
+    elif op == "stage":
+        stage = pipeline.stages.get(event["name"])
+        if stage is not None:
+            stage.status = event["status"]
+            stage.findings = event["findings"]
+            _time_stage(stage, event.get("mono"))
+    elif op == "log":
+        new_entries.append(LogEntry.from_dict(event["entry"]))
+    elif op == "pipeline":
+        failed = event["status"] != "complete"
+        warning = not failed and any(s.status == "failed" for s in pipeline.stages.values())
+        if failed:
+            pipeline.status = "failed"
+        else:
+            pipeline.status = "warning" if warning else "passed"
+        pipeline.last_run = event["timestamp"]
+        mono = event.get("mono")
+        started = [s.started for s in pipeline.stages.values() if s.started is not None]
+        # Journals anteriores a los tiempos no traen "mono"
+        if mono is not None and started:
+            pipeline.duration_seconds = round(mono - min(started), 2)
+            pipeline.critical_path = critical_path(pipeline.stages, mono)
+        new_entries.append(LogEntry(
+            event["timestamp"],
+            "pipeline_complete",
+            f"Pipeline finalizado — Status: {pipeline.status.upper()}",
+            "error" if failed else "warning" if warning else "success",
+        ))
+
+
+def _time_stage(stage, mono):
+    """Inicio/fin del stage segun su nuevo status (eventos viejos: mono None)."""
+    if mono is None:
+        return
+    if stage.status == "running":
+        if stage.started is None or stage.finished is not None:
+            stage.started, stage.finished, stage.duration_seconds = mono, None, 0
+    # mono < started: el host se reinicio en medio del stage, no se cierra
+    elif (stage.status in STAGE_DONE and stage.started is not None and stage.finished is None
+          and mono >= stage.started):
+        stage.finished = mono
+        stage.duration_seconds = round(mono - stage.started, 2)
+
+
+def critical_path(stages, now):
+    """Cadena de stages que determina la duracion total del pipeline.
+
+    No hay dependencias explicitas entre stages: se parte del que termina
+    ultimo y se retrocede al que termino mas tarde antes de que el actual
+    arrancara (el que lo estaba bloqueando). Los que siguen corriendo
+    terminan en `now`.
+    """
+    spans = {
+        name: (s.started, s.finished if s.finished is not None else now)
+        for name, s in stages.items() if s.started is not None
+    }
+    path = []
+    current = max(spans, key=lambda n: (spans[n][1], spans[n][1] - spans[n][0]), default=None)
+    while current is not None:
+        path.append(current)
+        start = spans.pop(current)[0]
+        current = max((n for n, (_, end) in spans.items() if end <= start),
+                      key=lambda n: spans[n][1], default=None)
+    return path[::-1]
+
+
+def replay(data, events):
+    new_entries = []
+    for event in events:
+        apply_event(data, event, new_entries)
+    # activity_log va del mas nuevo al mas viejo: un solo prepend por lote
+    # en vez de insert(0) por linea
+    data.activity_log[:0] = new_entries[::-1]
+    return data
+
+
+def _read_journal(path, marker):
+    """(eventos que el snapshot aun no incluye, inodo del journal, offset final)."""
+    try:
+        with open(journal_path(path), "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            if marker.get("inode") == inode:
+                f.seek(marker.get("offset", 0))
+            raw = f.read()
+            offset = f.tell()
+    except FileNotFoundError:
+        return [], None, 0
+    events = []
+    for line in raw.splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            # Linea incompleta (el escritor murio a mitad del write): se ignora
+            continue
+    return events, inode, offset
+
+
+# ── Ring buffer y archivo de activity_log ──
+
+def retain_log(data, max_entries=None, retention=None):
+    """Recorta activity_log; retorna las entradas desalojadas (mas vieja primero).
+
+    Primero el limite por nivel (las mas nuevas de cada nivel se quedan),
+    despues el limite total: lo que sobra son siempre las mas viejas.
+    """
+    max_entries = LOG_MAX if max_entries is None else max_entries
+    retention = LOG_RETENTION if retention is None else retention
+    log = data.activity_log
+    keep = []
+    counts = {}
+    kept = 0
+    for entry in log:   # del mas nuevo al mas viejo
+        level = entry.level
+        limit = retention.get(level)
+        ok = kept < max_entries and (limit is None or counts.get(level, 0) < limit)
+        if ok:
+            counts[level] = counts.get(level, 0) + 1
+            kept += 1
+        keep.append(ok)
+    if kept == len(log):
+        return []
+    data.activity_log = [e for e, ok in zip(log, keep) if ok]
+    return [e for e, ok in zip(reversed(log), reversed(keep)) if not ok]
+
+
+def archive_paths(path):
+    """Segmentos del archivo, del mas nuevo (actual) al mas viejo."""
+    base = Path(path).with_name(Path(path).name + ".archive")
+    return [base.with_name(base.name + ".ndjson.gz")] + [
+        base.with_name(f"{base.name}.{n}.ndjson.gz") for n in range(1, ARCHIVE_KEEP + 1)
+    ]
+
+
+def archive_entries(path, entries):
+    """Agrega entradas al segmento actual y rota si supera ARCHIVE_SEGMENT_BYTES.
+
+    Cada llamada agrega un miembro gzip al segmento (gzip.open los lee como
+    un solo stream). Se llama con el lock exclusivo tomado.
+    """
+    if not entries:
+        return
+    segments = archive_paths(path)
+    payload = "".join(json.dumps(e.to_dict(), ensure_ascii=False) + "\n" for e in entries)
+    with gzip.open(segments[0], "at", encoding="utf-8") as f:
+        f.write(payload)
+    if segments[0].stat().st_size < ARCHIVE_SEGMENT_BYTES:
+        return
+    # Rotacion estilo logrotate: .N -> .N+1, el mas viejo se descarta
+    for older, newer in zip(reversed(segments[1:]), reversed(segments[:-1])):
+        if newer.exists():
+            os.replace(newer, older)
+
+
+def read_archive(path):
+    """Entradas archivadas, de la mas vieja a la mas nueva."""
+    for segment in reversed(archive_paths(path)):
+        if segment.exists():
+            with gzip.open(segment, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+# ── Historial de corridas ──
+def run_store(path):
+    return dashboard_history.RunStore(history_path(path), keep_runs=HISTORY_RUNS, keep_days=HISTORY_DAYS)
+
+
+def record_run(path, data):
+    """Guarda la corrida terminada en el historial; un error no tumba el comando."""
+    try:
+        with run_store(path) as store:
+            store.record(data)
+    except sqlite3.Error as e:
+        print(f"update_dashboard_status: historial no actualizado ({e})", file=sys.stderr)
+
+
+def read_runs(path, last=None):
+    """Ultimas corridas del historial, de la mas vieja a la mas nueva."""
+    with run_store(path) as store:
+        return store.runs(last)
+
+
+def timing_report(runs):
+    """Ultima corrida vs mediana de las anteriores, stage por stage.
+
+    Filas ordenadas por delta: primero el stage que mas se enlentecio.
+    """
+    if not runs:
+        return []
+    last, previous = runs[-1], runs[:-1]
+    rows = []
+    for name, seconds in last["stages"].items():
+        past = [r["stages"][name] for r in previous if name in r["stages"]]
+        median = statistics.median(past) if past else None
+        rows.append({
+            "stage": name,
+            "runs": len(past) + 1,
+            "last": seconds,
+            "median": median,
+            "delta": None if median is None else round(seconds - median, 2),
+            "critical": name in last["critical_path"],
+        })
+    rows.sort(key=lambda r: -(r["delta"] or 0))
+    return rows
+
+
+def format_timings(runs):
+    if not runs:
+        return "Sin corridas registradas"
+    last = runs[-1]
+    totals = [r["duration_seconds"] for r in runs[:-1]]
+    lines = [f"Ultima corrida {last['timestamp']} ({last['commit']}): {last['duration_seconds']}s"
+             + (f", mediana {statistics.median(totals)}s" if totals else "")]
+    if last["critical_path"]:
+        lines.append("Camino critico: " + " -> ".join(last["critical_path"]))
+    lines.append(f"{'stage':<22}{'corridas':>9}{'ultima':>9}{'mediana':>9}{'delta':>9}")
+    for row in timing_report(runs):
+        median = "-" if row["median"] is None else f"{row['median']:.2f}"
+        delta = "-" if row["delta"] is None else f"{row['delta']:+.2f}"
+        mark = " *" if row["critical"] else ""
+        lines.append(f"{row['stage']:<22}{row['runs']:>9}{row['last']:>9.2f}{median:>9}{delta:>9}{mark}")
+    return "\n".join(lines)
+
+
+def format_trends(stats, last):
+    if not stats:
+        return "Sin corridas con tiempos registrados"
+    lines = [f"Duracion en las ultimas {last} corridas",
+             f"{'stage':<22}{'corridas':>9}{'p50':>9}{'p95':>9}"]
+    # Primero el total, despues los stages del mas lento (p95) al mas rapido
+    order = sorted(stats, key=lambda n: (n != dashboard_history.TOTAL, -stats[n]["p95"]))
+    for name in order:
+        row = stats[name]
+        lines.append(f"{name:<22}{row['runs']:>9}{row['p50']:>9.2f}{row['p95']:>9.2f}")
+    return "\n".join(lines)
+
+
+def format_deltas(result):
+    if result is None:
+        return "Hacen falta corridas de dos commits"
+    base, head, deltas = result
+    lines = [f"Findings {base} -> {head}", f"{'stage':<22}{base[:9]:>9}{head[:9]:>9}{'delta':>9}"]
+    for name, (before, after, delta) in deltas.items():
+        lines.append(f"{name:<22}{before:>9}{after:>9}{delta:>+9}")
+    return "\n".join(lines)
+
+
+def _materialize(path):
+    """(estado actual, entradas desalojadas del ring buffer, inodo, offset)."""
     data = load_status(path)
-    if name in data["pipeline"]["stages"]:
-        data["pipeline"]["stages"][name]["status"] = status
-        data["pipeline"]["stages"][name]["findings"] = int(findings)
+    events, inode, offset = _read_journal(path, data.journal or {})
+    data.journal = None
+    replay(data, events)
+    return data, retain_log(data), inode, offset
+
+
+def read_status(path):
+    """Estado actual (dict): snapshot + eventos del journal aun no compactados.
+
+    Espera el lock: con el daemon corriendo usar run_command(path, "show").
+    """
+    with status_lock(path, exclusive=False):
+        return _materialize(path)[0].to_dict()
+
+
+def _new_journal(path):
+    """Reemplaza el journal por uno vacio (inodo nuevo) de forma atomica."""
+    journal = journal_path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{journal.name}.", suffix=".tmp", dir=journal.parent)
+    os.close(fd)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, journal)
+
+
+def compact(path, blocking=True):
+    """Aplica el journal a status.json y empieza un journal vacio.
+
+    Retorna False si blocking=False y otro proceso tiene el lock.
+    """
+    with status_lock(path, exclusive=True, blocking=blocking) as lock:
+        if lock is None:
+            return False
+        _compact_locked(path)
+        return True
+
+
+def _compact_locked(path):
+    """compact() con el lock exclusivo ya tomado; retorna el estado guardado."""
+    data, evicted, inode, offset = _materialize(path)
+    # Primero el archivo: si el proceso muere antes de guardar el snapshot
+    # una entrada puede quedar archivada dos veces, pero nunca se pierde
+    archive_entries(path, evicted)
+    if inode is not None:
+        # Primero el snapshot (con el offset aplicado), despues la rotacion
+        data.journal = {"inode": inode, "offset": offset}
     save_status(path, data)
+    _new_journal(path)
+    data.journal = None
+    return data
 
 
-def cmd_log(path, level, event, message):
-    data = load_status(path)
-    entry = {
-        "timestamp": now_iso(),
-        "event": event,
-        "message": message,
-        "level": level,
-    }
-    data["activity_log"].insert(0, entry)
+def journal_event(path, event):
+    """Agrega un evento al journal, sin tocar status.json."""
+    line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+    with status_lock(path, exclusive=False):
+        fd = os.open(journal_path(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # Un solo write con O_APPEND: las lineas de escritores concurrentes
+            # no se intercalan
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def append_event(path, event):
+    """Agrega un evento al journal y rematerializa status.json.
+
+    dashboard.html y el fallback http.server leen solo status.json, asi que
+    cada comando en modo archivo lo deja al dia. Si otro proceso ya tiene
+    el lock exclusivo no se espera: lo tomo despues de este append y su
+    compactacion incluye el evento.
+    """
+    journal_event(path, event)
+    compact(path, blocking=False)
+
+
+def make_event(cmd, args):
+    """Evento del journal para un comando del CLI (start, stage, log o pipeline).
+
+    Valida los argumentos: un evento invalido nunca llega al journal.
+    """
+    if cmd == "start":
+        (name,) = args
+        return {"op": "start", "name": name, "mono": time.monotonic()}
+    if cmd == "stage":
+        name, status, findings = args
+        if status not in STAGE_STATUSES:
+            raise SchemaError(f"stage {name}: status {status!r} invalido")
+        if int(findings) < 0:
+            raise SchemaError(f"stage {name}: findings debe ser >= 0")
+        return {"op": "stage", "name": name, "status": status, "findings": int(findings),
+                "mono": time.monotonic()}
+    if cmd == "log":
+        level, event, *words = args
+        if level not in LEVELS:
+            raise SchemaError(f"log: nivel {level!r} invalido")
+        entry = {
+            "timestamp": now_iso(),
+            "event": event,
+            "message": " ".join(words),
+            "level": level,
+        }
+        return {"op": "log", "entry": entry}
+    if cmd == "pipeline":
+        (status,) = args
+        if status not in ("complete", "failed"):
+            raise SchemaError(f"pipeline: {status!r} no es complete ni failed")
+        return {"op": "pipeline", "status": status, "timestamp": now_iso(), "mono": time.monotonic()}
+    raise ValueError(f"Comando desconocido: {cmd}")
+
+
+def _git(*args):
+    """Salida de un comando git; None si git no esta o falla."""
+    try:
+        result = subprocess.run(["git", *args], capture_output=True, text=True, timeout=5, check=False)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return (result.stdout.strip() or None) if result.returncode == 0 else None
+
+
+def detect_revision(commit=None, branch=None):
+    """(commit, branch) de la corrida: los dados, GitHub Actions o git; None si no se sabe."""
+    commit = commit or os.environ.get("GITHUB_SHA", "")[:7] or _git("rev-parse", "--short", "HEAD")
+    branch = branch or os.environ.get("GITHUB_REF_NAME") or _git("rev-parse", "--abbrev-ref", "HEAD")
+    # HEAD desacoplado: rev-parse --abbrev-ref responde "HEAD"
+    return commit, None if branch == "HEAD" else branch
+
+
+def initial_status(commit=None, branch=None):
+    data = Status.from_dict(copy.deepcopy(INITIAL_STATUS))
+    data.pipeline.last_run = now_iso()
+    data.pipeline.commit = commit or data.pipeline.commit
+    data.pipeline.branch = branch or data.pipeline.branch
+    data.activity_log[0].timestamp = now_iso()
+    return data
+
+
+def _reset_locked(path, commit=None, branch=None):
+    # Tambien aqui y no solo en el CLI: `reset` por curl al socket llega sin
+    # argumentos y el historial necesita el commit real para `diff`
+    commit, branch = detect_revision(commit, branch)
+    if Path(path).exists():
+        # El log del run anterior pasa completo al archivo
+        old, evicted, _, _ = _materialize(path)
+        archive_entries(path, evicted + old.activity_log[::-1])
+    data = initial_status(commit, branch)
+    # Primero el journal vacio: el snapshot nuevo no debe heredar eventos viejos
+    _new_journal(path)
     save_status(path, data)
+    return data
+
+
+def cmd_reset(path, commit=None, branch=None):
+    with status_lock(path):
+        _reset_locked(path, commit, branch)
+
+
+def cmd_stage(path, name, status, findings):
+    append_event(path, make_event("stage", (name, status, findings)))
+
+
+def cmd_log(path, level, event, message):
+    append_event(path, make_event("log", (level, event, message)))
 
 
 def cmd_pipeline(path, status):
-    data = load_status(path)
-    if status == "complete":
-        failed = any(
-            s["status"] == "failed"
-            for s in data["pipeline"]["stages"].values()
-        )
-        data["pipeline"]["status"] = "warning" if failed else "passed"
-    else:
-        data["pipeline"]["status"] = "failed"
-    data["pipeline"]["last_run"] = now_iso()
-
-    entry = {
-        "timestamp": now_iso(),
-        "event": "pipeline_complete",
-        "message": f"Pipeline finalizado — Status: {data['pipeline']['status'].upper()}",
-        "level": "success" if not failed else "warning",
-    }
-    data["activity_log"].insert(0, entry)
-    save_status(path, data)
+    journal_event(path, make_event("pipeline", (status,)))
+    # Fin del pipeline: el dashboard debe ver el estado final
+    with status_lock(path):
+        record_run(path, _compact_locked(path))
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Uso: update_dashboard_status.py <status.json> <command> [args...]")
-        sys.exit(1)
+# ── Daemon ──
+# `serve` mantiene el estado en memoria y atiende HTTP local sobre un socket
+# Unix (<status.json>.sock o DASHBOARD_SOCKET): POST /<comando> con los
+# argumentos como `arg` form-encoded, GET /show y GET /ping. Sin Python del
+# lado del cliente:
+#     curl -s --unix-socket status.json.sock -X POST http://localhost/log \
+#          --data-urlencode arg=info --data-urlencode arg=recon --data-urlencode arg=mensaje
+# Responde {"ok": true}, 400 con {"ok": false, "error": "..."} si los
+# argumentos son invalidos o 500 ante cualquier otro error. Cada evento se
+# agrega al journal (si el daemon muere no se pierde nada) y status.json se
+# reescribe con debounce: FLUSH_DELAY despues del ultimo cambio y como mucho
+# FLUSH_MAX_DELAY despues del primero. El daemon tiene el lock exclusivo
+# mientras corre, asi nadie escribe el journal por fuera.
+
+FLUSH_DELAY = 0.2
+FLUSH_MAX_DELAY = 1.0
+CLIENT_TIMEOUT = 5.0
+
+# Push al dashboard (serve --http): cada cambio genera operaciones JSON Patch
+# (RFC 6902: add/replace/remove con JSON Pointer) que /events emite por SSE.
+# Un cliente que reconecta con Last-Event-ID recibe solo lo que le falta si
+# sigue en PATCH_HISTORY; si no (o si el daemon reinicio), un snapshot.
+PATCH_HISTORY = 512
+SSE_HEARTBEAT = 15.0
+
+
+def _pointer(*keys):
+    return "".join("/" + str(k).replace("~", "~0").replace("/", "~1") for k in keys)
+
+
+def socket_path(path):
+    return Path(os.environ.get("DASHBOARD_SOCKET") or Path(path).with_name(Path(path).name + ".sock"))
+
+
+class StatusDaemon:
+    """Estado de status.json en memoria; el caller tiene el lock exclusivo."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._cond = threading.Condition()
+        self._first_change = None
+        self._last_change = 0.0
+        self._closed = False
+        self.data = _compact_locked(self.path)
+        # Version de self.data: id de los eventos SSE y ETag de /status.json
+        self._boot = os.urandom(4).hex()
+        self.version = 0
+        self._patches = collections.deque(maxlen=PATCH_HISTORY)
+        self._snapshot_cache = (None, b"")
+        self._open_journal()
+        self._flusher = threading.Thread(target=self._flush_loop, name="status-flush", daemon=True)
+        self._flusher.start()
+
+    def _open_journal(self):
+        # fd crudo como en append_event: un os.write() por evento, sin buffer
+        self._journal = os.open(journal_path(self.path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._inode = os.fstat(self._journal).st_ino
+
+    def handle(self, cmd, args):
+        """Ejecuta un comando; retorna el dict de respuesta."""
+        if cmd != "ping":
+            # Misma aridad que el CLI: un argumento faltante es un error de uso,
+            # no una excepcion de Python en la respuesta
+            if cmd not in COMMANDS:
+                raise ValueError(f"comando desconocido: {cmd}")
+            if len(args) < COMMANDS[cmd]:
+                raise ValueError(f"uso: {cmd} espera {COMMANDS[cmd]} argumentos, recibio {len(args)}")
+            if cmd not in ("log", "reset"):
+                # Como el CLI: los argumentos de mas se ignoran
+                args = args[:COMMANDS[cmd]]
+        with self._cond:
+            if cmd == "ping":
+                return {"ok": True}
+            if cmd == "show":
+                return {"ok": True, "status": self.data.to_dict()}
+            if cmd == "reset":
+                os.close(self._journal)
+                self.data = _reset_locked(self.path, *args[:2])
+                self._open_journal()
+                self._first_change = None
+                self._publish([{"op": "replace", "path": "", "value": self.data.to_dict()}])
+                return {"ok": True}
+            if cmd == "compact":
+                self._flush()
+                return {"ok": True}
+            event = make_event(cmd, args)
+            replay(self.data, [event])
+            self._publish(self._event_patch(event))
+            os.write(self._journal, (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+            now = time.monotonic()
+            self._last_change = now
+            if self._first_change is None:
+                self._first_change = now
+            if cmd == "pipeline":
+                # Fin del pipeline: el dashboard debe ver el estado final
+                self._flush()
+                record_run(self.path, self.data)
+            else:
+                # notify_all: en la condicion esperan el flusher y los clientes SSE
+                self._cond.notify_all()
+            return {"ok": True}
+
+    # ── Patches ──
+    def _event_patch(self, event):
+        """Operaciones JSON Patch equivalentes a un evento ya aplicado."""
+        op = event["op"]
+        pipeline = self.data.pipeline
+        if op in ("start", "stage"):
+            stage = pipeline.stages.get(event["name"])
+            if stage is None:
+                return []
+            # El stage completo: started/finished aparecen y desaparecen
+            return [{"op": "replace", "path": _pointer("pipeline", "stages", event["name"]),
+                     "value": stage.to_dict()}]
+        ops = []
+        if op == "pipeline":
+            ops = [
+                {"op": "replace", "path": _pointer("pipeline", field), "value": getattr(pipeline, field)}
+                for field in ("status", "last_run", "duration_seconds", "critical_path")
+            ]
+        # log y pipeline agregan una entrada al inicio de activity_log
+        return ops + [{"op": "add", "path": "/activity_log/0", "value": self.data.activity_log[0].to_dict()}]
+
+    def _publish(self, ops):
+        if not ops:
+            return
+        self.version += 1
+        self._patches.append((self.version, ops))
+        self._cond.notify_all()
+
+    def _patches_since(self, version):
+        """Operaciones posteriores a `version`, o None si ya no estan en el historial."""
+        if version == self.version:
+            return []
+        if version > self.version or not self._patches or self._patches[0][0] > version + 1:
+            return None
+        return [op for v, ops in self._patches if v > version for op in ops]
+
+    def etag(self):
+        return f"{self._boot}-{self.version}"
+
+    def snapshot(self):
+        """(etag, JSON compacto del estado actual), cacheado por version."""
+        with self._cond:
+            version, body = self._snapshot_cache
+            if version != self.version:
+                body = dashboard_model.dumps(self.data, compact=True)
+                self._snapshot_cache = (self.version, body)
+            return self.etag(), body
+
+    def events(self, last_event_id=None, heartbeat=SSE_HEARTBEAT):
+        """Mensajes SSE (bytes): snapshot o patches pendientes y luego cada cambio."""
+        version = None
+        boot, _, seen = (last_event_id or "").partition("-")
+        if boot == self._boot and seen.isdigit():
+            version = int(seen)
+        while True:
+            with self._cond:
+                if version is not None and version == self.version and not self._closed:
+                    self._cond.wait(heartbeat)
+                if self._closed:
+                    return
+                ops = None if version is None else self._patches_since(version)
+                if ops is None:
+                    kind, payload = "snapshot", self.data.to_dict()
+                elif ops:
+                    kind, payload = "patch", ops
+                else:
+                    kind = None
+                version = self.version
+                if kind is not None:
+                    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+                    message = f"id: {self.etag()}\nevent: {kind}\ndata: {data}\n\n"
+            # Comentario SSE: mantiene viva la conexion a traves de proxies
+            yield (message if kind is not None else ": ping\n\n").encode("utf-8")
+
+    def _flush(self):
+        """Guarda el snapshot desde memoria (con self._cond tomado)."""
+        self._first_change = None
+        before = self.data.activity_log
+        evicted = retain_log(self.data)
+        if evicted:
+            kept = {id(e) for e in self.data.activity_log}
+            # De atras hacia adelante para que los indices sigan siendo validos
+            self._publish([
+                {"op": "remove", "path": _pointer("activity_log", i)}
+                for i in reversed(range(len(before))) if id(before[i]) not in kept
+            ])
+        archive_entries(self.path, evicted)
+        # Solo el daemon escribe el journal: el final es lo ya aplicado
+        offset = os.lseek(self._journal, 0, os.SEEK_END)
+        self.data.journal = {"inode": self._inode, "offset": offset}
+        try:
+            save_status(self.path, self.data)
+        finally:
+            self.data.journal = None
+        if offset >= COMPACT_BYTES:
+            os.close(self._journal)
+            _new_journal(self.path)
+            self._open_journal()
+
+    def _flush_loop(self):
+        with self._cond:
+            while not self._closed:
+                if self._first_change is None:
+                    self._cond.wait()
+                    continue
+                deadline = min(self._first_change + FLUSH_MAX_DELAY, self._last_change + FLUSH_DELAY)
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                try:
+                    self._flush()
+                except OSError:
+                    # Disco lleno o similar: el journal ya tiene los eventos
+                    print("update_dashboard_status: flush fallido", file=sys.stderr)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            if self._first_change is not None:
+                self._flush()
+            os.close(self._journal)
+            self._cond.notify_all()
+        self._flusher.join()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._dispatch([])
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+        self._dispatch(parse_qs(body, keep_blank_values=True).get("arg", []))
+
+    def _dispatch(self, args):
+        try:
+            reply, status = self.server.daemon.handle(self.path.strip("/"), args), 200
+        except (ValueError, TypeError) as e:
+            reply, status = {"ok": False, "error": str(e)}, 400
+        except Exception as e:  # noqa: BLE001 - el cliente siempre recibe JSON, nunca un socket cerrado
+            print(f"update_dashboard_status: error en {self.path}: {e!r}", file=sys.stderr)
+            reply, status = {"ok": False, "error": f"error interno: {e}"}, 500
+        body = json.dumps(reply, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StatusServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Servidor del daemon: toma el lock exclusivo y escucha en socket_path()."""
+
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.status_path = Path(path)
+        self.sock_path = socket_path(path)
+        lock_path = self.status_path.with_name(self.status_path.name + ".lock")
+        # El flock dura lo que el daemon: fd crudo, se cierra en server_close()
+        self._lock_fd = os.open(lock_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if send_command(path, "ping") is not None:
+                os.close(self._lock_fd)
+                raise RuntimeError(f"Ya hay un daemon en {self.sock_path}")
+            # Un writer o compactor en curso: esperar a que termine
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            self.daemon = StatusDaemon(self.status_path)
+            # Con el lock tomado, un socket existente es de un daemon muerto
+            self.sock_path.unlink(missing_ok=True)
+            super().__init__(str(self.sock_path), _Handler)
+        except BaseException:
+            os.close(self._lock_fd)
+            raise
 
-    path = sys.argv[1]
-    cmd = sys.argv[2]
+    def server_bind(self):
+        # HTTPServer.server_bind espera (host, port)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+    def server_close(self):
+        super().server_close()
+        self.sock_path.unlink(missing_ok=True)
+        self.daemon.close()
+        os.close(self._lock_fd)   # libera el flock
+
+
+class _DashboardHandler(http.server.BaseHTTPRequestHandler):
+    """Solo lectura: dashboard.html, /status.json (ETag/304) y /events (SSE)."""
+
+    def do_GET(self):
+        route = self.path.split("?", 1)[0]
+        if route in ("/", "/dashboard.html"):
+            self._dashboard()
+        elif route == "/status.json":
+            self._status()
+        elif route == "/events":
+            self._events()
+        else:
+            self.send_error(404)
+
+    def _send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dashboard(self):
+        try:
+            body = (self.server.daemon.path.parent / "dashboard.html").read_bytes()
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+        self._send(200, body, "text/html; charset=utf-8")
+
+    def _status(self):
+        etag, body = self.server.daemon.snapshot()
+        etag = f'"{etag}"'
+        headers = [("ETag", etag), ("Cache-Control", "no-cache")]
+        if etag in (self.headers.get("If-None-Match") or "").split(", "):
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self._send(200, body, "application/json", headers)
+
+    def _events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            for message in self.server.daemon.events(self.headers.get("Last-Event-ID")):
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DashboardHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, daemon):
+        self.daemon = daemon
+        super().__init__(address, _DashboardHandler)
+
+
+def parse_address(value):
+    """HOST:PORT (o solo PORT, en 127.0.0.1) -> (host, port)."""
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def serve(path, http_address=None):
+    server = StatusServer(path)
+    servers = [server]
+    try:
+        if http_address is not None:
+            servers.append(DashboardHTTPServer(http_address, server.daemon))
+    except BaseException:
+        server.server_close()
+        raise
+
+    def stop(_signum, _frame):
+        # shutdown() espera al loop: desde otro thread
+        for s in servers:
+            threading.Thread(target=s.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers[1:]]
+    for thread in threads:
+        thread.start()
+    try:
+        server.serve_forever()
+    finally:
+        for s in reversed(servers):
+            s.server_close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, sock_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.sock_path = sock_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.sock_path)
+
+
+def send_command(path, cmd, args=(), timeout=CLIENT_TIMEOUT):
+    """Envia un comando al daemon; None si no hay daemon que responda.
+
+    Sin socket, conexion rechazada, timeout o respuesta cortada
+    (RemoteDisconnected) cuentan como "sin daemon": run_command sigue en
+    modo archivo, que espera el lock si el daemon todavia lo tiene.
+    """
+    conn = _UnixHTTPConnection(str(socket_path(path)), timeout)
+    try:
+        if cmd in ("show", "ping"):
+            conn.request("GET", f"/{cmd}")
+        else:
+            conn.request(
+                "POST", f"/{cmd}", urlencode([("arg", a) for a in args]),
+                {"Content-Type": "application/x-www-form-urlencoded"},
+            )
+        response = conn.getresponse()
+        reply = json.loads(response.read())
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        conn.close()
+    if not reply.get("ok"):
+        raise RuntimeError(reply.get("error"))
+    return reply
+
+
+def _daemon_starting(path):
+    """True si alguien tiene el lock exclusivo (daemon arrancando o compactando)."""
+    with status_lock(path, exclusive=False, blocking=False) as lock:
+        return lock is None
+
+
+def run_command(path, cmd, args):
+    """Cliente: usa el daemon si esta corriendo; si no, modo archivo directo."""
+    deadline = time.monotonic() + CLIENT_TIMEOUT
+    while True:
+        reply = send_command(path, cmd, args)
+        if reply is not None:
+            return reply
+        if not _daemon_starting(path) or time.monotonic() > deadline:
+            break
+        time.sleep(0.02)
 
     if cmd == "reset":
-        cmd_reset(path)
-    elif cmd == "stage" and len(sys.argv) >= 6:
-        cmd_stage(path, sys.argv[3], sys.argv[4], sys.argv[5])
-    elif cmd == "log" and len(sys.argv) >= 6:
-        cmd_log(path, sys.argv[3], sys.argv[4], " ".join(sys.argv[5:]))
-    elif cmd == "pipeline" and len(sys.argv) >= 4:
-        cmd_pipeline(path, sys.argv[3])
+        cmd_reset(path, *args)
+    elif cmd == "compact":
+        compact(path)
+    elif cmd == "show":
+        return {"ok": True, "status": read_status(path)}
+    elif cmd == "pipeline":
+        cmd_pipeline(path, *args)
     else:
+        append_event(path, make_event(cmd, args))
+    return {"ok": True}
+
+
+# Comandos del cliente -> numero de argumentos (log une el resto en el mensaje)
+COMMANDS = {"reset": 0, "start": 1, "stage": 3, "log": 3, "pipeline": 1, "compact": 0, "show": 0}
+
+
+def parse_reset_args(args):
+    """[commit, branch] para reset a partir de --commit/--branch y detect_revision()."""
+    options = {}
+    while args:
+        if args[0] not in ("--commit", "--branch") or len(args) < 2:
+            raise ValueError(f"opcion invalida para reset: {args[0]}")
+        options[args[0][2:]] = args[1]
+        args = args[2:]
+    commit, branch = detect_revision(options.get("commit"), options.get("branch"))
+    # Vacio: el daemon recibe strings y initial_status conserva el valor por defecto
+    return [commit or "", branch or ""]
+
+
+def main(argv):
+    if len(argv) < 3:
+        print("Uso: update_dashboard_status.py <status.json> <command> [args...]")
+        return 1
+
+    path, cmd, args = argv[1], argv[2], argv[3:]
+    if cmd == "serve":
+        if args[:1] == ["--http"] and len(args) >= 2:
+            serve(path, parse_address(args[1]))
+        else:
+            serve(path)
+        return 0
+    if cmd == "history":
+        for entry in read_archive(path):
+            print(json.dumps(entry, ensure_ascii=False))
+        return 0
+    if cmd in ("timings", "trends", "diff"):
+        # Solo lectura del historial SQLite: no pasa por el daemon
+        if cmd == "diff":
+            with run_store(path) as store:
+                print(format_deltas(store.finding_deltas(*args[:2]) if len(args) >= 2
+                                    else store.finding_deltas()))
+            return 0
+        last = int(args[0]) if args else 20
+        if cmd == "timings":
+            print(format_timings(read_runs(path, last + 1)))
+        else:
+            with run_store(path) as store:
+                print(format_trends(store.percentiles(last), last))
+        return 0
+    if cmd not in COMMANDS or len(args) < COMMANDS[cmd]:
         print(f"Comando desconocido: {cmd}")
-        sys.exit(1)
+        return 1
+    if cmd == "log":
+        args = [args[0], args[1], " ".join(args[2:])]
+
+    try:
+        if cmd == "reset":
+            args = parse_reset_args(args)
+        else:
+            args = args[:COMMANDS[cmd]]
+        reply = run_command(path, cmd, args)
+    except (ValueError, RuntimeError) as e:
+        # Argumentos invalidos (SchemaError) o rechazados por el daemon
+        print(f"update_dashboard_status: {e}", file=sys.stderr)
+        return 1
+    if cmd == "show":
+        print(json.dumps(reply["status"], indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -6,6 +6,7 @@ Bunker DevSecOps Workshop — Tribu | Hacklab Bogota | Ethereum Bogota
 from pathlib import Path
 
 import pytest
+from source_scanner import ScanCache, scan_files
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 
@@ -80,12 +81,29 @@ def repo_root():
     return REPO_ROOT
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def python_source_files():
     """Archivos .py de produccion (fuera de vulnerable_app/, tests/, backups)."""
     return [f for f in REPO_ROOT.rglob("*.py") if not _is_excluded(f)]
 
 
+@pytest.fixture(scope="session")
+def source_findings(request, python_source_files):
+    """Hallazgos de todas las reglas de source_scanner en los .py de produccion.
+
+    Una sola pasada por archivo para toda la sesion: {regla: [(ruta, linea, texto)]}.
+    Entre sesiones solo se reescanean los archivos que cambiaron (cache en
+    .pytest_cache/d/source_scanner; `pytest --cache-clear` lo borra).
+    """
+    # Sin cacheprovider (-p no:cacheprovider) el cache queda solo en memoria
+    config_cache = getattr(request.config, "cache", None)
+    cache = ScanCache(config_cache.mkdir("source_scanner") / "findings.json") if config_cache else None
+    findings = scan_files(python_source_files, cache)
+    if cache is not None:
+        cache.save()
+    return findings
+
+
 @pytest.fixture
 def dockerfiles():
     """Dockerfiles del proyecto (excluyendo copias de respaldo)."""
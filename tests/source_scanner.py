@@ -0,0 +1,183 @@
+"""
+Motor de escaneo de codigo fuente para tests/test_security.py.
+Bunker DevSecOps Workshop — Tribu | Hacklab Bogota | Ethereum Bogota
+
+Cada archivo se lee una sola vez y se evaluan todas las reglas en la misma
+pasada:
+  1. Prefiltro: LITERALS son los literales que toda regla necesita
+     (password, sk-, select, shell=true, http://...); se buscan con
+     str.find sobre el texto en minusculas, ~15x mas rapido que un regex
+     con alternativas y re.IGNORECASE. Sin coincidencias no hay nada mas
+     que hacer.
+  2. Solo las lineas con algun literal se evaluan contra los regex
+     completos de cada regla.
+Los resultados se cachean por archivo en un ScanCache: en memoria durante
+la sesion y, con ruta, en disco entre sesiones (conftest.py lo guarda en
+.pytest_cache). Cada entrada guarda tamano, mtime y sha256 del contenido:
+  - tamano y mtime iguales: se reutiliza sin leer el archivo
+  - cambio el mtime pero no el contenido (checkout, touch): se lee y se
+    hashea, pero no se vuelve a escanear
+  - cambio el contenido: se escanea
+Un mtime muy cercano al momento del escaneo no es confiable (el archivo
+pudo cambiar de nuevo en el mismo tick del reloj): esas entradas se
+verifican por hash la proxima vez. Cambiar RULES o LITERALS cambia
+RULESET_VERSION e invalida el cache completo.
+"""
+
+import bisect
+import hashlib
+import itertools
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+# Regla -> patrones (una linea viola la regla si alguno coincide)
+RULES = {
+    "hardcoded_password": [
+        re.compile(r"""(?:password|passwd|pwd)\s*=\s*["'][^"']+["']""", re.IGNORECASE),
+    ],
+    "api_key": [
+        re.compile(r"""["']sk-[a-zA-Z0-9]{10,}["']"""),
+        re.compile(r"""api_key\s*=\s*["'][a-zA-Z0-9]{10,}["']""", re.IGNORECASE),
+        re.compile(r"""token\s*=\s*["'][a-zA-Z0-9]{20,}["']""", re.IGNORECASE),
+    ],
+    "sql_formatting": [re.compile(r"""f["']SELECT""", re.IGNORECASE)],
+    "shell_true": [re.compile(re.escape("shell=True"))],
+    "pickle_loads": [re.compile(re.escape("pickle.loads"))],
+    "debug_mode": [re.compile(re.escape("debug=True"))],
+    "http_url": [re.compile(r"http://(?!localhost|127\.0\.0\.1|0\.0\.0\.0|10\.|192\.168\.)")],
+}
+
+# Todo match de una regla contiene alguno de estos literales (sin distinguir
+# mayusculas): una linea sin ninguno no puede violar ninguna regla
+LITERALS = (
+    "password", "passwd", "pwd", "sk-", "api_key", "token", "select",
+    "shell=true", "pickle.loads", "debug=true", "http://",
+)
+_LITERALS_RE = re.compile("|".join(map(re.escape, LITERALS)), re.IGNORECASE)
+
+RULESET_VERSION = hashlib.sha256(repr((
+    LITERALS, [(rule, [(p.pattern, p.flags) for p in patterns]) for rule, patterns in RULES.items()]
+)).encode()).hexdigest()[:16]
+
+# mtime a menos de esto del escaneo: la entrada se verifica por hash
+RACY_NS = 2_000_000_000
+
+
+def _literal_offsets(text):
+    """Posiciones de LITERALS en el texto, sin distinguir mayusculas."""
+    lower = text.lower()
+    if len(lower) != len(text):
+        # Algunos caracteres cambian de largo al pasar a minusculas (U+0130):
+        # los offsets no servirian, se usa el regex
+        return [m.start() for m in _LITERALS_RE.finditer(text)]
+    offsets = []
+    for literal in LITERALS:
+        i = lower.find(literal)
+        while i != -1:
+            offsets.append(i)
+            i = lower.find(literal, i + 1)
+    return offsets
+
+
+def scan_text(text):
+    """{regla: [(lineno, linea)]} para un archivo; omite lineas comentadas (#)."""
+    hits = _literal_offsets(text)
+    if not hits:
+        return {}
+    lines = text.splitlines(keepends=True)
+    # Offset donde termina cada linea (mismos separadores que splitlines())
+    ends = list(itertools.accumulate(len(line) for line in lines))
+    findings = {}
+    for index in sorted({bisect.bisect_right(ends, offset) for offset in hits}):
+        line = lines[index].splitlines()[0]
+        if line.lstrip().startswith("#"):
+            continue
+        for rule, patterns in RULES.items():
+            if any(p.search(line) for p in patterns):
+                findings.setdefault(rule, []).append((index + 1, line))
+    return findings
+
+
+class ScanCache:
+    """Hallazgos por archivo: ruta -> [tamano, mtime_ns, sha256, confiable, hallazgos].
+
+    Sin `path` vive solo en memoria; con `path` se carga de ese JSON (si es
+    de la misma RULESET_VERSION) y save() lo reescribe si hubo cambios.
+    """
+
+    def __init__(self, path=None):
+        self.path = None if path is None else Path(path)
+        self.files = {}
+        self.stats = {"hits": 0, "rehashed": 0, "scanned": 0}
+        self._dirty = False
+        self._seen = set()
+        if self.path is not None:
+            try:
+                data = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                data = {}
+            if data.get("ruleset") == RULESET_VERSION:
+                self.files = data["files"]
+
+    def findings(self, path):
+        key = str(path)
+        self._seen.add(key)
+        stat = os.stat(path)
+        entry = self.files.get(key)
+        if entry is not None and entry[3] and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            self.stats["hits"] += 1
+            return entry[4]
+        data = Path(path).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry[2] == digest:
+            self.stats["rehashed"] += 1
+            findings = entry[4]
+        else:
+            self.stats["scanned"] += 1
+            findings = {
+                rule: [list(hit) for hit in hits]
+                for rule, hits in scan_text(data.decode("utf-8", errors="ignore")).items()
+            }
+        trusted = time.time_ns() - stat.st_mtime_ns > RACY_NS
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, digest, trusted, findings]
+        self._dirty = True
+        return findings
+
+    def save(self):
+        """Escribe el cache si cambio; descarta archivos que ya no existen."""
+        if self.path is None:
+            return
+        gone = [key for key in self.files if key not in self._seen and not os.path.exists(key)]
+        for key in gone:
+            del self.files[key]
+        if not (self._dirty or gone):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", dir=self.path.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"ruleset": RULESET_VERSION, "files": self.files}, f,
+                      ensure_ascii=False, separators=(",", ":"))
+        # rename atomico: dos sesiones de pytest en paralelo no dejan JSON roto
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+_memory = ScanCache()
+
+
+def scan_file(path, cache=None):
+    """{regla: [[lineno, linea]]} de un archivo, cacheado mientras no cambie."""
+    return (_memory if cache is None else cache).findings(path)
+
+
+def scan_files(paths, cache=None):
+    """{regla: [(ruta, lineno, linea)]} con todas las reglas (listas vacias incluidas)."""
+    findings = {rule: [] for rule in RULES}
+    for path in paths:
+        for rule, hits in scan_file(path, cache).items():
+            findings[rule].extend((path, lineno, line) for lineno, line in hits)
+    return findings
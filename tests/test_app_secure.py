@@ -0,0 +1,1205 @@
+"""
+Tests funcionales de vulnerable_app/app_secure.py
+Bunker DevSecOps Workshop — Tribu | Hacklab Bogota | Ethereum Bogota
+
+Verifican que las optimizaciones de rendimiento mantienen las correcciones
+de seguridad. Se saltan si Flask no esta instalado (el job de CI de
+seguridad solo instala pytest).
+
+Ejecutar:
+    pytest tests/test_app_secure.py -v
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import ClassVar
+
+import pytest
+
+pytest.importorskip("flask")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "vulnerable_app"))
+
+import app_secure
+from secure_cache import FileContentCache, TTLCache
+from secure_db import ConnectionPool, PoolTimeout, ensure_unique_index
+from secure_fetch import (
+    HTTPClient,
+    HTTPConnectionPool,
+    RedirectNotAllowed,
+    ResponseTooLarge,
+)
+from secure_metrics import Metrics
+from secure_ping import (
+    ProbeExecutor,
+    ProbeTimeout,
+    QueueFull,
+    icmp_available,
+    icmp_probe,
+    make_native_probe,
+    tcp_probe,
+)
+from secure_ratelimit import MemoryBucketStore, RateLimiter, SQLiteBucketStore
+from secure_settings import Settings
+
+
+@pytest.fixture
+def users_db(tmp_path):
+    """Base de datos users.db temporal con dos usuarios."""
+    path = tmp_path / "users.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, email TEXT)")
+    conn.executemany(
+        "INSERT INTO users (username, email) VALUES (?, ?)",
+        [("alice", "alice@example.com"), ("bob", "bob@example.com")],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def client(users_db, tmp_path):
+    """Cliente de pruebas de una app (create_app) sobre la DB temporal."""
+    app = app_secure.create_app(Settings(
+        users_db_path=str(users_db),
+        db_pool_size=2,
+        db_pool_timeout=1,
+        user_cache_size=16,
+        user_cache_ttl=60,
+        base_data_dir=tmp_path / "data",
+        rate_limit_enabled=True,
+    ))
+    app.config["TESTING"] = True
+    yield app.test_client()
+    app.extensions["app_secure"].close()
+
+
+def _resources(client):
+    return client.application.extensions["app_secure"]
+
+
+def _use_settings(monkeypatch, client, **changes):
+    """Settings es inmutable: el test reemplaza el objeto completo."""
+    resources = _resources(client)
+    monkeypatch.setattr(resources, "settings", replace(resources.settings, **changes))
+
+
+class TestConnectionPool:
+    """FIX 2 — Pool de conexiones SQLite."""
+
+    def test_get_user_reuses_connection(self, client):
+        """Dos requests consecutivos deben reutilizar la misma conexion."""
+        assert client.get("/user/alice").get_json()["user"][1] == "alice"
+        assert client.get("/user/bob").get_json()["user"][1] == "bob"
+        stats = client.get("/stats").get_json()["db_pool"]
+        # Una sola conexion creada (chequeo de indice) y reutilizada despues
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+        assert stats["size"] == 1
+
+    def test_sql_injection_payload_still_harmless(self, client):
+        """El pool no cambia la parametrizacion: ' OR 1=1 -- no devuelve filas."""
+        response = client.get("/user/' OR 1=1 --")
+        assert response.status_code == 200
+        assert response.get_json()["user"] is None
+
+    def test_pool_uses_wal(self, users_db):
+        pool = ConnectionPool(str(users_db), max_size=1)
+        with pool.connection() as conn:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        pool.close_all()
+        assert mode == "wal"
+
+    def test_pool_is_bounded(self, users_db):
+        """Con el pool lleno, acquire espera y luego falla con PoolTimeout."""
+        pool = ConnectionPool(str(users_db), max_size=1, timeout=0.05)
+        conn = pool.acquire()
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        pool.release(conn)
+        assert pool.stats()["timeouts"] == 1
+        pool.close_all()
+
+    def test_waiter_gets_released_connection(self, users_db):
+        pool = ConnectionPool(str(users_db), max_size=1, timeout=2)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, args=(conn,))
+        timer.start()
+        assert pool.acquire() is conn
+        timer.join()
+        stats = pool.stats()
+        assert stats["waits"] == 1
+        assert stats["wait_seconds_max"] > 0
+        pool.release(conn)
+        pool.close_all()
+
+
+class TestUserCache:
+    """FIX 2 — Indice UNIQUE + cache read-through de usuarios."""
+
+    def test_unique_index_created_once(self, users_db):
+        pool = ConnectionPool(str(users_db), max_size=1)
+        assert ensure_unique_index(pool, "users", "username") == "created"
+        assert ensure_unique_index(pool, "users", "username") == "present"
+        pool.close_all()
+
+    def test_duplicates_fall_back_to_plain_index(self, users_db):
+        conn = sqlite3.connect(users_db)
+        conn.execute("INSERT INTO users (username, email) VALUES ('alice', 'dup')")
+        conn.commit()
+        conn.close()
+        pool = ConnectionPool(str(users_db), max_size=1)
+        assert ensure_unique_index(pool, "users", "username") == "non-unique"
+        assert ensure_unique_index(pool, "users", "username") == "non-unique"
+        pool.close_all()
+
+    def test_missing_db_is_not_created(self, tmp_path):
+        pool = ConnectionPool(str(tmp_path / "nope.db"), max_size=1)
+        assert ensure_unique_index(pool, "users", "username") == "unavailable"
+        assert not (tmp_path / "nope.db").exists()
+
+    def test_repeated_lookups_hit_cache(self, client):
+        for _ in range(3):
+            client.get("/user/alice")
+        client.get("/user/ghost")
+        client.get("/user/ghost")
+        stats = client.get("/stats").get_json()
+        assert stats["user_cache"]["hits"] == 3
+        assert stats["user_cache"]["misses"] == 2
+        # 1 checkout del chequeo de indice + 2 consultas reales
+        assert stats["db_pool"]["hits"] + stats["db_pool"]["misses"] == 3
+
+    def test_write_to_db_invalidates_cache(self, client, users_db):
+        assert client.get("/user/carol").get_json()["user"] is None
+        conn = sqlite3.connect(users_db)
+        conn.execute("INSERT INTO users (username, email) VALUES ('carol', 'c@example.com')")
+        conn.commit()
+        conn.close()
+        assert client.get("/user/carol").get_json()["user"][1] == "carol"
+        assert client.get("/stats").get_json()["user_cache"]["invalidations"] >= 1
+
+    def test_ttl_expiry(self):
+        now = [0.0]
+        cache = TTLCache(max_entries=2, ttl=5, clock=lambda: now[0])
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        now[0] = 6.0
+        assert cache.get("a") is None
+        assert cache.stats()["expired"] == 1
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+
+class TestUsersBatch:
+    """FIX 2 — Lookup batch de usuarios en una sola query."""
+
+    def test_batch_returns_map_with_missing_users(self, client):
+        response = client.post("/users/batch", json={"usernames": ["alice", "ghost", "bob"]})
+        assert response.status_code == 200
+        users = response.get_json()["users"]
+        assert users["alice"][1] == "alice"
+        assert users["bob"][1] == "bob"
+        assert users["ghost"] is None
+
+    def test_batch_uses_one_query_per_chunk(self, client, monkeypatch):
+        _use_settings(monkeypatch, client, users_batch_chunk=2)
+        client.post("/users/batch", json={"usernames": ["alice", "bob", "x", "y", "z"]})
+        stats = client.get("/stats").get_json()["db_pool"]
+        # 1 checkout del chequeo de indice + 3 chunks
+        assert stats["hits"] + stats["misses"] == 4
+
+    def test_batch_injection_payload_harmless(self, client):
+        payload = ["alice') OR 1=1 --", "' OR '1'='1"]
+        users = client.post("/users/batch", json={"usernames": payload}).get_json()["users"]
+        assert users == {p: None for p in payload}
+
+    def test_batch_rejects_invalid_body(self, client):
+        assert client.post("/users/batch", json={"usernames": "alice"}).status_code == 400
+        assert client.post("/users/batch", json={"usernames": [1, 2]}).status_code == 400
+        assert client.post("/users/batch", data="nope").status_code == 400
+
+    def test_batch_size_limit(self, client, monkeypatch):
+        _use_settings(monkeypatch, client, users_batch_max=3)
+        response = client.post("/users/batch", json={"usernames": ["a", "b", "c", "d"]})
+        assert response.status_code == 413
+
+    def test_large_batch_is_streamed(self, client, monkeypatch):
+        _use_settings(monkeypatch, client, users_batch_stream_min=2)
+        response = client.post("/users/batch", json={"usernames": ["alice", "ghost", "bob"]})
+        assert response.is_streamed
+        users = json.loads(response.get_data(as_text=True))["users"]
+        assert list(users) == ["alice", "ghost", "bob"]
+        assert users["ghost"] is None
+
+
+class TestPingExecutor:
+    """FIX 3 — /ping con pool acotado, cola limitada y coalescing por host."""
+
+    @pytest.fixture
+    def blocked_probe(self):
+        """Probe falso que queda bloqueado hasta que el test lo libere."""
+        release = threading.Event()
+        calls = []
+
+        def probe(host):
+            calls.append(host)
+            release.wait(5)
+            return {"output": f"pong {host}"}
+
+        yield probe, release, calls
+        release.set()
+
+    def test_same_host_is_coalesced(self, blocked_probe):
+        probe, release, calls = blocked_probe
+        executor = ProbeExecutor(probe, max_workers=2, max_pending=2)
+        first = executor.submit("10.0.0.1")
+        second = executor.submit("10.0.0.1")
+        assert first is second
+        release.set()
+        assert first.result(timeout=5) == {"output": "pong 10.0.0.1"}
+        assert calls == ["10.0.0.1"]
+        assert executor.stats()["coalesced"] == 1
+        executor.shutdown()
+
+    def test_queue_cap_rejects(self, blocked_probe):
+        probe, release, _calls = blocked_probe
+        executor = ProbeExecutor(probe, max_workers=1, max_pending=2)
+        executor.submit("10.0.0.1")
+        executor.submit("10.0.0.2")
+        with pytest.raises(QueueFull):
+            executor.submit("10.0.0.3")
+        release.set()
+        executor.shutdown()
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["inflight"] == 0
+
+    def test_ping_route_returns_429_when_full(self, client, monkeypatch, blocked_probe):
+        probe, release, _calls = blocked_probe
+        executor = ProbeExecutor(probe, max_workers=1, max_pending=1)
+        monkeypatch.setattr(_resources(client), "ping_executor", executor)
+        executor.submit("10.0.0.1")
+        response = client.get("/ping?host=10.0.0.2")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        release.set()
+        executor.shutdown()
+
+    def test_ping_route_still_validates(self, client):
+        assert client.get("/ping?host=127.0.0.1;id").status_code == 400
+        assert client.get("/ping?host=999.1.1.1").status_code == 400
+
+    def test_ping_route_uses_executor(self, client, monkeypatch):
+        executor = ProbeExecutor(lambda host: {"output": f"pong {host}"})
+        monkeypatch.setattr(_resources(client), "ping_executor", executor)
+        response = client.get("/ping?host=10.1.2.3")
+        assert response.get_json() == {"output": "pong 10.1.2.3"}
+        executor.shutdown()
+
+
+class TestPingCache:
+    """FIX 3 — Cache de resultados de /ping con TTL corto."""
+
+    def test_result_is_cached(self):
+        calls = []
+        executor = ProbeExecutor(
+            lambda host: calls.append(host) or {"output": "pong"},
+            cache=TTLCache(max_entries=8, ttl=60),
+        )
+        assert executor.submit("10.0.0.1").result(timeout=5) == {"output": "pong"}
+        assert executor.submit("10.0.0.1").result(timeout=5) == {"output": "pong"}
+        assert calls == ["10.0.0.1"]
+        assert executor.stats()["cache"]["hits"] == 1
+        executor.shutdown()
+
+    def test_timeouts_are_negatively_cached(self):
+        calls = []
+
+        def probe(host):
+            calls.append(host)
+            raise ProbeTimeout("Ping timed out")
+
+        executor = ProbeExecutor(probe, cache=TTLCache(ttl=60), negative_ttl=30)
+        for _ in range(2):
+            with pytest.raises(ProbeTimeout):
+                executor.submit("10.0.0.9").result(timeout=5)
+        assert calls == ["10.0.0.9"]
+        executor.shutdown()
+
+    def test_negative_cache_disabled(self):
+        calls = []
+
+        def probe(host):
+            calls.append(host)
+            raise ProbeTimeout("Ping timed out")
+
+        executor = ProbeExecutor(probe, cache=TTLCache(ttl=60), negative_ttl=0)
+        for _ in range(2):
+            with pytest.raises(ProbeTimeout):
+                executor.submit("10.0.0.9").result(timeout=5)
+        assert len(calls) == 2
+        executor.shutdown()
+
+    def test_unreachable_results_use_negative_ttl(self):
+        calls = []
+
+        def probe(host):
+            calls.append(host)
+            return {"host": host, "reachable": host.endswith(".1"), "loss_pct": 0.0}
+
+        now = [0.0]
+        executor = ProbeExecutor(probe, cache=TTLCache(ttl=60, clock=lambda: now[0]), negative_ttl=30)
+        for host in ("10.0.0.1", "10.0.0.2", "10.0.0.2"):
+            executor.submit(host).result(timeout=5)
+        assert calls == ["10.0.0.1", "10.0.0.2"]
+        # 100% de perdida: expira con negative_ttl, no con el TTL completo
+        now[0] = 31.0
+        for host in ("10.0.0.1", "10.0.0.2"):
+            executor.submit(host).result(timeout=5)
+        assert calls == ["10.0.0.1", "10.0.0.2", "10.0.0.2"]
+        executor.shutdown()
+
+        executor = ProbeExecutor(probe, cache=TTLCache(ttl=60), negative_ttl=0)
+        for _ in range(2):
+            executor.submit("10.0.0.2").result(timeout=5)
+        assert calls[3:] == ["10.0.0.2", "10.0.0.2"]
+        executor.shutdown()
+
+    def test_probe_error_returns_502(self, client, monkeypatch):
+        def probe(host):
+            raise FileNotFoundError("ping")
+
+        executor = ProbeExecutor(probe)
+        monkeypatch.setattr(_resources(client), "ping_executor", executor)
+        response = client.get("/ping?host=10.0.0.9")
+        assert response.status_code == 502
+        assert response.get_json() == {"error": "Probe failed"}
+        executor.shutdown()
+
+    def test_cached_timeout_returns_504(self, client, monkeypatch):
+        def probe(host):
+            raise ProbeTimeout("Ping timed out")
+
+        executor = ProbeExecutor(probe, cache=TTLCache(ttl=60), negative_ttl=30)
+        monkeypatch.setattr(_resources(client), "ping_executor", executor)
+        assert client.get("/ping?host=10.0.0.9").status_code == 504
+        assert client.get("/ping?host=10.0.0.9").status_code == 504
+        assert executor.stats()["submitted"] == 1
+        executor.shutdown()
+
+
+class TestNativeProbes:
+    """FIX 3 — Probes nativos sin fork de /bin/ping (solo loopback, sin red)."""
+
+    def test_tcp_probe_open_port(self):
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen()
+            port = server.getsockname()[1]
+            result = tcp_probe("127.0.0.1", port=port, count=3, timeout=1)
+        assert result["reachable"] is True
+        assert result["sent"] == 3
+        assert result["received"] == 3
+        assert result["loss_pct"] == 0.0
+        assert result["rtt_ms"]["min"] <= result["rtt_ms"]["avg"] <= result["rtt_ms"]["max"]
+
+    def test_tcp_probe_closed_port_counts_as_reachable(self):
+        with socket.socket() as tmp:
+            tmp.bind(("127.0.0.1", 0))
+            port = tmp.getsockname()[1]
+        result = tcp_probe("127.0.0.1", port=port, timeout=1)
+        assert result["reachable"] is True
+        assert result["port"] == port
+
+    @pytest.mark.skipif(not icmp_available(), reason="ICMP datagram sockets no permitidos")
+    def test_icmp_probe_loopback(self):
+        result = icmp_probe("127.0.0.1", count=2, timeout=1)
+        assert result["method"] == "icmp"
+        assert result["received"] == 2
+
+    def test_icmp_send_error_is_unreachable(self, monkeypatch):
+        class Sock:
+            def __init__(self, *args):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def sendto(self, packet, address):
+                raise PermissionError(13, "Permission denied")
+
+        monkeypatch.setattr("secure_ping.socket.socket", Sock)
+        result = icmp_probe("255.255.255.255", count=2, timeout=1)
+        assert result["reachable"] is False
+        assert (result["sent"], result["received"], result["loss_pct"]) == (2, 0, 100.0)
+        assert result["error"] == "Permission denied"
+
+    def test_auto_mode_falls_back_to_tcp(self, monkeypatch):
+        monkeypatch.setattr("secure_ping.icmp_available", lambda: False)
+        result = make_native_probe("auto", timeout=1, tcp_port=9)("127.0.0.1")
+        assert result["method"] == "tcp"
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            make_native_probe("exec")
+
+    def test_ping_route_returns_structured_result(self, client, monkeypatch):
+        executor = ProbeExecutor(make_native_probe("tcp", timeout=1, tcp_port=9))
+        monkeypatch.setattr(_resources(client), "ping_executor", executor)
+        body = client.get("/ping?host=127.0.0.1").get_json()
+        assert body["host"] == "127.0.0.1"
+        assert body["reachable"] is True
+        assert "output" not in body
+        executor.shutdown()
+
+
+class TestPingBatch:
+    """FIX 3 — /ping/batch: barrido concurrente con salida NDJSON."""
+
+    @pytest.fixture
+    def slow_executor(self, client, monkeypatch):
+        def probe(host):
+            time.sleep(0.2)
+            return {"output": f"pong {host}"}
+
+        executor = ProbeExecutor(probe, max_workers=64, max_pending=256)
+        monkeypatch.setattr(_resources(client), "ping_batch_executor", executor)
+        yield executor
+        executor.shutdown()
+
+    def test_cidr_sweep_runs_concurrently(self, client, slow_executor):
+        start = time.monotonic()
+        response = client.post("/ping/batch", json={"cidr": "10.0.0.0/26"})
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        elapsed = time.monotonic() - start
+        assert response.mimetype == "application/x-ndjson"
+        assert len(lines) == 62
+        assert {line["host"] for line in lines} == {f"10.0.0.{i}" for i in range(1, 63)}
+        # 62 probes de 0.2s en paralelo: muy lejos de 62 * 0.2 = 12.4s
+        assert elapsed < 2
+
+    def test_fanout_limit_is_respected(self, client, slow_executor, monkeypatch):
+        _use_settings(monkeypatch, client, ping_batch_fanout=2)
+        start = time.monotonic()
+        response = client.post("/ping/batch", json={"hosts": ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"]})
+        assert len(response.get_data(as_text=True).splitlines()) == 4
+        assert time.monotonic() - start >= 0.4
+
+    def test_each_host_is_validated(self, client, slow_executor):
+        response = client.post("/ping/batch", json={"hosts": ["10.0.0.1", "10.0.0.1;id"]})
+        assert response.status_code == 400
+        assert response.get_json()["host"] == "10.0.0.1;id"
+        assert slow_executor.stats()["submitted"] == 0
+
+    def test_limits(self, client, slow_executor, monkeypatch):
+        _use_settings(monkeypatch, client, ping_batch_max_hosts=4)
+        assert client.post("/ping/batch", json={"cidr": "10.0.0.0/24"}).status_code == 413
+        assert client.post("/ping/batch", json={"cidr": "10.0.0.0/99"}).status_code == 400
+        assert client.post("/ping/batch", json={"hosts": "10.0.0.1"}).status_code == 400
+
+    def test_timeouts_are_reported_per_host(self, client, monkeypatch):
+        def probe(host):
+            if host.endswith(".2"):
+                raise ProbeTimeout("Ping timed out")
+            return {"output": "pong"}
+
+        executor = ProbeExecutor(probe)
+        monkeypatch.setattr(_resources(client), "ping_batch_executor", executor)
+        response = client.post("/ping/batch", json={"hosts": ["10.0.0.1", "10.0.0.2"]})
+        lines = {line["host"]: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+        assert lines["10.0.0.1"]["output"] == "pong"
+        assert lines["10.0.0.2"]["error"] == "Ping timed out"
+        executor.shutdown()
+
+
+class TestFileStreaming:
+    """FIX 5 — /file en streaming con Range y requests condicionales."""
+
+    @pytest.fixture
+    def data_dir(self, client, tmp_path, monkeypatch):
+        base = (tmp_path / "data").resolve()
+        base.mkdir()
+        (base / "readme.txt").write_text("hola bunker\n")
+        (base / "big.bin").write_bytes(bytes(range(256)) * 64)
+        (tmp_path / "secret.txt").write_text("no")
+        _use_settings(monkeypatch, client, base_data_dir=base)
+        return base
+
+    def test_legacy_json_mode(self, client, data_dir):
+        assert client.get("/file?name=readme.txt").get_json() == {"content": "hola bunker\n"}
+
+    def test_json_mode_size_limit(self, client, data_dir, monkeypatch):
+        _use_settings(monkeypatch, client, file_json_max_bytes=1024)
+        assert client.get("/file?name=big.bin").status_code == 413
+
+    def test_raw_mode_streams_bytes(self, client, data_dir):
+        response = client.get("/file?name=big.bin&raw=1")
+        assert response.status_code == 200
+        assert response.data == (data_dir / "big.bin").read_bytes()
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.headers["ETag"]
+
+    def test_raw_mode_range(self, client, data_dir):
+        response = client.get("/file?name=big.bin&raw=1", headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.data == bytes(range(10, 20))
+
+    def test_raw_mode_conditional(self, client, data_dir):
+        first = client.get("/file?name=readme.txt&raw=1")
+        etag = first.headers["ETag"]
+        assert client.get(
+            "/file?name=readme.txt&raw=1", headers={"If-None-Match": etag}
+        ).status_code == 304
+        assert client.get(
+            "/file?name=readme.txt&raw=1",
+            headers={"If-Modified-Since": first.headers["Last-Modified"]},
+        ).status_code == 304
+
+    def test_raw_mode_keeps_traversal_checks(self, client, data_dir):
+        assert client.get("/file?name=../secret.txt&raw=1").status_code == 400
+        assert client.get("/file?name=/etc/passwd&raw=1").status_code == 400
+        assert client.get("/file?name=missing.txt&raw=1").status_code == 404
+
+
+class TestFileContentCache:
+    """FIX 5 — Cache de contenido para archivos calientes."""
+
+    def _loader(self, calls):
+        def load(path):
+            calls.append(path)
+            return Path(path).read_text()
+        return load
+
+    def test_hits_skip_reads(self, tmp_path):
+        path = tmp_path / "hot.txt"
+        path.write_text("hot")
+        calls = []
+        cache = FileContentCache(self._loader(calls))
+        assert [cache.get(path) for _ in range(3)] == ["hot"] * 3
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["bytes"] > 0
+
+    def test_caller_stat_is_reused(self, tmp_path, monkeypatch):
+        path = tmp_path / "hot.txt"
+        path.write_text("hot")
+        cache = FileContentCache(self._loader([]))
+        stat = path.stat()
+        assert cache.get(path, stat) == "hot"
+
+        def no_stat(*args, **kwargs):
+            raise AssertionError("stat repetido")
+
+        monkeypatch.setattr(os, "stat", no_stat)
+        assert cache.get(path, stat) == "hot"
+        assert cache.stats()["hits"] == 1
+
+    def test_change_is_detected(self, tmp_path):
+        path = tmp_path / "hot.txt"
+        path.write_text("v1")
+        cache = FileContentCache(self._loader([]))
+        assert cache.get(path) == "v1"
+        path.write_text("version 2")
+        assert cache.get(path) == "version 2"
+
+    def test_byte_budget_evicts_lru(self, tmp_path):
+        for name in "abc":
+            (tmp_path / name).write_text(name * 100)
+        budget = 200
+        cache = FileContentCache(self._loader([]), max_bytes=budget)
+        for name in "abc":
+            cache.get(tmp_path / name)
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= budget
+
+    def test_large_files_not_cached(self, tmp_path):
+        path = tmp_path / "big.txt"
+        path.write_text("x" * 1000)
+        cache = FileContentCache(self._loader([]), max_entry_bytes=100)
+        cache.get(path)
+        assert cache.stats()["entries"] == 0
+
+    def test_file_at_entry_limit_is_cached(self, tmp_path):
+        path = tmp_path / "limit.txt"
+        path.write_text("x" * 100)
+        cache = FileContentCache(self._loader([]), max_entry_bytes=100)
+        cache.get(path)
+        stats = cache.stats()
+        assert (stats["entries"], stats["bytes"]) == (1, 100)
+
+    def test_poller_invalidates(self, tmp_path):
+        path = tmp_path / "hot.txt"
+        path.write_text("v1")
+        calls = []
+        cache = FileContentCache(self._loader(calls), poll_interval=60)
+        cache.get(path)
+        cache.get(path)
+        path.write_text("version 2")
+        assert cache.revalidate() == 1
+        assert cache.get(path) == "version 2"
+        assert len(calls) == 2
+        cache.stop()
+
+    def test_route_serves_from_cache(self, client, tmp_path, monkeypatch):
+        base = tmp_path.resolve()
+        (base / "readme.txt").write_text("hola")
+        _use_settings(monkeypatch, client, base_data_dir=base)
+        for _ in range(3):
+            assert client.get("/file?name=readme.txt").get_json() == {"content": "hola"}
+        assert client.get("/stats").get_json()["file_cache"]["hits"] == 2
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Servidor HTTP/1.1 keep-alive con rutas fijas para probar /fetch."""
+
+    protocol_version = "HTTP/1.1"
+    hits: ClassVar[list[str]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.path == "/fresh":
+            self._send(200, b"fresh", {"Cache-Control": "max-age=60"})
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers={"ETag": '"v1"'})
+            else:
+                self._send(200, b"tagged", {"ETag": '"v1"', "Cache-Control": "no-cache"})
+        elif self.path == "/nostore":
+            self._send(200, b"secret", {"Cache-Control": "no-store, max-age=60"})
+        elif self.path == "/big":
+            self._send(200, b"x" * 4096)
+        elif self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for _ in range(8):
+                self.wfile.write(b"200\r\n" + b"y" * 512 + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        elif self.path == "/redirect":
+            self._send(302, headers={"Location": "/fresh"})
+        else:
+            self._send(404, b"not found")
+
+
+@pytest.fixture
+def stub_server():
+    """Servidor local en 127.0.0.1 (sin red externa)."""
+    _StubHandler.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestFetchClient:
+    """FIX 6 — Cliente saliente con pool keep-alive, limite y cache HTTP."""
+
+    def _client(self, **kwargs):
+        kwargs.setdefault("cache", TTLCache(max_entries=16, ttl=0))
+        return HTTPClient(HTTPConnectionPool(timeout=2), **kwargs)
+
+    def test_connections_are_reused(self, stub_server):
+        client = self._client(cache=None)
+        for _ in range(3):
+            assert client.get(stub_server + "/big").status == 200
+        pool = client.stats()["pool"]
+        assert pool["created"] == 1
+        assert pool["reused"] == 2
+
+    def test_max_age_is_served_from_cache(self, stub_server):
+        client = self._client()
+        assert client.get(stub_server + "/fresh").cache == "miss"
+        result = client.get(stub_server + "/fresh")
+        assert result.cache == "hit"
+        assert result.body == b"fresh"
+        assert _StubHandler.hits == ["/fresh"]
+
+    def test_etag_revalidation(self, stub_server):
+        client = self._client()
+        client.get(stub_server + "/etag")
+        result = client.get(stub_server + "/etag")
+        assert result.cache == "revalidated"
+        assert result.status == 200
+        assert result.body == b"tagged"
+        assert client.stats()["cache_revalidated"] == 1
+
+    def test_no_store_is_not_cached(self, stub_server):
+        client = self._client()
+        client.get(stub_server + "/nostore")
+        client.get(stub_server + "/nostore")
+        assert _StubHandler.hits == ["/nostore", "/nostore"]
+
+    def test_content_length_over_limit_aborts(self, stub_server):
+        client = self._client(max_bytes=1024)
+        with pytest.raises(ResponseTooLarge):
+            client.get(stub_server + "/big")
+
+    def test_chunked_body_over_limit_aborts(self, stub_server):
+        client = self._client(max_bytes=1024)
+        with pytest.raises(ResponseTooLarge):
+            client.get(stub_server + "/chunked")
+        assert client.stats()["too_large"] == 1
+
+    def test_redirects_follow_only_allowed_urls(self, stub_server):
+        with pytest.raises(RedirectNotAllowed):
+            self._client().get(stub_server + "/redirect")
+        allowed = self._client(url_allowed=lambda url: url.startswith(stub_server))
+        assert allowed.get(stub_server + "/redirect").body == b"fresh"
+
+    def test_route_keeps_allowlist(self, client):
+        response = client.get("/fetch?url=file:///etc/passwd")
+        assert response.status_code == 400
+        assert response.get_json()["error"].startswith("Scheme not allowed")
+        assert client.get("/fetch?url=https://evil.example/").status_code == 403
+
+    def test_route_uses_pooled_client(self, client, stub_server, monkeypatch):
+        monkeypatch.setattr(app_secure, "ALLOWED_FETCH_DOMAINS", {"127.0.0.1"})
+        monkeypatch.setattr(_resources(client), "fetch_client", self._client(max_bytes=1024))
+        assert client.get(f"/fetch?url={stub_server}/fresh").get_json() == {"content": "fresh"}
+        assert client.get(f"/fetch?url={stub_server}/big").status_code == 502
+        assert client.get(f"/fetch?url={stub_server}/missing").status_code == 502
+        stats = client.get("/stats").get_json()["fetch"]
+        assert stats["pool"]["reused"] >= 1
+
+
+class TestAppFactory:
+    """create_app(): configuracion leida una vez, indices al arrancar y recursos lazy."""
+
+    def test_settings_from_env(self, tmp_path):
+        settings = Settings.from_env({
+            "DB_POOL_SIZE": "3",
+            "USER_CACHE_TTL": "1.5",
+            "FLASK_DEBUG": "True",
+            "BASE_DATA_DIR": str(tmp_path),
+            "PING_MODE": "tcp",
+        })
+        assert settings.db_pool_size == 3
+        assert settings.user_cache_ttl == 1.5
+        assert settings.debug is True
+        assert settings.base_data_dir == tmp_path.resolve()
+        assert settings.ping_mode == "tcp"
+        assert settings.file_cache_max_entry == settings.file_json_max_bytes
+        with pytest.raises(AttributeError):
+            settings.db_pool_size = 4
+
+    def test_invalid_ping_mode_fails_at_startup(self):
+        with pytest.raises(ValueError, match="PING_MODE"):
+            Settings.from_env({"PING_MODE": "udp"})
+
+    def test_non_positive_rate_limit_is_rejected(self):
+        with pytest.raises(ValueError, match="RATE_LIMIT_ROUTE_RATE"):
+            Settings.from_env({"RATE_LIMIT_ROUTE_RATE": "0"})
+        with pytest.raises(ValueError, match="RATE_LIMIT_CLIENT_BURST"):
+            Settings(rate_limit_client_burst=-1)
+
+    def test_resources_are_created_on_first_use(self, tmp_path):
+        db = tmp_path / "users.db"
+        (tmp_path / "readme.txt").write_text("hola")
+        app = app_secure.create_app(Settings(users_db_path=str(db), base_data_dir=tmp_path))
+        resources = app.extensions["app_secure"]
+        # Crear la app solo crea el pool (para el chequeo de indices); sin DB no la crea
+        assert list(resources.built()) == ["db_pool"]
+        assert not db.exists()
+        assert app.test_client().get("/ping?host=1.2.3.4%0A").status_code == 400
+        assert list(resources.built()) == ["db_pool"]
+        assert "user_cache" not in app.test_client().get("/stats").get_json()
+        app.test_client().get("/file?name=readme.txt")
+        assert list(resources.built()) == ["db_pool", "file_cache"]
+        resources.close()
+
+    def test_unique_index_is_checked_at_startup(self, users_db):
+        app = app_secure.create_app(Settings(users_db_path=str(users_db)))
+        conn = sqlite3.connect(users_db)
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(users)")]
+        conn.close()
+        assert indexes == ["idx_users_username_unique"]
+        app.extensions["app_secure"].close()
+
+    def test_module_level_app(self):
+        assert isinstance(app_secure.app, app_secure.Flask)
+        assert app_secure.app.extensions["app_secure"].settings == Settings.from_env()
+
+    def test_lazy_resource_is_built_once(self, client):
+        resources = _resources(client)
+        pools = []
+        threads = [threading.Thread(target=lambda: pools.append(resources.db_pool)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len({id(pool) for pool in pools}) == 1
+
+class TestJsonAndCompression:
+    """JSON con fast path opcional, compresion y limite de body."""
+
+    def test_provider_matches_stdlib_output(self, client):
+        provider = client.application.json
+        data = {"b": [1, 2.5, None], "a": {"z": "ñ", "y": True}}
+        assert json.loads(provider.dumps(data)) == data
+        assert provider.loads(provider.dumps(data)) == data
+        # Enteros fuera de 64 bits: sin perder precision
+        assert provider.loads("[123456789012345678901234567890]") == [123456789012345678901234567890]
+        assert provider.loads(provider.dumps(2 ** 70)) == 2 ** 70
+
+    def test_load_roundtrip_sorted_and_compact(self, client):
+        response = client.post("/load", json={"b": 1, "a": [1, 2]})
+        assert response.get_data(as_text=True) == '{"loaded":{"a":[1,2],"b":1}}\n'
+
+    def test_body_limit_rejects_before_parsing(self, client, monkeypatch):
+        monkeypatch.setitem(client.application.config, "MAX_CONTENT_LENGTH", 64)
+        response = client.post("/load", data="[" + "1," * 100 + "1]", content_type="application/json")
+        assert response.status_code == 413
+        assert "max 64 bytes" in response.get_json()["error"]
+        assert client.post("/load", json=[1, 2]).status_code == 200
+
+    def test_large_json_is_gzipped(self, client):
+        response = client.post(
+            "/load", json={"items": ["x" * 64] * 100}, headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.headers["Content-Encoding"] in ("gzip", "br")
+        assert "Accept-Encoding" in response.headers["Vary"]
+        if response.headers["Content-Encoding"] == "gzip":
+            import gzip
+            assert json.loads(gzip.decompress(response.data))["loaded"]["items"][0] == "x" * 64
+
+    def test_small_or_unaccepted_responses_are_not_compressed(self, client):
+        small = client.post("/load", json=[1], headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in small.headers
+        plain = client.post("/load", json={"items": ["x" * 64] * 100})
+        assert "Content-Encoding" not in plain.headers
+        assert plain.get_json()["loaded"]["items"][0] == "x" * 64
+
+    def test_raw_file_is_never_compressed(self, client, tmp_path, monkeypatch):
+        base = tmp_path.resolve()
+        (base / "big.txt").write_text("a" * 10000)
+        _use_settings(monkeypatch, client, base_data_dir=base)
+        response = client.get("/file?name=big.txt&raw=1", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        assert len(response.data) == 10000
+
+class TestMetrics:
+    """Histogramas por ruta y exposicion Prometheus en /metrics."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = Metrics(buckets=(0.1, 1.0))
+        name = metrics.histogram("op_seconds", "Op.", ("op",))
+        for seconds in (0.05, 0.5, 0.5, 3.0):
+            metrics.observe(name, ("a",), seconds)
+        text = metrics.render()
+        assert '# TYPE op_seconds histogram' in text
+        assert 'op_seconds_bucket{op="a",le="0.1"} 1' in text
+        assert 'op_seconds_bucket{op="a",le="1.0"} 3' in text
+        assert 'op_seconds_bucket{op="a",le="+Inf"} 4' in text
+        assert 'op_seconds_count{op="a"} 4' in text
+        assert 'op_seconds_sum{op="a"} 4.05' in text
+
+    def test_per_thread_shards_are_merged(self):
+        metrics = Metrics()
+        hits = metrics.counter("hits_total", "Hits.")
+        in_flight = metrics.gauge("in_flight", "En curso.")
+
+        def work():
+            for _ in range(1000):
+                metrics.inc(hits)
+            metrics.add(in_flight, (), 1)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        metrics.add(in_flight, (), -3)
+        assert len(metrics._shards) == 9
+        assert metrics.collect() == {("hits_total", ()): 8000, ("in_flight", ()): 5}
+        # Los shards de los threads terminados pasan al total base
+        assert len(metrics._shards) == 1
+        metrics.inc(hits)
+        assert metrics.collect() == {("hits_total", ()): 8001, ("in_flight", ()): 5}
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        name = metrics.counter("x_total", "X.", ("v",))
+        metrics.inc(name, ('a"b\\c',))
+        assert 'x_total{v="a\\"b\\\\c"} 1' in metrics.render()
+
+    def test_metrics_endpoint(self, client):
+        client.get("/user/alice")
+        client.get("/user/bob")
+        client.get("/no/such/path")
+        client.get("/ping?host=bad")
+        response = client.get("/metrics")
+        assert response.content_type.startswith("text/plain; version=0.0.4")
+        text = response.get_data(as_text=True)
+        # La ruta es la regla, no el path: cardinalidad acotada
+        assert 'http_requests_total{method="GET",route="/user/<username>",status="200"}' in text
+        assert 'http_requests_total{method="GET",route="<unmatched>",status="404"}' in text
+        assert 'http_requests_total{method="GET",route="/ping",status="400"}' in text
+        assert 'http_request_duration_seconds_count{method="GET",route="/user/<username>"}' in text
+        assert 'app_sqlite_query_seconds_count{query="user_by_name"}' in text
+        assert 'http_requests_in_flight{route="/metrics"} 1' in text
+        assert 'http_requests_in_flight{route="/user/<username>"} 0' in text
+
+class TestRateLimit:
+    """Token buckets por cliente y por ruta, y load shedding."""
+
+    class _Clock:
+        def __init__(self):
+            self.now = 1000.0
+
+        def __call__(self):
+            return self.now
+
+    def test_bucket_refills_at_rate(self):
+        clock = self._Clock()
+        store = MemoryBucketStore(clock=clock)
+        assert [store.take("k", rate=2, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert store.take("k", rate=2, burst=3) == pytest.approx(0.5)
+        clock.now += 0.5
+        assert store.take("k", rate=2, burst=3) == 0.0
+        clock.now += 100
+        # Nunca acumula mas que burst
+        assert [store.take("k", rate=2, burst=3) for _ in range(4)][-1] > 0
+
+    def test_memory_store_is_bounded(self):
+        clock = self._Clock()
+        store = MemoryBucketStore(max_keys=10, clock=clock)
+        for i in range(50):
+            store.take(f"k{i}", rate=1, burst=1)
+        assert len(store) <= 10
+
+    def test_memory_store_evicts_by_own_refill_time(self):
+        clock = self._Clock()
+        store = MemoryBucketStore(clock=clock)
+        store.take("slow", rate=0.01, burst=5)   # se llena en 500s
+        store.take("fast", rate=10, burst=5)     # se llena en 0.5s
+        clock.now += 10
+        store.take("fast", rate=10, burst=5)
+        # "slow" sigue sin llenarse: no se descarta aunque sea el mas viejo
+        assert len(store) == 2
+        assert store.take("slow", rate=0.01, burst=5, cost=5) > 0
+        clock.now += 1000
+        store.take("other", rate=1, burst=1)
+        assert len(store) == 1
+
+    def test_rejected_request_consumes_no_tokens(self):
+        clock = self._Clock()
+        limiter = RateLimiter(MemoryBucketStore(clock=clock), {"/ping": 1},
+                              client_rate=0.01, client_burst=2, route_rate=0.01, route_burst=1)
+        assert limiter.admit("/ping", "10.0.0.1") is None
+        limiter.release("/ping")
+        # El bucket de la ruta rechaza: el del cliente no se debe cobrar
+        for _ in range(3):
+            assert limiter.admit("/ping", "10.0.0.1")[1] == 503
+        clock.now += 100
+        assert limiter.admit("/ping", "10.0.0.1") is None
+        limiter.release("/ping")
+        assert limiter.stats()["limited_client"] == 0
+
+    def test_client_limit_returns_429(self, client, monkeypatch):
+        _use_settings(monkeypatch, client, base_data_dir=Path("/nonexistent"))
+        limiter = _resources(client).rate_limiter
+        monkeypatch.setattr(limiter, "client_burst", 2)
+        monkeypatch.setattr(limiter, "client_rate", 0.5)
+        statuses = [client.get("/file?name=x.txt").status_code for _ in range(3)]
+        assert statuses == [404, 404, 429]
+        response = client.get("/file?name=x.txt")
+        assert response.headers["Retry-After"] == "2"
+        assert response.get_json() == {"error": "Rate limit exceeded"}
+        # Otro cliente tiene su propio bucket; rutas sin limite no se afectan
+        other = client.get("/file?name=x.txt", environ_base={"REMOTE_ADDR": "10.9.9.9"})
+        assert other.status_code == 404
+        assert client.get("/user/alice").status_code == 200
+        assert client.get("/stats").get_json()["rate_limit"]["limited_client"] == 2
+
+    def test_route_limit_sheds_with_503(self, client, monkeypatch):
+        limiter = _resources(client).rate_limiter
+        monkeypatch.setattr(limiter, "route_burst", 2)
+        monkeypatch.setattr(limiter, "route_rate", 0.1)
+        for i in range(2):
+            client.get("/fetch?url=file:///x", environ_base={"REMOTE_ADDR": f"10.0.0.{i}"})
+        response = client.get("/fetch?url=file:///x", environ_base={"REMOTE_ADDR": "10.0.0.9"})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_inflight_cap_sheds_and_releases(self, client, monkeypatch):
+        limiter = _resources(client).rate_limiter
+        monkeypatch.setattr(limiter, "max_inflight", 1)
+        assert limiter.admit("/ping", "10.0.0.1") is None
+        _payload, status, headers = limiter.admit("/ping", "10.0.0.2")
+        assert (status, headers["Retry-After"]) == (503, "1")
+        assert client.get("/ping?host=bad").status_code == 503
+        limiter.release("/ping")
+        response = client.get("/ping?host=bad")
+        assert response.status_code == 400
+        # El slot se libera cuando el servidor cierra la respuesta
+        assert limiter.stats()["inflight"] == {"/ping": 1}
+        response.close()
+        assert limiter.stats()["inflight"] == {}
+
+    def test_streamed_response_holds_slot_until_closed(self, client, monkeypatch):
+        executor = ProbeExecutor(lambda host: {"output": "pong"})
+        monkeypatch.setattr(_resources(client), "ping_batch_executor", executor)
+        limiter = _resources(client).rate_limiter
+        response = client.post("/ping/batch", json={"hosts": ["10.0.0.1", "10.0.0.2"]})
+        assert limiter.stats()["inflight"] == {"/ping/batch": 1}
+        assert len(response.get_data(as_text=True).splitlines()) == 2
+        response.close()
+        assert limiter.stats()["inflight"] == {}
+        executor.shutdown()
+
+    def test_sqlite_store_is_shared_between_workers(self, tmp_path):
+        """Dos limitadores (dos workers) sobre el mismo archivo: un solo presupuesto."""
+        path = tmp_path / "ratelimit.db"
+        workers = [
+            RateLimiter(SQLiteBucketStore(path), {"/ping": 1}, client_rate=0.01, client_burst=3)
+            for _ in range(2)
+        ]
+        results = [workers[i % 2].admit("/ping", "10.0.0.1") for i in range(4)]
+        for i, result in enumerate(results):
+            if result is None:
+                workers[i % 2].release("/ping")
+        assert results[:3] == [None, None, None]
+        assert results[3][1] == 429
+        assert len(SQLiteBucketStore(path)) == 2
+
+    def test_disabled_by_default(self, users_db):
+        app = app_secure.create_app(Settings(users_db_path=str(users_db)))
+        limiter = app.extensions["app_secure"].rate_limiter
+        limiter.max_inflight = 0
+        assert app.test_client().get("/ping?host=bad").status_code == 400
+
+class TestAsgiApp:
+    """Variante ASGI (Quart): mismas respuestas que la app WSGI."""
+
+    @pytest.fixture
+    def asgi_app(self, users_db, tmp_path, monkeypatch):
+        pytest.importorskip("quart")
+        import app_secure_asgi
+
+        data = (tmp_path / "data").resolve()
+        data.mkdir()
+        (data / "readme.txt").write_text("hola bunker\n")
+        monkeypatch.setenv("USERS_DB_PATH", str(users_db))
+        monkeypatch.setenv("BASE_DATA_DIR", str(data))
+        monkeypatch.setenv("RATE_LIMIT_ENABLED", "true")
+        return app_secure_asgi.create_app()
+
+    @staticmethod
+    def _run(app, scenario):
+        import asyncio
+
+        async def main():
+            async with app.test_app():
+                return await scenario(app.test_client())
+
+        return asyncio.run(main())
+
+    def test_routes_match_wsgi(self, asgi_app):
+        async def scenario(client):
+            user = await client.get("/user/alice")
+            batch = await client.post("/users/batch", json={"usernames": ["bob", "zoe"]})
+            bad_ping = await client.get("/ping?host=127.0.0.1;id")
+            file = await client.get("/file?name=readme.txt")
+            traversal = await client.get("/file?name=../users.db")
+            return (
+                (user.status_code, await user.get_json()),
+                (batch.status_code, await batch.get_json()),
+                (bad_ping.status_code, await bad_ping.get_json()),
+                (file.status_code, await file.get_json()),
+                traversal.status_code,
+            )
+
+        user, batch, bad_ping, file, traversal = self._run(asgi_app, scenario)
+        assert user == (200, {"user": [1, "alice", "alice@example.com"]})
+        assert batch[0] == 200
+        assert batch[1]["users"]["bob"][1] == "bob"
+        assert batch[1]["users"]["zoe"] is None
+        assert bad_ping == (400, {"error": "Invalid IP address format"})
+        assert file == (200, {"content": "hola bunker\n"})
+        assert traversal == 400
+
+    def test_metrics_rate_limit_and_compression(self, asgi_app):
+        import gzip
+
+        limiter = asgi_app.extensions["app_secure"].rate_limiter
+        limiter.client_burst = 2
+        limiter.client_rate = 0.01
+
+        async def scenario(client):
+            statuses = [(await client.get("/file?name=readme.txt")).status_code for _ in range(3)]
+            usernames = [f"user{i:03d}" for i in range(150)]
+            batch = await client.post("/users/batch", json={"usernames": usernames},
+                                      headers={"Accept-Encoding": "gzip"})
+            metrics_text = await (await client.get("/metrics")).get_data(as_text=True)
+            stats = await (await client.get("/stats")).get_json()
+            body = gzip.decompress(await batch.get_data())
+            return statuses, batch.headers.get("Content-Encoding"), body, metrics_text, stats
+
+        statuses, encoding, body, text, stats = self._run(asgi_app, scenario)
+        assert statuses == [200, 200, 429]
+        assert encoding == "gzip"
+        assert json.loads(body)["users"]["user149"] is None
+        assert 'http_requests_total{method="GET",route="/file",status="429"}' in text
+        assert 'app_sqlite_query_seconds_count{query="users_batch"}' in text
+        assert stats["rate_limit"]["limited_client"] == 1
+        assert stats["rate_limit"]["inflight"] == {}
+        assert {"db_pool", "user_cache", "file_cache", "compression", "json"} <= set(stats)
+
+
+    def test_streamed_ping_batch_releases_slot(self, asgi_app, monkeypatch):
+        resources = asgi_app.extensions["app_secure"]
+        seen = []
+
+        def probe(host):
+            # Corre mientras el cuerpo se esta enviando
+            seen.append(resources.rate_limiter.stats()["inflight"])
+            return {"output": "pong"}
+
+        executor = ProbeExecutor(probe)
+        monkeypatch.setattr(resources, "ping_batch_executor", executor)
+
+        async def scenario(client):
+            response = await client.post("/ping/batch", json={"hosts": ["10.0.0.1", "10.0.0.2"]})
+            return (await response.get_data(as_text=True)).splitlines()
+
+        lines = self._run(asgi_app, scenario)
+        assert len(lines) == 2
+        assert seen == [{"/ping/batch": 1}] * 2
+        assert resources.rate_limiter.stats()["inflight"] == {}
+        executor.shutdown()
@@ -0,0 +1,712 @@
+"""
+Tests de scripts/update_dashboard_status.py
+Bunker DevSecOps Workshop — Tribu | Hacklab Bogota | Ethereum Bogota
+
+Los jobs del pipeline llaman al script en paralelo: ninguna actualizacion
+se debe perder y status.json nunca debe quedar truncado.
+
+Ejecutar:
+    pytest tests/test_dashboard_status.py -v
+"""
+
+import http.client
+import importlib.util
+import json
+import multiprocessing
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = REPO_ROOT / "scripts" / "update_dashboard_status.py"
+
+# El script importa dashboard_model desde su propio directorio
+sys.path.insert(0, str(SCRIPT.parent))
+_spec = importlib.util.spec_from_file_location("update_dashboard_status", SCRIPT)
+uds = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(uds)
+
+WRITERS = 8
+ENTRIES_PER_WRITER = 40
+
+
+def apply_patch(doc, ops):
+    """Aplicacion de referencia de los patches (igual que dashboard.html)."""
+    for op in ops:
+        if op["path"] == "":
+            doc = op["value"]
+            continue
+        *parents, key = [k.replace("~1", "/").replace("~0", "~") for k in op["path"].split("/")[1:]]
+        node = doc
+        for k in parents:
+            node = node[int(k)] if isinstance(node, list) else node[k]
+        if isinstance(node, list):
+            if op["op"] == "add":
+                node.insert(int(key), op["value"])
+            elif op["op"] == "remove":
+                del node[int(key)]
+            else:
+                node[int(key)] = op["value"]
+        elif op["op"] == "remove":
+            del node[key]
+        else:
+            node[key] = op["value"]
+    return doc
+
+
+def _writer(path, worker):
+    for i in range(ENTRIES_PER_WRITER):
+        uds.cmd_log(path, "info", "stress", f"{worker}:{i}")
+        stage = list(uds.INITIAL_STATUS["pipeline"]["stages"])[worker % 6]
+        uds.cmd_stage(path, stage, "running", i)
+
+
+@pytest.fixture
+def status_path(tmp_path):
+    path = tmp_path / "status.json"
+    uds.cmd_reset(str(path))
+    return path
+
+
+class TestLoadAndSave:
+    def test_fallback_is_deep_copy(self, tmp_path):
+        data = uds.load_status(tmp_path / "missing.json")
+        data.activity_log.append(uds.LogEntry("t", "x", "", "info"))
+        data.pipeline.stages["secret-scan"].status = "failed"
+        assert len(uds.INITIAL_STATUS["activity_log"]) == 1
+        assert uds.INITIAL_STATUS["pipeline"]["stages"]["secret-scan"]["status"] == "pending"
+
+    def test_failed_save_keeps_previous_file(self, status_path):
+        before = status_path.read_text()
+        with pytest.raises(TypeError):
+            uds.save_status(status_path, {"bad": object()})
+        assert status_path.read_text() == before
+        # Sin temporales huerfanos
+        assert [p.name for p in status_path.parent.iterdir() if p.suffix == ".tmp"] == []
+
+    def test_saved_file_is_world_readable(self, status_path):
+        assert status_path.stat().st_mode & 0o044 == 0o044
+
+    def test_invalid_snapshot_falls_back_to_initial(self, status_path):
+        data = json.loads(status_path.read_text())
+        data["pipeline"]["stages"]["secret-scan"]["status"] = "exploded"
+        status_path.write_text(json.dumps(data))
+        assert uds.load_status(status_path).pipeline.stages["secret-scan"].status == "pending"
+
+    def test_compact_output(self, status_path):
+        data = uds.load_status(status_path)
+        uds.save_status(status_path, data)
+        indented = status_path.read_bytes()
+        uds.save_status(status_path, data, compact=True)
+        compact = status_path.read_bytes()
+        assert b"\n" not in compact.strip()
+        assert len(compact) < len(indented)
+        assert json.loads(compact) == json.loads(indented) == data.to_dict()
+
+
+class TestModel:
+    def test_round_trip(self, status_path):
+        raw = json.loads(status_path.read_text())
+        raw["_journal"] = {"inode": 1, "offset": 2}
+        status = uds.dashboard_model.Status.from_dict(raw)
+        assert status.journal == {"inode": 1, "offset": 2}
+        assert status.to_dict() == raw
+        assert status.nodes[0].__class__.__slots__
+
+    @pytest.mark.parametrize("path, value, where", [
+        (("pipeline", "status"), "done", "pipeline.status"),
+        (("pipeline", "stages", "bandit-sast", "findings"), -1, "pipeline.stages.bandit-sast.findings"),
+        (("activity_log", 0, "level"), "debug", "activity_log[0].level"),
+        (("activity_log", 0, "message"), 3, "activity_log[0].message"),
+        (("architecture", "connections", 0, "port"), "80", "architecture.connections[0].port"),
+    ])
+    def test_schema_errors_name_the_field(self, status_path, path, value, where):
+        raw = json.loads(status_path.read_text())
+        raw["architecture"]["connections"] = [{"from": "a", "to": "b", "protocol": "http", "port": 80}]
+        target = raw
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+        with pytest.raises(uds.SchemaError, match="^" + re.escape(where)):
+            uds.dashboard_model.Status.from_dict(raw)
+
+    def test_invalid_command_never_reaches_journal(self, status_path):
+        for argv in (["stage", "bandit-sast", "exploded", "1"], ["log", "debug", "e", "m"],
+                     ["pipeline", "maybe"]):
+            assert uds.main(["x", str(status_path), *argv]) == 1
+        assert not uds.journal_path(status_path).exists() or uds.journal_path(status_path).stat().st_size == 0
+
+
+class TestCommands:
+    def test_pipeline_failed(self, status_path):
+        # Antes: NameError porque `failed` solo existia en la rama "complete"
+        uds.cmd_pipeline(str(status_path), "failed")
+        data = json.loads(status_path.read_text())
+        assert data["pipeline"]["status"] == "failed"
+        assert data["activity_log"][0]["level"] == "error"
+
+    def test_pipeline_complete_with_failed_stage(self, status_path):
+        uds.cmd_stage(str(status_path), "bandit-sast", "failed", 3)
+        uds.cmd_pipeline(str(status_path), "complete")
+        data = json.loads(status_path.read_text())
+        assert data["pipeline"]["status"] == "warning"
+        assert data["activity_log"][0]["level"] == "warning"
+
+    def test_pipeline_complete_passed(self, status_path):
+        uds.cmd_pipeline(str(status_path), "complete")
+        data = json.loads(status_path.read_text())
+        assert data["pipeline"]["status"] == "passed"
+        assert data["activity_log"][0]["level"] == "success"
+
+    def test_every_command_updates_snapshot(self, status_path):
+        # dashboard.html y http.server leen solo status.json
+        uds.run_command(str(status_path), "reset", ["", ""])
+        uds.run_command(str(status_path), "start", ["secret-scan"])
+        uds.run_command(str(status_path), "stage", ["secret-scan", "passed", "0"])
+        uds.run_command(str(status_path), "log", ["success", "e", "gitleaks ok"])
+        data = json.loads(status_path.read_text())
+        assert data["pipeline"]["stages"]["secret-scan"]["status"] == "passed"
+        assert data["activity_log"][0]["message"] == "gitleaks ok"
+
+
+class TestJournal:
+    @pytest.fixture(autouse=True)
+    def no_auto_compaction(self, monkeypatch):
+        # Solo el journal: la compactacion se prueba llamando a compact()
+        monkeypatch.setattr(uds, "append_event", uds.journal_event)
+
+    def test_log_appends_without_rewriting_snapshot(self, status_path):
+        before = status_path.read_text()
+        for i in range(3):
+            uds.cmd_log(str(status_path), "info", "e", f"m{i}")
+        uds.cmd_stage(str(status_path), "bandit-sast", "passed", 2)
+
+        assert status_path.read_text() == before
+        assert len(uds.journal_path(status_path).read_text().splitlines()) == 4
+        data = uds.read_status(status_path)
+        assert [e["message"] for e in data["activity_log"][:3]] == ["m2", "m1", "m0"]
+        assert data["pipeline"]["stages"]["bandit-sast"] == {
+            "status": "passed", "duration_seconds": 0, "findings": 2,
+        }
+
+    def test_compact_materializes_and_rotates(self, status_path):
+        uds.cmd_log(str(status_path), "info", "e", "m0")
+        current = uds.read_status(status_path)
+        assert uds.compact(status_path)
+        assert uds.journal_path(status_path).read_text() == ""
+        snapshot = json.loads(status_path.read_text())
+        assert snapshot["activity_log"] == current["activity_log"]
+        assert uds.read_status(status_path) == current
+
+    def test_compaction_crash_before_rotation_is_idempotent(self, status_path, monkeypatch):
+        uds.cmd_log(str(status_path), "info", "e", "m0")
+        monkeypatch.setattr(uds, "_new_journal", lambda path: None)
+        uds.compact(status_path)   # snapshot guardado, journal sin rotar
+        uds.cmd_log(str(status_path), "info", "e", "m1")
+
+        messages = [e["message"] for e in uds.read_status(status_path)["activity_log"]]
+        assert messages.count("m0") == 1
+        assert messages[:2] == ["m1", "m0"]
+
+    def test_torn_last_line_is_ignored(self, status_path):
+        uds.cmd_log(str(status_path), "info", "e", "m0")
+        with open(uds.journal_path(status_path), "a") as f:
+            f.write('{"op": "log", "entr')
+        assert uds.read_status(status_path)["activity_log"][0]["message"] == "m0"
+
+
+
+class TestActivityLogRetention:
+    @pytest.fixture(autouse=True)
+    def small_buffer(self, monkeypatch):
+        monkeypatch.setattr(uds, "append_event", uds.journal_event)
+        monkeypatch.setattr(uds, "LOG_MAX", 5)
+        monkeypatch.setattr(uds, "LOG_RETENTION", {})
+
+    def _log(self, path, *levels):
+        for i, level in enumerate(levels):
+            uds.cmd_log(str(path), level, "e", f"{level}{i}")
+
+    def test_ring_buffer_archives_oldest(self, status_path):
+        self._log(status_path, *["info"] * 8)
+        uds.compact(status_path)
+
+        snapshot = json.loads(status_path.read_text())
+        assert [e["message"] for e in snapshot["activity_log"]] == [
+            "info7", "info6", "info5", "info4", "info3",
+        ]
+        archived = [e["message"] for e in uds.read_archive(status_path)]
+        # La entrada inicial del reset es la mas vieja
+        assert archived == ["Demo en vivo iniciado — Pipeline DevSecOps arrancando",
+                            "info0", "info1", "info2"]
+
+    def test_per_level_retention(self, status_path, monkeypatch):
+        monkeypatch.setattr(uds, "LOG_MAX", 100)
+        monkeypatch.setattr(uds, "LOG_RETENTION", {"info": 2})
+        self._log(status_path, "error", "info", "info", "error", "info", "info")
+        uds.compact(status_path)
+
+        kept = [e["message"] for e in json.loads(status_path.read_text())["activity_log"]]
+        assert kept == ["info5", "info4", "error3", "error0"]
+        archived = [e["message"] for e in uds.read_archive(status_path)]
+        assert archived[1:] == ["info1", "info2"]
+
+    def test_segments_rotate_and_drop_oldest(self, status_path, monkeypatch):
+        monkeypatch.setattr(uds, "LOG_MAX", 0)
+        monkeypatch.setattr(uds, "ARCHIVE_SEGMENT_BYTES", 1)
+        monkeypatch.setattr(uds, "ARCHIVE_KEEP", 2)
+        for i in range(4):
+            uds.cmd_log(str(status_path), "info", "e", f"m{i}")
+            uds.compact(status_path)
+
+        segments = uds.archive_paths(status_path)
+        assert not segments[0].exists()
+        assert [e["message"] for e in uds.read_archive(status_path)] == ["m2", "m3"]
+
+    def test_reset_archives_previous_run(self, status_path):
+        self._log(status_path, "info", "error")
+        uds.cmd_reset(str(status_path))
+
+        assert len(uds.read_status(status_path)["activity_log"]) == 1
+        assert [e["message"] for e in uds.read_archive(status_path)][-2:] == ["info0", "error1"]
+
+
+class TestStageTimings:
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(uds.time, "monotonic", lambda: now[0])
+        return now
+
+    def _run(self, path, clock, plan):
+        """plan: (segundo, comando, args) en orden de tiempo."""
+        for second, cmd, args in plan:
+            clock[0] = 1000.0 + second
+            uds.run_command(str(path), cmd, args)
+
+    def test_stage_and_total_duration(self, status_path, clock):
+        self._run(status_path, clock, [
+            (0, "start", ["secret-scan"]),
+            (4, "stage", ["secret-scan", "passed", "0"]),
+            (5, "stage", ["bandit-sast", "running", "0"]),   # running tambien arranca
+            (12.5, "stage", ["bandit-sast", "warning", "3"]),
+            (13, "pipeline", ["complete"]),
+        ])
+        pipeline = json.loads(status_path.read_text())["pipeline"]
+        assert pipeline["stages"]["secret-scan"]["duration_seconds"] == 4
+        assert pipeline["stages"]["bandit-sast"]["duration_seconds"] == 7.5
+        assert pipeline["stages"]["semgrep-sast"]["duration_seconds"] == 0
+        assert pipeline["duration_seconds"] == 13
+        assert pipeline["critical_path"] == ["secret-scan", "bandit-sast"]
+
+    def test_critical_path_across_parallel_stages(self):
+        stages = {
+            "secret-scan": uds.dashboard_model.Stage("passed", 2, 0, 0.0, 2.0),
+            "bandit-sast": uds.dashboard_model.Stage("passed", 3, 0, 2.5, 5.5),
+            "semgrep-sast": uds.dashboard_model.Stage("passed", 9, 0, 2.5, 11.5),
+            "safety-deps": uds.dashboard_model.Stage("passed", 3, 0, 6.0, 9.0),
+            "container-security": uds.dashboard_model.Stage("running", 0, 0, 11.5, None),
+        }
+        # safety-deps corre en paralelo con semgrep, que es el que bloquea
+        assert uds.critical_path(stages, 14.0) == ["secret-scan", "semgrep-sast", "container-security"]
+
+    def test_history_across_runs(self, status_path, clock):
+        for run, bandit in enumerate((5, 6, 4, 15)):
+            uds.run_command(str(status_path), "reset", [])
+            base = run * 100
+            self._run(status_path, clock, [
+                (base, "start", ["secret-scan"]),
+                (base, "start", ["bandit-sast"]),
+                (base + 2, "stage", ["secret-scan", "passed", "0"]),
+                (base + bandit, "stage", ["bandit-sast", "passed", "0"]),
+                (base + bandit, "pipeline", ["complete"]),
+            ])
+        runs = uds.read_runs(status_path)
+        assert [r["stages"]["bandit-sast"] for r in runs] == [5, 6, 4, 15]
+        report = uds.timing_report(runs)
+        assert report[0] == {"stage": "bandit-sast", "runs": 4, "last": 15, "median": 5,
+                             "delta": 10, "critical": True}
+        assert report[1]["delta"] == 0 and not report[1]["critical"]
+        assert "bandit-sast" in uds.format_timings(runs)
+
+
+class TestRunHistory:
+    @pytest.fixture
+    def store(self, tmp_path):
+        with uds.dashboard_history.RunStore(tmp_path / "history.db", keep_runs=50) as store:
+            yield store
+
+    @staticmethod
+    def _finished(commit, durations, findings=None, day="2026-01-01"):
+        data = uds.initial_status()
+        data.pipeline.commit = commit
+        data.pipeline.last_run = f"{day}T10:00:00Z"
+        for name, seconds in durations.items():
+            stage = data.pipeline.stages[name]
+            stage.status, stage.started, stage.finished = "passed", 0.0, seconds
+            stage.duration_seconds = seconds
+        for name, count in (findings or {}).items():
+            data.pipeline.stages[name].findings = count
+        data.pipeline.duration_seconds = sum(durations.values())
+        data.pipeline.critical_path = list(durations)
+        return data
+
+    def test_percentiles_over_last_runs(self, store):
+        store.record(self._finished("c0", {"bandit-sast": 100}))   # fuera de la ventana
+        for seconds in range(1, 11):
+            store.record(self._finished("c1", {"bandit-sast": seconds, "secret-scan": 2}))
+        stats = store.percentiles(last=10)
+        assert stats["bandit-sast"] == {"runs": 10, "p50": 5.5, "p95": pytest.approx(9.55)}
+        assert stats["secret-scan"]["p95"] == 2
+        assert stats[uds.dashboard_history.TOTAL]["p50"] == 7.5
+        assert "semgrep-sast" not in stats   # sin tiempos registrados
+
+    def test_untimed_runs_do_not_count_in_total(self, store):
+        store.record(self._finished("c0", {}))   # pipeline sin `start`: 0 s
+        assert store.percentiles() == {}
+        for seconds in (10, 20):
+            store.record(self._finished("c1", {"bandit-sast": seconds}))
+        total = store.percentiles()[uds.dashboard_history.TOTAL]
+        assert total == {"runs": 2, "p50": 15, "p95": pytest.approx(19.5)}
+
+    def test_finding_deltas_between_commits(self, store):
+        store.record(self._finished("aaa", {}, {"bandit-sast": 7, "secret-scan": 1}))
+        store.record(self._finished("bbb", {}, {"bandit-sast": 9}))
+        store.record(self._finished("bbb", {}, {"bandit-sast": 4}))   # cuenta la ultima
+        base, head, deltas = store.finding_deltas()
+        assert (base, head) == ("aaa", "bbb")
+        assert deltas["bandit-sast"] == (7, 4, -3)
+        assert deltas["secret-scan"] == (1, 0, -1)
+        assert store.finding_deltas("aaa", "zzz") is None
+
+    def test_old_runs_are_downsampled(self, tmp_path):
+        with uds.dashboard_history.RunStore(tmp_path / "h.db", keep_runs=3) as store:
+            today = uds.now_iso()[:10]
+            for seconds in (10, 20, 30, 40, 50):
+                store.record(self._finished("c", {"bandit-sast": seconds}, day=today))
+            assert [r["stages"]["bandit-sast"] for r in store.runs()] == [30, 40, 50]
+            count = store.conn.execute("SELECT COUNT(*) FROM stage_runs").fetchone()[0]
+            assert count == 3 * len(uds.INITIAL_STATUS["pipeline"]["stages"])
+            assert store.daily("bandit-sast") == [(today, 2, 15, 20)]
+            assert store.daily()[0][1] == 2
+            store.record(self._finished("c", {"bandit-sast": 1}, day="2000-01-01"))
+            store.record(self._finished("c", {"bandit-sast": 1}, day=today))
+            # El resumen del 2000 esta fuera de keep_days y se borra
+            assert [d[0] for d in store.daily()] == [today]
+
+    def test_cli_queries(self, status_path, capsys):
+        with uds.run_store(status_path) as store:
+            store.record(self._finished("aaa", {"bandit-sast": 3}, {"bandit-sast": 5}))
+            store.record(self._finished("bbb", {"bandit-sast": 9}, {"bandit-sast": 2}))
+        assert uds.main(["x", str(status_path), "trends", "5"]) == 0
+        assert uds.main(["x", str(status_path), "diff"]) == 0
+        assert uds.main(["x", str(status_path), "timings"]) == 0
+        out = capsys.readouterr().out
+        assert "bandit-sast                   2     6.00     8.70" in out
+        assert "bandit-sast                   5        2       -3" in out
+        assert "+6.00 *" in out
+
+    def test_diff_across_commits_from_cli(self, status_path, capsys):
+        for commit, findings in (("aaa1111", "5"), ("bbb2222", "2")):
+            assert uds.main(["x", str(status_path), "reset", "--commit", commit, "--branch", "main"]) == 0
+            assert uds.main(["x", str(status_path), "stage", "bandit-sast", "failed", findings]) == 0
+            assert uds.main(["x", str(status_path), "pipeline", "failed"]) == 0
+        assert uds.read_status(status_path)["pipeline"]["commit"] == "bbb2222"
+        capsys.readouterr()
+        assert uds.main(["x", str(status_path), "diff"]) == 0
+        out = capsys.readouterr().out
+        assert "Findings aaa1111 -> bbb2222" in out
+        assert "bandit-sast                   5        2       -3" in out
+
+    def test_reset_detects_revision(self, status_path, monkeypatch):
+        monkeypatch.setenv("GITHUB_SHA", "0123456789abcdef")
+        monkeypatch.setenv("GITHUB_REF_NAME", "feature/x")
+        assert uds.main(["x", str(status_path), "reset"]) == 0
+        pipeline = uds.read_status(status_path)["pipeline"]
+        assert (pipeline["commit"], pipeline["branch"]) == ("0123456", "feature/x")
+        monkeypatch.delenv("GITHUB_SHA")
+        monkeypatch.delenv("GITHUB_REF_NAME")
+        monkeypatch.setattr(uds, "_git", lambda *args: {"--short": "fedcba9"}.get(args[1], "HEAD"))
+        assert uds.parse_reset_args([]) == ["fedcba9", ""]   # HEAD desacoplado: sin branch
+        assert uds.main(["x", str(status_path), "reset", "--bogus"]) == 1
+
+
+class TestDaemon:
+    @pytest.fixture
+    def daemon(self, status_path, monkeypatch):
+        # tmp_path puede superar el limite de 108 bytes de un socket Unix
+        sock_dir = tempfile.mkdtemp(prefix="uds-")
+        monkeypatch.setenv("DASHBOARD_SOCKET", str(Path(sock_dir) / "s.sock"))
+        monkeypatch.setattr(uds, "FLUSH_DELAY", 0.05)
+        monkeypatch.setattr(uds, "FLUSH_MAX_DELAY", 0.2)
+        server = uds.StatusServer(status_path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        Path(sock_dir).rmdir()
+
+    def test_commands_go_through_daemon(self, status_path, daemon, monkeypatch):
+        # El modo archivo directo no se debe usar mientras el daemon corre
+        monkeypatch.setattr(uds, "append_event", None)
+        uds.run_command(str(status_path), "stage", ["bandit-sast", "failed", "3"])
+        uds.run_command(str(status_path), "log", ["info", "e", "m0"])
+
+        status = uds.run_command(str(status_path), "show", [])["status"]
+        assert status["activity_log"][0]["message"] == "m0"
+        assert status["pipeline"]["stages"]["bandit-sast"]["findings"] == 3
+
+        uds.run_command(str(status_path), "pipeline", ["complete"])
+        snapshot = json.loads(status_path.read_text())
+        assert snapshot["pipeline"]["status"] == "warning"
+
+        uds.run_command(str(status_path), "reset", ["ccc3333", "dev"])
+        pipeline = uds.run_command(str(status_path), "show", [])["status"]["pipeline"]
+        assert (pipeline["commit"], pipeline["branch"]) == ("ccc3333", "dev")
+
+    def test_reset_without_arguments_detects_revision(self, status_path, daemon, monkeypatch):
+        # Como demo_live.sh: POST /reset por curl, sin commit ni branch
+        monkeypatch.setenv("GITHUB_SHA", "ddd4444eeee")
+        monkeypatch.setenv("GITHUB_REF_NAME", "release")
+        uds.send_command(status_path, "reset")
+        pipeline = uds.send_command(status_path, "show")["status"]["pipeline"]
+        assert (pipeline["commit"], pipeline["branch"]) == ("ddd4444", "release")
+
+    def test_debounced_flush(self, status_path, daemon, monkeypatch):
+        saves = []
+        save_status = uds.save_status
+        monkeypatch.setattr(uds, "save_status", lambda p, d: (saves.append(1), save_status(p, d)))
+        for i in range(20):
+            uds.run_command(str(status_path), "log", ["info", "e", f"m{i}"])
+        deadline = uds.time.monotonic() + 2
+        while not saves and uds.time.monotonic() < deadline:
+            uds.time.sleep(0.01)
+        uds.time.sleep(0.3)
+        assert 1 <= len(saves) <= 3
+        assert json.loads(status_path.read_text())["activity_log"][0]["message"] == "m19"
+
+    def test_events_reach_journal_before_flush(self, status_path, daemon):
+        uds.run_command(str(status_path), "log", ["info", "e", "m0"])
+        # Sin esperar el flush, snapshot + journal ya tienen el evento
+        # (_materialize sin lock: el daemon tiene el lock exclusivo)
+        assert "m0" in [e.message for e in uds._materialize(status_path)[0].activity_log]
+
+    def test_second_daemon_refused(self, status_path, daemon):
+        with pytest.raises(RuntimeError):
+            uds.StatusServer(status_path)
+
+    def test_cli_is_thin_client(self, status_path, daemon):
+        subprocess.run(
+            [sys.executable, str(SCRIPT), str(status_path), "log", "info", "e", "desde", "el", "cli"],
+            check=True,
+        )
+        status = uds.send_command(status_path, "show")["status"]
+        assert status["activity_log"][0]["message"] == "desde el cli"
+
+    def test_missing_arguments_are_a_usage_error(self, status_path, daemon):
+        with pytest.raises(RuntimeError, match="^uso: stage espera 3 argumentos, recibio 1$"):
+            uds.send_command(status_path, "stage", ["bandit-sast"])
+        with pytest.raises(RuntimeError, match="comando desconocido"):
+            uds.send_command(status_path, "explode")
+
+    def test_internal_error_is_json_500(self, status_path, daemon, monkeypatch):
+        def broken(cmd, args):
+            raise KeyError("stage")
+
+        monkeypatch.setattr(daemon.daemon, "handle", broken)
+        conn = uds._UnixHTTPConnection(str(uds.socket_path(status_path)), 5)
+        conn.request("GET", "/show")
+        response = conn.getresponse()
+        assert response.status == 500
+        assert json.loads(response.read())["ok"] is False
+        conn.close()
+        with pytest.raises(RuntimeError, match="error interno"):
+            uds.send_command(status_path, "show")
+
+    def test_dropped_connection_falls_back(self, status_path, monkeypatch):
+        # Un daemon que acepta y corta sin responder (RemoteDisconnected)
+        sock_dir = tempfile.mkdtemp(prefix="uds-")
+        sock = Path(sock_dir) / "s.sock"
+        monkeypatch.setenv("DASHBOARD_SOCKET", str(sock))
+        listener = uds.socket.socket(uds.socket.AF_UNIX, uds.socket.SOCK_STREAM)
+        listener.bind(str(sock))
+        listener.listen()
+
+        def drop():
+            conn, _ = listener.accept()
+            conn.recv(65536)
+            conn.close()
+
+        thread = threading.Thread(target=drop, daemon=True)
+        thread.start()
+        try:
+            assert uds.send_command(status_path, "log", ["info", "e", "m0"]) is None
+            thread.join()
+            # Sin daemon escuchando pero con el socket colgado: timeout
+            assert uds.send_command(status_path, "ping", timeout=0.1) is None
+        finally:
+            listener.close()
+            sock.unlink()
+            Path(sock_dir).rmdir()
+
+    def test_fallback_without_daemon(self, status_path, monkeypatch):
+        monkeypatch.setenv("DASHBOARD_SOCKET", str(status_path.parent / "none.sock"))
+        assert uds.send_command(status_path, "ping") is None
+        uds.run_command(str(status_path), "log", ["info", "e", "direct"])
+        assert uds.read_status(status_path)["activity_log"][0]["message"] == "direct"
+
+
+class TestDashboardPush:
+    @pytest.fixture
+    def web(self, status_path, monkeypatch):
+        sock_dir = tempfile.mkdtemp(prefix="uds-")
+        monkeypatch.setenv("DASHBOARD_SOCKET", str(Path(sock_dir) / "s.sock"))
+        monkeypatch.setattr(uds, "FLUSH_DELAY", 10)
+        monkeypatch.setattr(uds, "FLUSH_MAX_DELAY", 10)
+        (status_path.parent / "dashboard.html").write_text("<html>dashboard</html>")
+        server = uds.StatusServer(status_path)
+        web = uds.DashboardHTTPServer(("127.0.0.1", 0), server.daemon)
+        threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in (server, web)]
+        for t in threads:
+            t.start()
+        yield web
+        web.shutdown()
+        server.shutdown()
+        web.server_close()
+        server.server_close()
+        Path(sock_dir).rmdir()
+
+    def _get(self, web, path, headers=None):
+        conn = http.client.HTTPConnection(*web.server_address, timeout=5)
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        return response, response.read()
+
+    def _open_events(self, web, last_event_id=None):
+        conn = http.client.HTTPConnection(*web.server_address, timeout=5)
+        conn.request("GET", "/events", headers={"Last-Event-ID": last_event_id} if last_event_id else {})
+        response = conn.getresponse()
+        assert response.getheader("Content-Type") == "text/event-stream"
+        return conn, response
+
+    @staticmethod
+    def _next_message(response):
+        fields = {}
+        while True:
+            line = response.fp.readline().decode("utf-8").rstrip("\n")
+            if not line:
+                if fields:
+                    return fields
+                continue
+            if line.startswith(":"):
+                continue
+            name, _, value = line.partition(": ")
+            fields[name] = value
+
+    def _show(self, status_path):
+        return uds.send_command(status_path, "show")["status"]
+
+    def test_snapshot_etag_and_304(self, web, status_path):
+        response, body = self._get(web, "/status.json")
+        etag = response.getheader("ETag")
+        assert response.status == 200 and json.loads(body) == self._show(status_path)
+
+        response, body = self._get(web, "/status.json", {"If-None-Match": etag})
+        assert response.status == 304 and body == b""
+
+        uds.send_command(status_path, "log", ["info", "e", "m0"])
+        response, body = self._get(web, "/status.json", {"If-None-Match": etag})
+        assert response.status == 200 and response.getheader("ETag") != etag
+        assert json.loads(body)["activity_log"][0]["message"] == "m0"
+
+    def test_sse_patches_rebuild_state(self, web, status_path, monkeypatch):
+        conn, response = self._open_events(web)
+        first = self._next_message(response)
+        assert first["event"] == "snapshot"
+        doc = json.loads(first["data"])
+
+        uds.send_command(status_path, "start", ["bandit-sast"])
+        uds.send_command(status_path, "stage", ["bandit-sast", "failed", "3"])
+        uds.send_command(status_path, "log", ["warning", "e", "a/b~c"])
+        uds.send_command(status_path, "pipeline", ["complete"])
+        uds.send_command(status_path, "reset")
+        uds.send_command(status_path, "log", ["info", "e", "after reset"])
+        while True:
+            message = self._next_message(response)
+            assert message["event"] == "patch"
+            doc = apply_patch(doc, json.loads(message["data"]))
+            if doc == self._show(status_path):
+                break
+        conn.close()
+
+    def test_ring_buffer_trim_is_pushed(self, web, status_path, monkeypatch):
+        monkeypatch.setattr(uds, "LOG_MAX", 3)
+        monkeypatch.setattr(uds, "LOG_RETENTION", {"info": 1})
+        conn, response = self._open_events(web)
+        doc = json.loads(self._next_message(response)["data"])
+        for level in ("error", "info", "info", "error"):
+            uds.send_command(status_path, "log", [level, "e", level])
+        uds.send_command(status_path, "compact")
+        expected = self._show(status_path)
+        assert len(expected["activity_log"]) == 3
+        while doc != expected:
+            doc = apply_patch(doc, json.loads(self._next_message(response)["data"]))
+        conn.close()
+
+    def test_resume_with_last_event_id(self, web, status_path):
+        conn, response = self._open_events(web)
+        first = self._next_message(response)
+        conn.close()
+        uds.send_command(status_path, "log", ["info", "e", "missed"])
+
+        conn, response = self._open_events(web, first["id"])
+        message = self._next_message(response)
+        assert message["event"] == "patch"
+        assert json.loads(message["data"])[0]["value"]["message"] == "missed"
+        conn.close()
+
+        # Id de otro daemon (o muy viejo): snapshot completo
+        conn, response = self._open_events(web, "deadbeef-1")
+        assert self._next_message(response)["event"] == "snapshot"
+        conn.close()
+
+    def test_serves_dashboard_only(self, web):
+        response, body = self._get(web, "/")
+        assert response.status == 200 and body == b"<html>dashboard</html>"
+        response, _ = self._get(web, "/status.json.journal")
+        assert response.status == 404
+
+
+class TestConcurrentWriters:
+    def test_no_lost_updates(self, status_path, monkeypatch):
+        # Cada append compacta: compactaciones concurrentes con los appends
+        # Ring buffer chico: parte del log termina en el archivo
+        monkeypatch.setattr(uds, "LOG_MAX", 50)
+        monkeypatch.setattr(uds, "ARCHIVE_SEGMENT_BYTES", 1024)
+        monkeypatch.setattr(uds, "ARCHIVE_KEEP", 100)
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_writer, args=(str(status_path), w)) for w in range(WRITERS)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=60)
+            assert p.exitcode == 0
+
+        uds.compact(status_path)
+        data = uds.read_status(status_path)
+        entries = data["activity_log"][::-1] + list(uds.read_archive(status_path))
+        messages = [e["message"] for e in entries if e["event"] == "stress"]
+        expected = {f"{w}:{i}" for w in range(WRITERS) for i in range(ENTRIES_PER_WRITER)}
+        assert len(messages) == len(expected)
+        assert set(messages) == expected
+        assert len(data["activity_log"]) == 50
+        # Cada writer termina su stage con findings = ultimo i
+        for stage in list(data["pipeline"]["stages"])[:WRITERS]:
+            assert data["pipeline"]["stages"][stage]["findings"] == ENTRIES_PER_WRITER - 1
@@ -2,7 +2,7 @@
 Security Tests — OWASP Top 10 2021 Alignment
 Bunker DevSecOps Workshop — Tribu | Hacklab Bogota | Ethereum Bogota
 
-22 tests organizados por categoria OWASP.
+23 tests organizados por categoria OWASP.
 Cada test tiene docstring explicando el OWASP ID y por que importa.
 
 Ejecutar:
@@ -18,9 +18,20 @@ from pathlib import Path
 import pytest
 
 from conftest import code_lines
+from source_scanner import scan_files
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 
+# La remediacion: las dos apps y los helpers que comparten (queries y probes)
+SECURE_APP_FILES = ("app_secure.py", "app_secure_asgi.py", "secure_resources.py")
+# Lo que el taller muestra como remediacion (diff + bandit en demo_live.sh)
+WORKSHOP_REMEDIATION_FILES = ("app_secure.py", "secure_resources.py", "secure_validation.py")
+
+
+def _locations(findings):
+    """ruta:linea de cada hallazgo de source_findings."""
+    return [f"{f.relative_to(REPO_ROOT)}:{i}" for f, i, _ in findings]
+
 
 # =================================================================
 # Grupo 1 — Secrets (OWASP A07:2021)
@@ -33,46 +44,24 @@ REPO_ROOT = Path(__file__).resolve().parent.parent
 class TestSecrets:
     """OWASP A07:2021 — No debe haber secrets hardcodeados fuera de vulnerable_app/."""
 
-    def test_no_hardcoded_passwords_in_config(self, python_source_files):
+    def test_no_hardcoded_passwords_in_config(self, source_findings):
         """A07:2021 — Passwords hardcodeados en codigo permiten acceso no autorizado
         si el repositorio se filtra o se hace publico. Segun GitGuardian 2024,
         el 12.8% de commits en GitHub contienen al menos un secret. Buscamos
         patrones PASSWORD = '...' en archivos Python de produccion.
         """
-        pattern = re.compile(
-            r"""(?:password|passwd|pwd)\s*=\s*["'][^"']+["']""",
-            re.IGNORECASE,
-        )
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                if pattern.search(line):
-                    violations.append(f"{f.relative_to(REPO_ROOT)}:{i}")
+        violations = _locations(source_findings["hardcoded_password"])
         assert not violations, (
             f"Passwords hardcodeados encontrados en: {violations}"
         )
 
-    def test_no_api_keys_in_source(self, python_source_files):
+    def test_no_api_keys_in_source(self, source_findings):
         """A07:2021 — API keys en codigo fuente son el vector #1 de filtraciones.
         Un key hardcodeado (sk-xxx, AKIA, ghp_) puede ser explotado en segundos
         por bots que escanean repos publicos. Verificamos que no hay keys reales
         en archivos Python de produccion.
         """
-        patterns = [
-            re.compile(r"""["']sk-[a-zA-Z0-9]{10,}["']"""),
-            re.compile(r"""api_key\s*=\s*["'][a-zA-Z0-9]{10,}["']""", re.IGNORECASE),
-            re.compile(r"""token\s*=\s*["'][a-zA-Z0-9]{20,}["']""", re.IGNORECASE),
-        ]
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                for p in patterns:
-                    if p.search(line):
-                        violations.append(f"{f.relative_to(REPO_ROOT)}:{i}")
+        violations = _locations(source_findings["api_key"])
         assert not violations, f"API keys encontradas en: {violations}"
 
     def test_env_file_not_tracked(self):
@@ -104,61 +93,48 @@ class TestSecrets:
 class TestInjection:
     """OWASP A03:2021 — El codigo de produccion no debe tener patrones de injection."""
 
-    def test_no_sql_string_formatting(self, python_source_files):
+    def test_no_sql_string_formatting(self, source_findings):
         """A03:2021 — SQL injection via f-strings permite al atacante modificar la
         estructura de la query con payloads como ' OR 1=1 --. Es la vulnerabilidad
         #3 mas explotada segun OWASP. Debe usarse parameterized queries (?).
         Buscamos f\"SELECT y f'SELECT en Python fuera de vulnerable_app/.
         """
-        pattern = re.compile(r"""f["']SELECT""", re.IGNORECASE)
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                if pattern.search(line):
-                    violations.append(f"{f.relative_to(REPO_ROOT)}:{i}")
+        violations = _locations(source_findings["sql_formatting"])
         assert not violations, (
             f"SQL string formatting encontrado en: {violations}"
         )
 
-    def test_no_shell_true_with_input(self, python_source_files):
+    def test_no_shell_true_with_input(self, source_findings):
         """A03:2021 — subprocess con shell=True interpreta el string como comando de
         shell, permitiendo inyeccion de comandos con ; | && etc. Un atacante puede
         ejecutar rm -rf / o exfiltrar datos. La correccion es pasar argumentos como
         lista sin shell=True. Buscamos shell=True en Python fuera de vulnerable_app/.
         """
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                if "shell=True" in line:
-                    violations.append(f"{f.relative_to(REPO_ROOT)}:{i}")
+        violations = _locations(source_findings["shell_true"])
         assert not violations, f"shell=True encontrado en: {violations}"
 
-    def test_no_pickle_loads(self, python_source_files):
+    def test_no_pickle_loads(self, source_findings):
         """A03:2021 — pickle.loads ejecuta codigo arbitrario durante la deserializacion.
         Un atacante puede construir un payload pickle que ejecute os.system('rm -rf /')
         al ser deserializado. La alternativa segura es json.loads() o request.get_json().
         Buscamos pickle.loads en Python fuera de vulnerable_app/.
         """
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                if "pickle.loads" in line:
-                    violations.append(f"{f.relative_to(REPO_ROOT)}:{i}")
+        violations = _locations(source_findings["pickle_loads"])
         assert not violations, f"pickle.loads encontrado en: {violations}"
 
     def test_secure_app_uses_parameterized(self):
         """A03:2021 — Parameterized queries (placeholder ?) separan los datos de la
         estructura SQL, haciendo imposible que el input del usuario modifique la query.
         Es la defensa principal contra SQL injection recomendada por OWASP.
-        Verificamos que app_secure.py usa este patron.
+        Verificamos que la remediacion que muestra el taller (app_secure.py y
+        los modulos que demo_live.sh muestra y pasa por bandit con ella) usa
+        este patron.
         """
-        content = (REPO_ROOT / "vulnerable_app" / "app_secure.py").read_text()
+        demo = (REPO_ROOT / "scripts" / "demo_live.sh").read_text()
+        content = ""
+        for name in WORKSHOP_REMEDIATION_FILES:
+            assert f"$VULN_APP/{name}" in demo, f"demo_live.sh no muestra {name}"
+            content += (REPO_ROOT / "vulnerable_app" / name).read_text()
         assert "?" in content, \
             "app_secure.py debe usar parameterized queries con placeholder ?"
         assert "execute(" in content, \
@@ -175,19 +151,13 @@ class TestInjection:
 class TestSecurityConfig:
     """OWASP A05:2021 — Configuraciones seguras en Docker, Terraform e infra."""
 
-    def test_no_debug_mode_in_production(self, python_source_files):
+    def test_no_debug_mode_in_production(self, source_findings):
         """A05:2021 — Flask con debug=True expone el debugger interactivo de Werkzeug
         que permite ejecutar codigo Python arbitrario desde el browser (CWE-94).
         Solo debe estar presente en vulnerable_app/ que es intencional para la demo.
         Verificamos que ningun archivo Python de produccion lo usa.
         """
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                if "debug=True" in line:
-                    violations.append(f"{f.relative_to(REPO_ROOT)}:{i}")
+        violations = _locations(source_findings["debug_mode"])
         assert not violations, (
             f"debug=True encontrado fuera de vulnerable_app/: {violations}"
         )
@@ -294,24 +264,16 @@ class TestCryptoTransport:
         assert "ssh-keygen" in content, \
             "El script debe usar ssh-keygen para generar llaves"
 
-    def test_no_http_urls_in_code(self, python_source_files):
+    def test_no_http_urls_in_code(self, source_findings):
         """A02:2021 — URLs con http:// transmiten datos en texto plano, vulnerables
         a man-in-the-middle (MITM). Todo trafico externo debe usar https://.
         Excluimos localhost y IPs internas (10.x, 192.168.x, 127.0.0.1) que no
         salen a la red publica.
         """
-        http_external = re.compile(
-            r"http://(?!localhost|127\.0\.0\.1|0\.0\.0\.0|10\.|192\.168\.)"
-        )
-        violations = []
-        for f in python_source_files:
-            for i, line in enumerate(f.read_text(errors="ignore").splitlines(), 1):
-                if line.lstrip().startswith("#"):
-                    continue
-                if http_external.search(line):
-                    violations.append(
-                        f"{f.relative_to(REPO_ROOT)}:{i}: {line.strip()}"
-                    )
+        violations = [
+            f"{f.relative_to(REPO_ROOT)}:{i}: {line.strip()}"
+            for f, i, line in source_findings["http_url"]
+        ]
         assert not violations, (
             f"URLs http:// externas en codigo de produccion: {violations}"
         )
@@ -356,35 +318,47 @@ class TestVulnerableAppDetection:
         assert "pickle.loads" in content, \
             "app.py debe tener pickle.loads para la demo de deserialization"
 
+    def test_scanner_detects_vulnerable_app(self):
+        """Los tests de Grupo 1-4 pasan si source_scanner no encuentra nada: hay
+        que confirmar que el motor (prefiltro + reglas) si detecta los patrones
+        en la app vulnerable, o un prefiltro roto pasaria todo en silencio.
+        """
+        findings = scan_files([REPO_ROOT / "vulnerable_app" / "app.py"])
+        for rule in ("sql_formatting", "shell_true", "pickle_loads", "debug_mode"):
+            assert findings[rule], f"source_scanner no detecta {rule} en app.py"
+
     def test_secure_app_no_sqli(self):
         """app_secure.py es la remediacion que se muestra como diff en el taller.
         NO debe tener f-string SQL en codigo activo — solo parameterized queries.
         Los comentarios y docstrings que explican el 'antes' se ignoran.
         """
-        content = (REPO_ROOT / "vulnerable_app" / "app_secure.py").read_text()
-        for lineno, line in code_lines(content):
-            assert 'f"SELECT' not in line and "f'SELECT" not in line, \
-                f"app_secure.py:{lineno} tiene SQL injection en codigo activo: {line}"
+        for name in SECURE_APP_FILES:
+            content = (REPO_ROOT / "vulnerable_app" / name).read_text()
+            for lineno, line in code_lines(content):
+                assert 'f"SELECT' not in line and "f'SELECT" not in line, \
+                    f"{name}:{lineno} tiene SQL injection en codigo activo: {line}"
 
     def test_secure_app_no_cmdi(self):
         """app_secure.py NO debe usar shell=True en codigo activo. La correccion
         consiste en pasar argumentos como lista a subprocess.run() y validar
         el input del usuario con regex antes de ejecutar.
         """
-        content = (REPO_ROOT / "vulnerable_app" / "app_secure.py").read_text()
-        for lineno, line in code_lines(content):
-            assert "shell=True" not in line, \
-                f"app_secure.py:{lineno} tiene shell=True en codigo activo: {line}"
+        for name in SECURE_APP_FILES:
+            content = (REPO_ROOT / "vulnerable_app" / name).read_text()
+            for lineno, line in code_lines(content):
+                assert "shell=True" not in line, \
+                    f"{name}:{lineno} tiene shell=True en codigo activo: {line}"
 
     def test_secure_app_no_pickle(self):
         """app_secure.py NO debe usar pickle.loads en codigo activo. La correccion
         reemplaza pickle por request.get_json() para deserializacion segura,
         eliminando el riesgo de Remote Code Execution.
         """
-        content = (REPO_ROOT / "vulnerable_app" / "app_secure.py").read_text()
-        for lineno, line in code_lines(content):
-            assert "pickle.loads" not in line, \
-                f"app_secure.py:{lineno} tiene pickle.loads en codigo activo: {line}"
+        for name in SECURE_APP_FILES:
+            content = (REPO_ROOT / "vulnerable_app" / name).read_text()
+            for lineno, line in code_lines(content):
+                assert "pickle.loads" not in line, \
+                    f"{name}:{lineno} tiene pickle.loads en codigo activo: {line}"
 
 
 # =================================================================
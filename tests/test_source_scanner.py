@@ -0,0 +1,96 @@
+"""
+Tests de tests/source_scanner.py (motor de test_security.py)
+Bunker DevSecOps Workshop — Tribu | Hacklab Bogota | Ethereum Bogota
+
+El cache en disco solo puede saltarse archivos que de verdad no cambiaron:
+un hallazgo viejo servido desde el cache esconderia una vulnerabilidad.
+
+Ejecutar:
+    pytest tests/test_source_scanner.py -v
+"""
+
+import os
+
+import pytest
+import source_scanner
+
+VULNERABLE = 'subprocess.run(cmd, shell=True)\n'
+CLEAN = 'subprocess.run(["ls"])\n'
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = []
+    for i in range(5):
+        f = tmp_path / f"m{i}.py"
+        f.write_text(CLEAN)
+        # mtime viejo: fuera de la ventana RACY_NS
+        os.utime(f, ns=(1_000_000_000_000, 1_000_000_000_000 + i))
+        files.append(f)
+    return files
+
+
+def _cache(tmp_path):
+    return source_scanner.ScanCache(tmp_path / "cache" / "findings.json")
+
+
+def test_scan_text_matches_rules_and_skips_comments():
+    text = "# shell=True en un comentario\nx = 1\nsubprocess.run(c, shell=True)\r\nDEBUG=True\n"
+    assert source_scanner.scan_text(text) == {"shell_true": [(3, "subprocess.run(c, shell=True)")]}
+
+
+def test_unchanged_files_are_not_read(tree, tmp_path):
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    cache.save()
+    assert cache.stats == {"hits": 0, "rehashed": 0, "scanned": 5}
+
+    cache = _cache(tmp_path)
+    assert source_scanner.scan_files(tree, cache)["shell_true"] == []
+    assert cache.stats == {"hits": 5, "rehashed": 0, "scanned": 0}
+
+
+def test_changed_file_is_rescanned(tree, tmp_path):
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    cache.save()
+    tree[2].write_text(VULNERABLE)
+    tree[3].write_text(CLEAN)   # solo cambia el mtime: se hashea, no se escanea
+    cache = _cache(tmp_path)
+    findings = source_scanner.scan_files(tree, cache)
+    assert [(f, i) for f, i, _ in findings["shell_true"]] == [(tree[2], 1)]
+    assert cache.stats == {"hits": 3, "rehashed": 1, "scanned": 1}
+
+
+def test_racy_entries_are_verified_by_hash(tree, tmp_path):
+    tree[0].write_text(CLEAN)   # mtime = ahora
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    cache.save()
+    stat = tree[0].stat()
+    tree[0].write_text(CLEAN.replace("ls", "id"))
+    os.utime(tree[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    assert cache.stats["scanned"] == 1
+
+
+def test_ruleset_change_invalidates(tree, tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    cache.save()
+    monkeypatch.setattr(source_scanner, "RULESET_VERSION", "otra")
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    assert cache.stats["scanned"] == 5
+
+
+def test_deleted_files_are_pruned(tree, tmp_path):
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree, cache)
+    cache.save()
+    tree[4].unlink()
+    cache = _cache(tmp_path)
+    source_scanner.scan_files(tree[:4], cache)
+    cache.save()
+    assert str(tree[4]) not in _cache(tmp_path).files
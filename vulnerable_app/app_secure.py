@@ -10,95 +10,235 @@
 #   5. Path Traversal       -> Sanitizacion de rutas + directorio base
 #   6. SSRF                 -> Allowlist de dominios + validacion de esquema
 #   7. Debug mode           -> Controlado por variable de entorno
+#
+# Arranque: app factory, la configuracion se lee una vez (Settings.from_env).
+# `app` es la instancia por defecto con la configuracion del entorno:
+#   gunicorn app_secure:app          (o "app_secure:create_app()")
+#   flask --app app_secure:app run
+# Recursos, queries y probes compartidos con app_secure_asgi.py estan en
+# secure_resources.py; este modulo agrega las rutas y hooks de Flask.
+# create_app() solo verifica el indice UNIQUE de users.db; los demas
+# recursos de cada ruta (y modulos como secure_ping, secure_fetch o
+# subprocess) se cargan en el primer request que los necesita.
 # =============================================================================
 
 import json
 import logging
-import os
-import re
 import sqlite3
-import subprocess
-from pathlib import Path
 from urllib.parse import urlparse
 
-from flask import Flask, jsonify, request
-
-app = Flask(__name__)
-
-# ── FIX 1: Secrets desde variables de entorno ────────────────
-# Severidad original: CRITICAL (CWE-798)
-# Antes: SECRET_KEY = "super_secret_key_12345"
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "change-me-in-production")
-DATABASE_PASSWORD = os.environ.get("DATABASE_PASSWORD")
-API_KEY = os.environ.get("API_KEY")
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+)
+from secure_http import FastJSONProvider
+from secure_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from secure_metrics import RequestMetrics
+from secure_resources import (
+    ALLOWED_FETCH_DOMAINS,
+    ALLOWED_SCHEMES,
+    FETCH_SECONDS,
+    PING_TIMEOUT,
+    Resources,
+    iter_user_batch,
+    metrics,
+    probe_line,
+)
+from secure_settings import Settings
+from secure_validation import (
+    fetch_url_error,
+    parse_ping_batch,
+    parse_usernames,
+    resolve_data_path,
+    validate_ipv4,
+)
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Logging en lugar de exponer errores al usuario
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Directorio base para servir archivos (FIX 5)
-BASE_DATA_DIR = Path("/app/data").resolve()
+bp = Blueprint("app_secure", __name__)
+
+
+def _resources():
+    return current_app.extensions["app_secure"]
+
+
+def create_app(settings=None):
+    """App factory: una app con su configuracion y sus recursos."""
+    settings = settings or Settings.from_env()
+    logging.basicConfig(level=logging.INFO)
 
-# Dominios permitidos para fetch (FIX 6)
-ALLOWED_FETCH_DOMAINS = {"api.github.com", "httpbin.org"}
-ALLOWED_SCHEMES = {"http", "https"}
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    resources = Resources(settings)
+    app.extensions["app_secure"] = resources
+    # Al arrancar y no en el primer request: un problema de esquema se ve en el log de inicio
+    resources.check_indexes()
+
+    # ── FIX 1: Secrets desde variables de entorno ────────────
+    # Severidad original: CRITICAL (CWE-798)
+    # Antes: SECRET_KEY = "super_secret_key_12345"
+    app.config["SECRET_KEY"] = settings.secret_key
+
+    # FIX 4: Werkzeug corta el body al leer el stream (antes de parsear JSON)
+    # y responde 413, incluso con Transfer-Encoding: chunked
+    app.config["MAX_CONTENT_LENGTH"] = settings.max_body_bytes
+
+    # Metricas antes que la compresion: la latencia la incluye
+    RequestMetrics(metrics).init_app(app)
+    if settings.rate_limit_enabled:
+        # Despues de las metricas: los 429/503 tambien se miden
+        resources.rate_limiter.init_app(app)
+    if settings.compress_min_bytes > 0:
+        resources.compressor.init_app(app)
+
+    app.register_blueprint(bp)
+    return app
 
 
 # ── FIX 2: SQL Injection -> Parameterized queries ────────────
 # Severidad original: Medium (CWE-89, B608)
 # Antes: f"SELECT * FROM users WHERE username = '{username}'"
-@app.route("/user/<username>")
+# Las queries (fetch_user_row, fetch_user_rows) estan en secure_resources.py
+@bp.route("/user/<username>")
 def get_user(username):
-    """Seguro: parameterized query previene SQL injection."""
-    conn = sqlite3.connect("users.db")
+    """Seguro: parameterized query + cache con invalidacion por cambios en la DB."""
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM users WHERE username = ?",
-            (username,),
-        )
-        result = cursor.fetchone()
-        return jsonify({"user": result})
+        return jsonify({"user": _resources().user_cache.get(username)})
     except sqlite3.Error:
         logger.exception("Database error in get_user")
         return jsonify({"error": "Database error"}), 500
-    finally:
-        conn.close()
+
+
+def _stream_user_batch(resources, usernames):
+    yield '{"users": {'
+    try:
+        for n, (username, row) in enumerate(iter_user_batch(resources, usernames)):
+            yield ("," if n else "") + json.dumps(username) + ":" + json.dumps(row)
+    except sqlite3.Error:
+        # Los headers ya se enviaron: se cierra el JSON marcando el error
+        logger.exception("Database error in get_users_batch")
+        yield '}, "error": "Database error"}'
+        return
+    yield "}}"
+
+
+@bp.route("/users/batch", methods=["POST"])
+def get_users_batch():
+    """Seguro: N usernames en una query parametrizada; respuesta streaming si es grande."""
+    resources = _resources()
+    settings = resources.settings
+    usernames, error = parse_usernames(request.get_json(silent=True), settings.users_batch_max)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    if len(usernames) >= settings.users_batch_stream_min:
+        return Response(
+            stream_with_context(_stream_user_batch(resources, usernames)),
+            mimetype="application/json",
+        )
+    try:
+        return jsonify({"users": dict(iter_user_batch(resources, usernames))})
+    except sqlite3.Error:
+        logger.exception("Database error in get_users_batch")
+        return jsonify({"error": "Database error"}), 500
 
 
 # ── FIX 3: Command Injection -> Sin shell, input validado ────
 # Severidad original: HIGH (CWE-78, B602)
 # Antes: subprocess.run(f"ping -c 1 {host}", shell=True, ...)
-@app.route("/ping")
+# PING_MODE: exec = fork de /bin/ping (secure_resources.run_ping) | tcp | icmp | auto
+@bp.route("/ping")
 def ping_host():
     """Seguro: sin shell=True, IP validada con regex."""
     host = request.args.get("host", "127.0.0.1")
 
-    # Validar formato de IP (solo IPv4)
-    if not re.match(r"^\d{1,3}(\.\d{1,3}){3}$", host):
-        return jsonify({"error": "Invalid IP address format"}), 400
+    error = validate_ipv4(host)
+    if error:
+        return jsonify({"error": error}), 400
 
-    # Validar rango de octetos (0-255)
-    octets = host.split(".")
-    if any(int(o) > 255 for o in octets):
-        return jsonify({"error": "Invalid IP address range"}), 400
+    from secure_ping import QueueFull
 
     try:
-        result = subprocess.run(
-            ["ping", "-c", "1", "-W", "3", host],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        return jsonify({"output": result.stdout})
-    except subprocess.TimeoutExpired:
+        future = _resources().ping_executor.submit(host)
+    except QueueFull:
+        return jsonify({"error": "Too many pings in progress"}), 429, {"Retry-After": "1"}
+
+    try:
+        return jsonify(future.result(timeout=PING_TIMEOUT + 1))
+    except TimeoutError:
+        # ProbeTimeout (cacheado o no) o el Future no termino a tiempo
         return jsonify({"error": "Ping timed out"}), 504
+    except Exception:
+        # p.ej. /bin/ping ausente en modo exec: error controlado, no un 500 con traceback
+        logger.exception("Error probing %s", host)
+        return jsonify({"error": "Probe failed"}), 502
+
+
+def _stream_ping_batch(resources, hosts):
+    """Ventana deslizante de ping_batch_fanout probes; emite NDJSON al completar."""
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    from secure_ping import QueueFull
+
+    executor = resources.ping_batch_executor
+    fanout = resources.settings.ping_batch_fanout
+    remaining = iter(hosts)
+    pending = {}
+    while True:
+        while len(pending) < fanout:
+            host = next(remaining, None)
+            if host is None:
+                break
+            try:
+                pending[executor.submit(host)] = host
+            except QueueFull:
+                yield json.dumps({"host": host, "error": "Too many pings in progress"}) + "\n"
+        if not pending:
+            return
+        done, _ = wait(pending, timeout=PING_TIMEOUT + 1, return_when=FIRST_COMPLETED)
+        if not done:
+            for host in pending.values():
+                yield json.dumps({"host": host, "error": "Ping timed out"}) + "\n"
+            return
+        for future in done:
+            yield json.dumps(probe_line(pending.pop(future), future)) + "\n"
+
+
+@bp.route("/ping/batch", methods=["POST"])
+def ping_batch():
+    """Seguro: cada IP pasa la misma validacion que /ping; fan-out acotado."""
+    resources = _resources()
+    hosts, error = parse_ping_batch(
+        request.get_json(silent=True), resources.settings.ping_batch_max_hosts,
+    )
+    if error:
+        return jsonify(error[0]), error[1]
+
+    return Response(
+        _stream_ping_batch(resources, hosts),
+        mimetype="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
 
 
 # ── FIX 4: Pickle -> JSON seguro ─────────────────────────────
 # Severidad original: Medium (CWE-502, B301)
 # Antes: pickle.loads(data) — permite ejecucion de codigo arbitrario
-@app.route("/load", methods=["POST"])
+@bp.app_errorhandler(RequestEntityTooLarge)
+def body_too_large(_error):
+    limit = current_app.config["MAX_CONTENT_LENGTH"]
+    return jsonify({"error": f"Request body too large (max {limit} bytes)"}), 413
+
+
+@bp.route("/load", methods=["POST"])
 def load_data():
     """Seguro: JSON en lugar de pickle para deserializacion."""
     try:
@@ -106,6 +246,8 @@ def load_data():
         if data is None:
             return jsonify({"error": "Invalid JSON payload"}), 400
         return jsonify({"loaded": data})
+    except RequestEntityTooLarge:
+        raise
     except Exception:
         logger.exception("Error parsing JSON in load_data")
         return jsonify({"error": "Invalid data format"}), 400
@@ -114,24 +256,37 @@ def load_data():
 # ── FIX 5: Path Traversal -> Ruta sanitizada ─────────────────
 # Severidad original: HIGH (CWE-22)
 # Antes: open(f"/app/data/{filename}") sin validacion
-@app.route("/file")
+@bp.route("/file")
 def read_file():
-    """Seguro: resuelve la ruta y verifica que este dentro del directorio base."""
-    filename = request.args.get("name", "readme.txt")
+    """Seguro: resuelve la ruta y verifica que este dentro del directorio base.
 
-    # Rechazar patrones de traversal obvios
-    if ".." in filename or filename.startswith("/"):
-        return jsonify({"error": "Invalid filename"}), 400
+    Con raw=1 el archivo se envia en streaming (sendfile) con soporte de
+    Range, ETag, If-None-Match e If-Modified-Since; sin raw=1 se mantiene la
+    respuesta JSON legada, limitada a file_json_max_bytes.
+    """
+    resources = _resources()
+    settings = resources.settings
+    filename = request.args.get("name", "readme.txt")
+    raw = request.args.get("raw", "").lower() in ("1", "true")
 
-    # Resolver la ruta completa y verificar que no escape del directorio base
-    requested_path = (BASE_DATA_DIR / filename).resolve()
-    if not str(requested_path).startswith(str(BASE_DATA_DIR)):
-        return jsonify({"error": "Access denied"}), 403
+    requested_path, error = resolve_data_path(settings.base_data_dir, filename)
+    if error:
+        return jsonify(error[0]), error[1]
 
     try:
-        with open(requested_path) as f:
-            content = f.read()
-        return jsonify({"content": content})
+        if raw:
+            return send_file(
+                requested_path,
+                mimetype="application/octet-stream",
+                conditional=True,
+                etag=True,
+                max_age=settings.file_max_age,
+            )
+        stat = requested_path.stat()
+        if stat.st_size > settings.file_json_max_bytes:
+            return jsonify({"error": "File too large for JSON mode, use raw=1"}), 413
+        # Un solo stat por request: el cache reutiliza el del limite de tamano
+        return jsonify({"content": resources.file_cache.get(requested_path, stat)})
     except FileNotFoundError:
         return jsonify({"error": "File not found"}), 404
     except OSError:
@@ -142,40 +297,57 @@ def read_file():
 # ── FIX 6: SSRF -> Allowlist de dominios ─────────────────────
 # Severidad original: Medium (CWE-918, B310)
 # Antes: urllib.request.urlopen(url) sin ninguna validacion
-@app.route("/fetch")
+@bp.route("/fetch")
 def fetch_url():
     """Seguro: solo dominios en allowlist, solo HTTP/HTTPS."""
-    import urllib.request
-
     url = request.args.get("url", "")
     if not url:
         return jsonify({"error": "URL parameter required"}), 400
 
-    # Parsear y validar la URL
-    parsed = urlparse(url)
-
-    # Solo permitir esquemas HTTP/HTTPS (bloquea file://, gopher://, etc.)
-    if parsed.scheme not in ALLOWED_SCHEMES:
-        return jsonify({"error": f"Scheme not allowed. Use: {ALLOWED_SCHEMES}"}), 400
+    error = fetch_url_error(url, ALLOWED_SCHEMES, ALLOWED_FETCH_DOMAINS)
+    if error:
+        return jsonify(error[0]), error[1]
 
-    # Solo permitir dominios en la allowlist
-    if parsed.hostname not in ALLOWED_FETCH_DOMAINS:
-        return jsonify({"error": f"Domain not allowed. Allowed: {ALLOWED_FETCH_DOMAINS}"}), 403
+    from secure_fetch import ResponseTooLarge
 
+    hostname = urlparse(url).hostname
     try:
-        response = urllib.request.urlopen(url, timeout=5)  # nosec B310 — validated via allowlist
-        content = response.read().decode("utf-8", errors="replace")
-        return jsonify({"content": content})
+        with metrics.timer(FETCH_SECONDS, (hostname,)):
+            result = _resources().fetch_client.get(url)
+    except ResponseTooLarge:
+        logger.warning("Response from %s exceeds FETCH_MAX_BYTES", hostname)
+        return jsonify({"error": "Upstream response too large"}), 502
     except Exception:
-        logger.exception("Error fetching URL %s", parsed.hostname)
+        logger.exception("Error fetching URL %s", hostname)
         return jsonify({"error": "Failed to fetch URL"}), 502
 
+    if not 200 <= result.status < 300:
+        logger.warning("Upstream %s returned HTTP %s", hostname, result.status)
+        return jsonify({"error": "Failed to fetch URL"}), 502
+    return jsonify({"content": result.body.decode("utf-8", errors="replace")})
+
+
+# ── Estadisticas internas para dimensionar pools y caches ──
+@bp.route("/stats")
+def runtime_stats():
+    """Contadores de los recursos ya creados (los lazy aparecen tras su primer uso)."""
+    stats = _resources().stats()
+    stats["json"] = current_app.json.backend
+    return jsonify(stats)
+
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    """Metricas en formato de texto Prometheus."""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+app = create_app()
+
 
 # ── FIX 7: Debug mode controlado por entorno ─────────────────
 # Severidad original: HIGH (CWE-94, B201) + Medium (CWE-605, B104)
 # Antes: app.run(host="0.0.0.0", port=5000, debug=True)
 if __name__ == "__main__":
-    debug_mode = os.environ.get("FLASK_DEBUG", "false").lower() == "true"
-    host = os.environ.get("FLASK_HOST", "127.0.0.1")
-    port = int(os.environ.get("FLASK_PORT", "5000"))
-    app.run(host=host, port=port, debug=debug_mode)
+    settings = app.extensions["app_secure"].settings
+    app.run(host=settings.host, port=settings.port, debug=settings.debug)
@@ -0,0 +1,276 @@
+# =============================================================================
+# APLICACION SEGURA (ASGI) — Las mismas 7 correcciones con rutas async
+# Bunker DevSecOps Workshop
+# =============================================================================
+# Variante de app_secure.py para servidores ASGI. Un worker atiende muchos
+# requests en vuelo: el I/O bloqueante (SQLite, lectura de archivos, HTTP
+# saliente) corre en threads via asyncio.to_thread y los pings se esperan
+# sobre los Futures del ProbeExecutor sin bloquear el event loop.
+#
+# Recursos, queries y probes son los de secure_resources.py, y la
+# validacion la de secure_validation.py: mismas metricas (/metrics), rate
+# limiting, compresion y /stats que la app WSGI.
+#
+# Ejecutar:
+#   pip install -r requirements-asgi.txt
+#   hypercorn "app_secure_asgi:create_app()" --bind 127.0.0.1:5000
+# =============================================================================
+
+import asyncio
+import json
+import logging
+import sqlite3
+from urllib.parse import urlparse
+
+from quart import Quart, Response, jsonify, request, send_file
+from secure_http import FastJSONProvider
+from secure_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from secure_metrics import RequestMetrics
+from secure_resources import (
+    ALLOWED_FETCH_DOMAINS,
+    ALLOWED_SCHEMES,
+    FETCH_SECONDS,
+    PING_TIMEOUT,
+    Resources,
+    iter_user_batch,
+    metrics,
+    probe_line,
+)
+from secure_settings import Settings
+from secure_validation import (
+    fetch_url_error,
+    parse_ping_batch,
+    parse_usernames,
+    resolve_data_path,
+    validate_ipv4,
+)
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+
+async def _await_probe(future):
+    # shield: si este request hace timeout no se cancela el probe que
+    # comparten otros requests (coalescing)
+    return await asyncio.wait_for(
+        asyncio.shield(asyncio.wrap_future(future)), PING_TIMEOUT + 1,
+    )
+
+
+def _fetch(resources, url, hostname):
+    with metrics.timer(FETCH_SECONDS, (hostname,)):
+        return resources.fetch_client.get(url)
+
+
+def create_app(settings=None):
+    """App factory ASGI: recursos propios, misma configuracion (Settings) que WSGI."""
+    settings = settings or Settings.from_env()
+    app = Quart(__name__)
+    app.json = FastJSONProvider(app)
+    resources = Resources(settings)
+    app.extensions["app_secure"] = resources
+    resources.check_indexes()
+
+    # ── FIX 1: Secrets desde variables de entorno ────────────
+    app.config["SECRET_KEY"] = settings.secret_key
+
+    # Mismo orden de hooks que app_secure.create_app
+    RequestMetrics(metrics).init_quart(app)
+    if settings.rate_limit_enabled:
+        resources.rate_limiter.init_quart(app)
+    if settings.compress_min_bytes > 0:
+        resources.compressor.init_quart(app)
+
+    # ── FIX 2: SQL Injection -> Parameterized queries ────────
+    @app.route("/user/<username>")
+    async def get_user(username):
+        """Seguro: parameterized query + cache, fuera del event loop."""
+        try:
+            return jsonify({"user": await asyncio.to_thread(resources.user_cache.get, username)})
+        except sqlite3.Error:
+            logger.exception("Database error in get_user")
+            return jsonify({"error": "Database error"}), 500
+
+    @app.route("/users/batch", methods=["POST"])
+    async def get_users_batch():
+        """Seguro: N usernames en queries parametrizadas por chunk."""
+        usernames, error = parse_usernames(
+            await request.get_json(silent=True), resources.settings.users_batch_max,
+        )
+        if error:
+            return jsonify(error[0]), error[1]
+        try:
+            users = await asyncio.to_thread(lambda: dict(iter_user_batch(resources, usernames)))
+            return jsonify({"users": users})
+        except sqlite3.Error:
+            logger.exception("Database error in get_users_batch")
+            return jsonify({"error": "Database error"}), 500
+
+    # ── FIX 3: Command Injection -> Sin shell, input validado ─
+    @app.route("/ping")
+    async def ping_host():
+        """Seguro: sin shell=True, IP validada con regex."""
+        from secure_ping import QueueFull
+
+        host = request.args.get("host", "127.0.0.1")
+        error = validate_ipv4(host)
+        if error:
+            return jsonify({"error": error}), 400
+        try:
+            future = resources.ping_executor.submit(host)
+        except QueueFull:
+            return jsonify({"error": "Too many pings in progress"}), 429, {"Retry-After": "1"}
+        try:
+            return jsonify(await _await_probe(future))
+        except TimeoutError:
+            return jsonify({"error": "Ping timed out"}), 504
+        except Exception:
+            logger.exception("Error probing %s", host)
+            return jsonify({"error": "Probe failed"}), 502
+
+    async def stream_ping_batch(hosts):
+        from secure_ping import QueueFull
+
+        executor = resources.ping_batch_executor
+        fanout = resources.settings.ping_batch_fanout
+        remaining = iter(hosts)
+        pending = {}
+        while True:
+            while len(pending) < fanout:
+                host = next(remaining, None)
+                if host is None:
+                    break
+                try:
+                    pending[asyncio.wrap_future(executor.submit(host))] = host
+                except QueueFull:
+                    yield (json.dumps({"host": host, "error": "Too many pings in progress"}) + "\n").encode()
+            if not pending:
+                return
+            done, _ = await asyncio.wait(
+                pending, timeout=PING_TIMEOUT + 1, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                for host in pending.values():
+                    yield (json.dumps({"host": host, "error": "Ping timed out"}) + "\n").encode()
+                return
+            for future in done:
+                yield (json.dumps(probe_line(pending.pop(future), future)) + "\n").encode()
+
+    @app.route("/ping/batch", methods=["POST"])
+    async def ping_batch():
+        """Seguro: cada IP pasa la misma validacion que /ping; fan-out acotado."""
+        hosts, error = parse_ping_batch(
+            await request.get_json(silent=True), resources.settings.ping_batch_max_hosts,
+        )
+        if error:
+            return jsonify(error[0]), error[1]
+        return stream_ping_batch(hosts), 200, {
+            "Content-Type": "application/x-ndjson",
+            "X-Accel-Buffering": "no",
+        }
+
+    # ── FIX 4: Pickle -> JSON seguro ─────────────────────────
+    app.config["MAX_CONTENT_LENGTH"] = settings.max_body_bytes
+
+    @app.errorhandler(RequestEntityTooLarge)
+    async def body_too_large(_error):
+        limit = app.config["MAX_CONTENT_LENGTH"]
+        return jsonify({"error": f"Request body too large (max {limit} bytes)"}), 413
+
+    @app.route("/load", methods=["POST"])
+    async def load_data():
+        """Seguro: JSON en lugar de pickle para deserializacion."""
+        try:
+            data = await request.get_json(force=False)
+            if data is None:
+                return jsonify({"error": "Invalid JSON payload"}), 400
+            return jsonify({"loaded": data})
+        except RequestEntityTooLarge:
+            raise
+        except Exception:
+            logger.exception("Error parsing JSON in load_data")
+            return jsonify({"error": "Invalid data format"}), 400
+
+    # ── FIX 5: Path Traversal -> Ruta sanitizada ─────────────
+    @app.route("/file")
+    async def read_file():
+        """Seguro: ruta resuelta dentro del directorio base; raw=1 en streaming."""
+        settings = resources.settings
+        filename = request.args.get("name", "readme.txt")
+        raw = request.args.get("raw", "").lower() in ("1", "true")
+        requested_path, error = resolve_data_path(settings.base_data_dir, filename)
+        if error:
+            return jsonify(error[0]), error[1]
+        try:
+            if raw:
+                if not requested_path.is_file():
+                    raise FileNotFoundError(requested_path)
+                response = await send_file(
+                    requested_path,
+                    mimetype="application/octet-stream",
+                    conditional=True,
+                    cache_timeout=settings.file_max_age,
+                )
+                return response
+            stat = await asyncio.to_thread(requested_path.stat)
+            if stat.st_size > settings.file_json_max_bytes:
+                return jsonify({"error": "File too large for JSON mode, use raw=1"}), 413
+            content = await asyncio.to_thread(resources.file_cache.get, requested_path, stat)
+            return jsonify({"content": content})
+        except FileNotFoundError:
+            return jsonify({"error": "File not found"}), 404
+        except OSError:
+            logger.exception("Error reading file %s", filename)
+            return jsonify({"error": "Cannot read file"}), 500
+
+    # ── FIX 6: SSRF -> Allowlist de dominios ─────────────────
+    @app.route("/fetch")
+    async def fetch_url():
+        """Seguro: solo dominios en allowlist, solo HTTP/HTTPS."""
+        from secure_fetch import ResponseTooLarge
+
+        url = request.args.get("url", "")
+        if not url:
+            return jsonify({"error": "URL parameter required"}), 400
+        error = fetch_url_error(url, ALLOWED_SCHEMES, ALLOWED_FETCH_DOMAINS)
+        if error:
+            return jsonify(error[0]), error[1]
+
+        hostname = urlparse(url).hostname
+        try:
+            result = await asyncio.to_thread(_fetch, resources, url, hostname)
+        except ResponseTooLarge:
+            logger.warning("Response from %s exceeds FETCH_MAX_BYTES", hostname)
+            return jsonify({"error": "Upstream response too large"}), 502
+        except Exception:
+            logger.exception("Error fetching URL %s", hostname)
+            return jsonify({"error": "Failed to fetch URL"}), 502
+        if not 200 <= result.status < 300:
+            logger.warning("Upstream %s returned HTTP %s", hostname, result.status)
+            return jsonify({"error": "Failed to fetch URL"}), 502
+        return jsonify({"content": result.body.decode("utf-8", errors="replace")})
+
+    @app.route("/stats")
+    async def runtime_stats():
+        """Contadores de los recursos ya creados (los lazy aparecen tras su primer uso)."""
+        stats = resources.stats()
+        stats["json"] = app.json.backend
+        return jsonify(stats)
+
+    @app.route("/metrics")
+    async def prometheus_metrics():
+        """Metricas en formato de texto Prometheus."""
+        return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+    @app.after_serving
+    async def shutdown():
+        resources.close()
+
+    return app
+
+
+# ── FIX 7: Debug mode controlado por entorno ─────────────────
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    settings = Settings.from_env()
+    create_app(settings).run(host=settings.host, port=settings.port, debug=settings.debug)
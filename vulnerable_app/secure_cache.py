@@ -0,0 +1,293 @@
+# =============================================================================
+# Caches en memoria para app_secure.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - TTLCache: LRU acotado por numero de entradas con expiracion por TTL
+#   - ReadThroughCache: consulta el origen solo en miss e invalida todo
+#     cuando cambia el "token de version" del origen (mtime, data_version...)
+#   - FileContentCache: LRU de contenido de archivos con presupuesto en bytes,
+#     validado por (inode, mtime, size) con stat() o con un poller
+# =============================================================================
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU thread-safe con TTL por entrada y contadores de hit/miss."""
+
+    def __init__(self, max_entries=1024, ttl=60.0, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries debe ser >= 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is not MISSING:
+                value, expires = item
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._data[key]
+                self._expired += 1
+            self._misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "expired": self._expired,
+                "evictions": self._evictions,
+            }
+
+
+class ReadThroughCache:
+    """Cache delante de `loader(key)` invalidado por `version()` del origen.
+
+    El token de version se recalcula como maximo cada `check_interval`
+    segundos; si cambia, se vacia el cache completo. Un valor cargado mientras
+    la version cambiaba no se guarda, para no cachear filas obsoletas.
+    Los resultados None tambien se cachean (negative caching).
+    """
+
+    def __init__(self, loader, cache, version=None, check_interval=0.0,
+                 clock=time.monotonic):
+        self.loader = loader
+        self.cache = cache
+        self._version_fn = version
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version = version() if version else None
+        self._checked_at = clock()
+        self._invalidations = 0
+
+    def _current_version(self):
+        if self._version_fn is None:
+            return None
+        now = self._clock()
+        if now - self._checked_at < self.check_interval:
+            return self._version
+        version = self._version_fn()
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                self._version = version
+                self._invalidations += 1
+                self.cache.clear()
+        return version
+
+    def get(self, key):
+        version = self._current_version()
+        value = self.cache.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        value = self.loader(key)
+        if self._version_fn is None or self._version_fn() == version:
+            self.cache.set(key, value)
+        return value
+
+    def get_many(self, keys, load_many):
+        """Version batch de get(): `load_many(faltantes)` retorna {key: valor}.
+
+        Las claves ausentes en el resultado del loader se cachean como None.
+        """
+        version = self._current_version()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.cache.get(key, MISSING)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            loaded = load_many(missing)
+            store = self._version_fn is None or self._version_fn() == version
+            for key in missing:
+                value = loaded.get(key)
+                found[key] = value
+                if store:
+                    self.cache.set(key, value)
+        return found
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats["invalidations"] = self._invalidations
+        return stats
+
+
+def _file_signature(st):
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class FileContentCache:
+    """LRU de `loader(path)` por ruta resuelta, acotado por bytes de archivo.
+
+    Cada entrada guarda la firma (inode, mtime_ns, size) del archivo y
+    cuenta st_size contra max_bytes/max_entry_bytes, asi un archivo del
+    tamano limite justo se cachea. Sin poller cada hit cuesta un os.stat(),
+    mucho mas barato que open()+read(); quien ya lo tiene lo pasa en `stat`.
+    Con poll_interval > 0 un thread daemon revalida las entradas y los hits
+    no tocan el filesystem; un cambio se detecta con hasta poll_interval
+    segundos de retraso. Archivos mayores a max_entry_bytes no se cachean.
+    """
+
+    def __init__(self, loader, max_bytes=16 * 1024 * 1024, max_entry_bytes=1024 * 1024,
+                 poll_interval=0.0):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.poll_interval = poll_interval
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._poller = None
+        self._poller_pid = None
+        self._stop = threading.Event()
+
+    def get(self, path, stat=None):
+        """Contenido de `path`; `stat` es un os.stat() reciente del llamador."""
+        path = str(path)
+        polling = self.poll_interval > 0
+        if polling:
+            self._ensure_poller()
+            signature = None if stat is None else _file_signature(stat)
+        else:
+            signature = _file_signature(stat or os.stat(path))
+        with self._lock:
+            entry = self._data.get(path)
+            if entry is not None and (polling or entry[1] == signature):
+                self._data.move_to_end(path)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+        if signature is None:
+            signature = _file_signature(os.stat(path))
+        value = self.loader(path)
+        self._store(path, value, signature)
+        return value
+
+    def _store(self, path, value, signature):
+        size = signature[2]
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(path, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[path] = (value, signature, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _path, (_value, _sig, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+
+    def revalidate(self):
+        """Descarta las entradas cuyo archivo cambio o desaparecio."""
+        with self._lock:
+            snapshot = [(path, entry[1]) for path, entry in self._data.items()]
+        stale = []
+        for path, signature in snapshot:
+            try:
+                current = _file_signature(os.stat(path))
+            except OSError:
+                current = None
+            if current != signature:
+                stale.append(path)
+        with self._lock:
+            for path in stale:
+                entry = self._data.pop(path, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+                    self._invalidations += 1
+        return len(stale)
+
+    def _ensure_poller(self):
+        # Lazy y por proceso: los threads no sobreviven a un fork de gunicorn
+        if self._poller is not None and self._poller_pid == os.getpid():
+            return
+        with self._lock:
+            if self._poller is not None and self._poller_pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            self._poller = threading.Thread(
+                target=self._poll, name="file-cache-poller", daemon=True,
+            )
+            self._poller_pid = os.getpid()
+            self._poller.start()
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self.revalidate()
+
+    def stop(self):
+        self._stop.set()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "poll_interval": self.poll_interval,
+            }
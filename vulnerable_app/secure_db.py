@@ -0,0 +1,213 @@
+# =============================================================================
+# Capa de acceso a SQLite para app_secure.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+# Pool acotado de conexiones reutilizables:
+#   - Conexiones creadas bajo demanda hasta max_size (no agota descriptores)
+#   - Modo WAL para que lecturas concurrentes no bloqueen escrituras
+#   - Cache de sentencias preparadas por conexion (cached_statements)
+#   - Estadisticas de hit/miss y tiempo de espera para dimensionar el pool
+# =============================================================================
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No se libero ninguna conexion dentro del timeout del pool."""
+
+
+class ConnectionPool:
+    """Pool LIFO de conexiones SQLite compartido por los threads del worker.
+
+    LIFO mantiene "calientes" las conexiones usadas mas recientemente (paginas
+    y sentencias ya cacheadas). Tras un fork (gunicorn --preload) el pool se
+    vacia: una conexion SQLite nunca debe cruzar procesos.
+    """
+
+    def __init__(self, database, max_size=8, timeout=5.0, cached_statements=128):
+        if max_size < 1:
+            raise ValueError("max_size debe ser >= 1")
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._size = 0
+        self._pid = os.getpid()
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error:
+            # Filesystem read-only o DB en memoria: seguimos sin WAL
+            logger.warning("No se pudo activar WAL en %s", self.database)
+        return conn
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._idle = []
+            self._size = 0
+            self._pid = os.getpid()
+            self._cond = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        """Obtiene una conexion; espera hasta `timeout` si el pool esta lleno."""
+        self._check_fork()
+        with self._cond:
+            if self._idle:
+                self._hits += 1
+                return self._idle.pop()
+            if self._size >= self.max_size:
+                return self._wait_for_idle()
+            self._size += 1
+            self._misses += 1
+        try:
+            return self._connect()
+        except sqlite3.Error:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _wait_for_idle(self):
+        # Se llama con self._cond adquirido
+        self._waits += 1
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while not self._idle:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timeouts += 1
+                raise PoolTimeout(f"Pool agotado ({self.max_size} conexiones en uso)")
+            self._cond.wait(remaining)
+        waited = time.monotonic() - start
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return self._idle.pop()
+
+    def release(self, conn, discard=False):
+        """Devuelve la conexion al pool (o la cierra si quedo inservible)."""
+        with self._cond:
+            if discard:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except sqlite3.ProgrammingError:
+            discard = True
+            raise
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close_all(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            requests = self._hits + self._misses + self._waits
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / requests, 4) if requests else 0.0,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+
+def database_version(database):
+    """Token que cambia cuando se escribe la DB (archivo principal o WAL).
+
+    Con WAL las escrituras van a <db>-wal y el archivo principal solo cambia
+    en el checkpoint, por eso se combinan ambos stat().
+    """
+    token = []
+    for path in (database, f"{database}-wal"):
+        try:
+            st = os.stat(path)
+            token.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            token.append(None)
+    return tuple(token)
+
+
+def ensure_unique_index(pool, table, column):
+    """Verifica (o crea) un indice UNIQUE sobre table(column) al arrancar.
+
+    Retorna "present", "created", "non-unique" (habia duplicados y se creo un
+    indice normal) o "unavailable" (DB/tabla inexistente o solo lectura).
+    Los identificadores no vienen del usuario: se validan como nombres simples.
+    """
+    if not (table.isidentifier() and column.isidentifier()):
+        raise ValueError("Nombre de tabla/columna invalido")
+    if pool.database != ":memory:" and not os.path.exists(pool.database):
+        logger.warning("DB %s no existe; se omite el chequeo de indices", pool.database)
+        return "unavailable"
+    index_name = f"idx_{table}_{column}"
+    try:
+        with pool.connection() as conn:
+            plain_index = False
+            for _seq, name, unique, *_rest in conn.execute(f"PRAGMA index_list({table})"):
+                cols = [row[2] for row in conn.execute(f"PRAGMA index_info({name})")]
+                if cols == [column]:
+                    if unique:
+                        return "present"
+                    plain_index = True
+            if not conn.execute(f"PRAGMA table_info({table})").fetchall():
+                logger.warning("Tabla %s no existe; se omite el indice", table)
+                return "unavailable"
+            try:
+                conn.execute(f"CREATE UNIQUE INDEX {index_name}_unique ON {table}({column})")
+                conn.commit()
+                return "created"
+            except sqlite3.IntegrityError:
+                logger.warning("Valores duplicados en %s.%s; indice no-unique", table, column)
+                if not plain_index:
+                    conn.execute(f"CREATE INDEX {index_name} ON {table}({column})")
+                    conn.commit()
+                return "non-unique"
+    except sqlite3.Error:
+        logger.exception("No se pudo verificar el indice %s", index_name)
+        return "unavailable"
@@ -0,0 +1,310 @@
+# =============================================================================
+# Cliente HTTP saliente para /fetch en app_secure.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - Pool keep-alive por (esquema, host, puerto): evita un handshake TCP+TLS
+#     por request hacia los mismos dominios de la allowlist
+#   - Lectura en streaming con limite de bytes: aborta apenas se excede
+#   - Cache HTTP (semantica de cache compartido): Cache-Control, Expires,
+#     revalidacion con ETag / Last-Modified
+#   - Redirects solo hacia URLs que pasen el mismo validador (anti-SSRF)
+# =============================================================================
+
+import http.client
+import ssl
+import threading
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlsplit
+
+from secure_cache import MISSING
+
+# headers con nombres en minuscula; cache: "miss" | "hit" | "revalidated"
+FetchResult = namedtuple("FetchResult", "status headers body cache")
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Errores tipicos al reutilizar una conexion que el servidor ya cerro
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class FetchError(Exception):
+    """Error base del cliente saliente."""
+
+
+class ResponseTooLarge(FetchError):
+    """La respuesta supera max_bytes; la lectura se aborto."""
+
+
+class RedirectNotAllowed(FetchError):
+    """El servidor redirigio a una URL fuera de la allowlist."""
+
+
+class HTTPConnectionPool:
+    """Conexiones http.client ociosas por (esquema, host, puerto)."""
+
+    def __init__(self, max_idle_per_host=4, timeout=5.0, ssl_context=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        # Cargar los certificados del sistema cuesta ~20ms: se difiere al
+        # primer request https
+        self._ssl_context = ssl_context
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    @property
+    def ssl_context(self):
+        if self._ssl_context is None:
+            context = ssl.create_default_context()
+            with self._lock:
+                if self._ssl_context is None:
+                    self._ssl_context = context
+        return self._ssl_context
+
+    def acquire(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._reused += 1
+                return idle.pop(), True
+            self._created += 1
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=self.ssl_context,
+            )
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return conn, False
+
+    def release(self, scheme, host, port, conn, reusable):
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault((scheme, host, port), [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        with self._lock:
+            self._discarded += 1
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle = {}
+        for conn in conns:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+            }
+
+
+def _cache_control(headers):
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def freshness_lifetime(headers):
+    """Segundos de frescura segun RFC 9111 para un cache compartido (0 = stale)."""
+    cc = _cache_control(headers)
+    for directive in ("s-maxage", "max-age"):
+        if directive in cc:
+            try:
+                lifetime = int(cc[directive])
+            except ValueError:
+                return 0
+            break
+    else:
+        try:
+            expires = parsedate_to_datetime(headers["expires"])
+            date = parsedate_to_datetime(headers["date"])
+            lifetime = int((expires - date).total_seconds())
+        except (KeyError, TypeError, ValueError):
+            return 0
+    try:
+        age = int(headers.get("age", "0"))
+    except ValueError:
+        age = 0
+    return max(0, lifetime - age)
+
+
+def is_storable(status, headers):
+    cc = _cache_control(headers)
+    if status != 200 or "no-store" in cc or "private" in cc:
+        return False
+    return bool(
+        freshness_lifetime(headers) or headers.get("etag") or headers.get("last-modified")
+    )
+
+
+class HTTPClient:
+    """GET con pool keep-alive, limite de tamano y cache HTTP.
+
+    `url_allowed(url)` se aplica a cada redirect; por defecto no se sigue
+    ninguno. Las entradas del cache se conservan `stale_ttl` segundos mas
+    alla de su frescura para poder revalidarlas con ETag/Last-Modified.
+    """
+
+    def __init__(self, pool=None, cache=None, max_bytes=1024 * 1024,
+                 max_cache_entry_bytes=256 * 1024, stale_ttl=300.0,
+                 url_allowed=None, max_redirects=3, clock=time.monotonic):
+        self.pool = pool or HTTPConnectionPool()
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.max_cache_entry_bytes = max_cache_entry_bytes
+        self.stale_ttl = stale_ttl
+        self.url_allowed = url_allowed or (lambda url: False)
+        self.max_redirects = max_redirects
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "cache_hits": 0,
+            "cache_revalidated": 0,
+            "cache_misses": 0,
+            "cache_stored": 0,
+            "retries": 0,
+            "too_large": 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, url):
+        for _ in range(self.max_redirects + 1):
+            result = self._get_cached(url)
+            location = result.headers.get("location")
+            if result.status not in REDIRECT_STATUSES or not location:
+                return result
+            url = urljoin(url, location)
+            if not self.url_allowed(url):
+                raise RedirectNotAllowed(url)
+        raise FetchError("Demasiados redirects")
+
+    def _get_cached(self, url):
+        entry = self.cache.get(url, MISSING) if self.cache is not None else MISSING
+        if entry is MISSING:
+            self._count("cache_misses")
+            result = self._request(url, {})
+            self._maybe_store(url, result)
+            return result
+
+        if entry["fresh_until"] > self._clock():
+            self._count("cache_hits")
+            return entry["result"]._replace(cache="hit")
+
+        conditional = {}
+        cached_headers = entry["result"].headers
+        if cached_headers.get("etag"):
+            conditional["If-None-Match"] = cached_headers["etag"]
+        if cached_headers.get("last-modified"):
+            conditional["If-Modified-Since"] = cached_headers["last-modified"]
+        result = self._request(url, conditional)
+        if result.status == 304:
+            self._count("cache_revalidated")
+            headers = {**cached_headers, **result.headers}
+            refreshed = entry["result"]._replace(headers=headers, cache="revalidated")
+            self._maybe_store(url, refreshed)
+            return refreshed
+        self._count("cache_misses")
+        self._maybe_store(url, result)
+        return result
+
+    def _maybe_store(self, url, result):
+        if self.cache is None or len(result.body) > self.max_cache_entry_bytes:
+            return
+        if not is_storable(result.status, result.headers):
+            self.cache.invalidate(url)
+            return
+        lifetime = freshness_lifetime(result.headers)
+        if "no-cache" in _cache_control(result.headers):
+            lifetime = 0
+        self.cache.set(
+            url,
+            {"result": result._replace(cache="miss"), "fresh_until": self._clock() + lifetime},
+            ttl=lifetime + self.stale_ttl,
+        )
+        self._count("cache_stored")
+
+    def _request(self, url, extra_headers):
+        self._count("requests")
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        headers = {"Connection": "keep-alive", "Accept-Encoding": "identity", **extra_headers}
+
+        for attempt in range(2):
+            conn, reused = self.pool.acquire(scheme, parts.hostname, port)
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused and attempt == 0:
+                    # GET es idempotente: un reintento con conexion nueva
+                    self._count("retries")
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            try:
+                body = self._read_body(response)
+            except Exception:
+                conn.close()
+                raise
+            self.pool.release(scheme, parts.hostname, port, conn, not response.will_close)
+            headers = {name.lower(): value for name, value in response.getheaders()}
+            return FetchResult(response.status, headers, body, "miss")
+        raise FetchError("No se pudo obtener una conexion")  # pragma: no cover
+
+    def _read_body(self, response):
+        length = response.getheader("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            self._count("too_large")
+            raise ResponseTooLarge(f"Content-Length {length} > {self.max_bytes}")
+        chunks = []
+        total = 0
+        while True:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                return b"".join(chunks)
+            total += len(chunk)
+            if total > self.max_bytes:
+                self._count("too_large")
+                raise ResponseTooLarge(f"Body > {self.max_bytes} bytes")
+            chunks.append(chunk)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["cache_hits"] + stats["cache_revalidated"] + stats["cache_misses"]
+        stats["cache_hit_ratio"] = (
+            round((stats["cache_hits"] + stats["cache_revalidated"]) / lookups, 4)
+            if lookups else 0.0
+        )
+        stats["pool"] = self.pool.stats()
+        if self.cache is not None:
+            stats["cache_entries"] = len(self.cache)
+        return stats
+
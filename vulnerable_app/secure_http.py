@@ -0,0 +1,201 @@
+# =============================================================================
+# Serializacion JSON y compresion de respuestas para app_secure.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - FastJSONProvider: usa orjson si esta instalado (pip install orjson) y
+#     cae al encoder de la stdlib si no, o si el valor no es representable
+#   - ResponseCompressor: gzip (o brotli si esta instalado) para respuestas
+#     que superan un umbral de tamano y cuyo cliente lo acepta
+# Ambos son opcionales: sin las dependencias el comportamiento es el de
+# Flask por defecto.
+# =============================================================================
+
+import gzip
+import re
+import threading
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+# orjson convierte enteros de mas de 64 bits a float al parsear; una corrida
+# de 19+ digitos manda el documento al parser de la stdlib (precision exacta)
+_BIG_INT = re.compile(rb"\d{19}")
+
+# Tipos que Flask serializa distinto que orjson: se delegan a self.default
+_ORJSON_PASSTHROUGH = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson else 0
+)
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/html",
+    "text/plain",
+    "text/css",
+})
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSONProvider de Flask/Quart con orjson como fast path.
+
+    Mantiene la salida de DefaultJSONProvider (sort_keys, compact fuera de
+    debug, fechas HTTP, dataclasses); cualquier caso que orjson no cubra
+    (kwargs de json.dumps, enteros enormes) usa la implementacion base.
+    """
+
+    @property
+    def backend(self):
+        return "orjson" if orjson else "json"
+
+    def _dumpb(self, obj, indent=False):
+        option = _ORJSON_PASSTHROUGH | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._dumpb(obj).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        data = s.encode() if isinstance(s, str) else s
+        if _BIG_INT.search(data):
+            return super().loads(s)
+        return orjson.loads(data)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = self._dumpb(obj, indent)
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+        # Bytes directo a la respuesta: sin pasar por str
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+class ResponseCompressor:
+    """Hook after_request (Flask: init_app, Quart: init_quart) que comprime
+    respuestas grandes.
+
+    Solo comprime respuestas 200 ya materializadas (no send_file ni
+    generadores: Range/sendfile y NDJSON incremental se mantienen intactos),
+    de un mimetype de texto, con al menos `min_size` bytes y sin
+    Content-Encoding previo. Prefiere brotli si el cliente lo acepta y el
+    modulo esta instalado.
+    """
+
+    def __init__(self, min_size=1024, level=6, mimetypes=COMPRESSIBLE_MIMETYPES):
+        self.min_size = min_size
+        self.level = level
+        self.mimetypes = mimetypes
+        self._lock = threading.Lock()
+        self._compressed = 0
+        self._skipped = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+        return self
+
+    def init_quart(self, app):
+        from quart import request
+        from quart.wrappers.response import DataBody
+
+        async def after(response):
+            # DataBody: cuerpo en memoria (no send_file ni generadores)
+            if not isinstance(response.response, DataBody) or not self._eligible(response):
+                return response
+            return self._encode(response, await response.get_data(), request.accept_encodings)
+
+        app.after_request(after)
+        return self
+
+    def choose_encoding(self, accept_encodings):
+        """Mejor encoding soportado segun Accept-Encoding (o None)."""
+        candidates = (("br", "gzip") if brotli else ("gzip",))
+        best = max(candidates, key=accept_encodings.quality)
+        return best if accept_encodings.quality(best) > 0 else None
+
+    def compress(self, data, encoding):
+        if encoding == "br":
+            # quality 4-5 ~ costo de gzip -6 con mejor ratio
+            return brotli.compress(data, quality=min(self.level, 11) - 1)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def _eligible(self, response):
+        return not (
+            response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in self.mimetypes
+            or (response.content_length or 0) < self.min_size
+            or "no-transform" in response.headers.get("Cache-Control", "")
+        )
+
+    def after_request(self, response):
+        from flask import request
+
+        if response.direct_passthrough or response.is_streamed or not self._eligible(response):
+            return response
+        return self._encode(response, response.get_data(), request.accept_encodings)
+
+    def _encode(self, response, data, accept_encodings):
+        # La representacion depende de Accept-Encoding aunque no se comprima
+        response.vary.add("Accept-Encoding")
+        encoding = self.choose_encoding(accept_encodings)
+        if encoding is None:
+            with self._lock:
+                self._skipped += 1
+            return response
+
+        compressed = self.compress(data, encoding)
+        if len(compressed) >= len(data):
+            with self._lock:
+                self._skipped += 1
+            return response
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if response.headers.get("ETag"):
+            # Misma entidad, otros bytes: el validador fuerte ya no aplica
+            etag, _weak = response.get_etag()
+            response.set_etag(etag, weak=True)
+        with self._lock:
+            self._compressed += 1
+            self._bytes_in += len(data)
+            self._bytes_out += len(compressed)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                "encodings": ["br", "gzip"] if brotli else ["gzip"],
+                "min_size": self.min_size,
+                "compressed": self._compressed,
+                "skipped": self._skipped,
+                "bytes_in": self._bytes_in,
+                "bytes_out": self._bytes_out,
+                "ratio": round(self._bytes_out / self._bytes_in, 4) if self._bytes_in else 0.0,
+            }
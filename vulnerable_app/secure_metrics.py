@@ -0,0 +1,234 @@
+# =============================================================================
+# Metricas de latencia para app_secure.py en formato Prometheus
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - Histogramas de latencia por ruta, contadores por status, gauge de
+#     requests en vuelo
+#   - Sub-tiempos de dependencias: SQLite, subprocess, fetch saliente
+#   - Agregacion por thread: cada thread escribe solo en su propio shard
+#     (sin locks en el camino caliente); /metrics suma los shards al leer
+#     y pasa los de threads terminados a un total base
+# =============================================================================
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Buckets por defecto del cliente oficial de Prometheus (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metrics:
+    """Registro de metricas con un shard por thread.
+
+    Las metricas se declaran con `counter`, `gauge` o `histogram` (nombre,
+    ayuda y nombres de labels) y se actualizan con `inc`, `add` y `observe`
+    pasando los valores de los labels como tupla. Los gauges se suman entre
+    shards, asi que un +1/-1 desde threads distintos sigue siendo correcto.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, clock=time.perf_counter):
+        self.buckets = tuple(buckets)
+        self._clock = clock
+        self._definitions = {}
+        self._shards = []   # [(thread, shard)] de threads que pueden seguir escribiendo
+        self._base = {}     # suma de los shards de threads terminados
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+
+    # ── Declaracion ──
+    def _define(self, kind, name, help_text, labels):
+        self._definitions[name] = (kind, help_text, tuple(labels))
+        return name
+
+    def counter(self, name, help_text, labels=()):
+        return self._define(COUNTER, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._define(GAUGE, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=()):
+        return self._define(HISTOGRAM, name, help_text, labels)
+
+    # ── Camino caliente (sin locks) ──
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Unico lock: una vez por thread. Al terminar el thread, collect()
+            # suma su shard a la base: los contadores nunca retroceden.
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    add = inc
+
+    def observe(self, name, labels, seconds):
+        shard = self._shard()
+        key = (name, labels)
+        series = shard.get(key)
+        if series is None:
+            # [bucket_0, ..., bucket_n, +Inf, sum]
+            series = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, labels=()):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, labels, self._clock() - start)
+
+    # ── Lectura ──
+    @staticmethod
+    def _merge(merged, shard):
+        # dict() de un dict es atomico bajo el GIL: snapshot consistente
+        for key, value in dict(shard).items():
+            if isinstance(value, list):
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = list(value)
+                else:
+                    merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def collect(self):
+        """Suma de todos los shards: {(nombre, labels): valor o serie}."""
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # Un thread terminado ya no escribe: su shard se suma una vez y se suelta
+                    self._merge(self._base, shard)
+            self._shards = live
+            merged = self._merge({}, self._base)
+        for _, shard in live:
+            self._merge(merged, shard)
+        return merged
+
+    def render(self):
+        """Exposicion en formato de texto Prometheus 0.0.4."""
+        merged = self.collect()
+        lines = []
+        for name, (kind, help_text, label_names) in self._definitions.items():
+            series = sorted(
+                (labels, value) for (metric, labels), value in merged.items() if metric == name
+            )
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != HISTOGRAM:
+                    lines.append(f"{name}{_format_labels(label_names, labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(
+                        f"{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(label_names, labels)} {value[-1]!r}")
+                lines.append(f"{name}_count{_format_labels(label_names, labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """Hooks de Flask (init_app) o Quart (init_quart): latencia por ruta,
+    status y requests en vuelo.
+
+    La ruta es la regla de URL (`/user/<username>`), no el path, para que
+    la cardinalidad no dependa del input. La latencia se mide hasta que la
+    vista retorna; el body de respuestas en streaming no se incluye.
+    """
+
+    def __init__(self, metrics, prefix="http"):
+        self.metrics = metrics
+        self.duration = metrics.histogram(
+            f"{prefix}_request_duration_seconds",
+            "Latencia de requests por ruta.", ("method", "route"),
+        )
+        self.requests = metrics.counter(
+            f"{prefix}_requests_total",
+            "Requests por ruta y status.", ("method", "route", "status"),
+        )
+        self.in_flight = metrics.gauge(
+            f"{prefix}_requests_in_flight",
+            "Requests en curso por ruta.", ("route",),
+        )
+
+    def init_app(self, app):
+        from flask import g, request
+
+        app.before_request(lambda: self._before(g, request))
+        app.after_request(lambda response: self._after(g, request, response))
+        app.teardown_request(lambda _exc: self._teardown(g))
+        return self
+
+    def init_quart(self, app):
+        from quart import g, request
+
+        async def before():
+            self._before(g, request)
+
+        async def after(response):
+            return self._after(g, request, response)
+
+        async def teardown(_exc):
+            self._teardown(g)
+
+        app.before_request(before)
+        app.after_request(after)
+        app.teardown_request(teardown)
+        return self
+
+    def _before(self, g, request):
+        rule = request.url_rule
+        g._metrics_start = self.metrics._clock()
+        g._metrics_route = rule.rule if rule is not None else "<unmatched>"
+        self.metrics.add(self.in_flight, (g._metrics_route,), 1)
+
+    def _after(self, g, request, response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = g._metrics_route
+            self.metrics.observe(self.duration, (request.method, route), self.metrics._clock() - start)
+            self.metrics.inc(self.requests, (request.method, route, str(response.status_code)))
+        return response
+
+    def _teardown(self, g):
+        route = g.pop("_metrics_route", None)
+        if route is not None:
+            self.metrics.add(self.in_flight, (route,), -1)
@@ -0,0 +1,236 @@
+# =============================================================================
+# Ejecucion acotada de probes de red para /ping en app_secure.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - Pool de threads fijo: como maximo max_workers procesos ping a la vez
+#   - Cola acotada: con max_pending probes en curso se rechaza (HTTP 429)
+#     en vez de dejar workers de Flask bloqueados esperando
+#   - Coalescing: requests simultaneos al mismo host comparten un solo probe
+#   - Cache de resultados con TTL corto; timeouts y hosts sin respuesta
+#     (100% de perdida) solo por negative_ttl (negative cache)
+#   - Probes nativos (TCP connect / ICMP datagram sin privilegios) que evitan
+#     el fork+exec de /bin/ping y retornan latencia/perdida estructuradas
+# =============================================================================
+
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from secure_cache import MISSING
+
+
+class QueueFull(Exception):
+    """Hay demasiados probes en curso; el cliente debe reintentar despues."""
+
+
+class ProbeTimeout(TimeoutError):
+    """El host no respondio dentro del timeout del probe."""
+
+
+def _completed(result=None, exception=None):
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+    return future
+
+
+class ProbeExecutor:
+    """Ejecuta `probe(host)` en un pool acotado, un probe en vuelo por host.
+
+    Con `cache` (un TTLCache) los resultados se reutilizan durante su TTL;
+    los ProbeTimeout y los resultados con "reachable": False (probes
+    nativos sin respuesta) solo `negative_ttl` segundos. El cache se
+    consulta antes del cupo de la cola: un hit nunca recibe 429.
+    """
+
+    def __init__(self, probe, max_workers=4, max_pending=16, cache=None,
+                 negative_ttl=0.0):
+        if max_workers < 1 or max_pending < max_workers:
+            raise ValueError("Se requiere max_workers >= 1 y max_pending >= max_workers")
+        self.probe = probe
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.cache = cache
+        self.negative_ttl = negative_ttl
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="probe")
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._submitted = 0
+        self._coalesced = 0
+        self._rejected = 0
+
+    def submit(self, host):
+        """Retorna un Future con el resultado del probe; lanza QueueFull si no hay cupo."""
+        if self.cache is not None:
+            cached = self.cache.get(host, MISSING)
+            if cached is not MISSING:
+                ok, value = cached
+                return _completed(value) if ok else _completed(exception=ProbeTimeout(value))
+        with self._lock:
+            future = self._inflight.get(host)
+            if future is not None:
+                self._coalesced += 1
+                return future
+            if len(self._inflight) >= self.max_pending:
+                self._rejected += 1
+                raise QueueFull(f"{self.max_pending} probes en curso")
+            future = self._executor.submit(self._run, host)
+            self._inflight[host] = future
+            self._submitted += 1
+            return future
+
+    def _run(self, host):
+        try:
+            result = self.probe(host)
+            if self.cache is not None:
+                if isinstance(result, dict) and result.get("reachable") is False:
+                    if self.negative_ttl > 0:
+                        self.cache.set(host, (True, result), ttl=self.negative_ttl)
+                else:
+                    self.cache.set(host, (True, result))
+            return result
+        except ProbeTimeout as exc:
+            if self.cache is not None and self.negative_ttl > 0:
+                self.cache.set(host, (False, str(exc)), ttl=self.negative_ttl)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(host, None)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "inflight": len(self._inflight),
+                "submitted": self._submitted,
+                "coalesced": self._coalesced,
+                "rejected": self._rejected,
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+
+# ── Probes nativos ───────────────────────────────────────────
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+PROBE_MODES = {"exec", "tcp", "icmp", "auto"}
+
+
+def icmp_available():
+    """True si el kernel permite sockets ICMP datagram (net.ipv4.ping_group_range)."""
+    try:
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+        return True
+    except OSError:
+        return False
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _icmp_once(sock, host, seq, timeout):
+    payload = b"tribu-lab-probe"
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, 0, seq)
+    packet = struct.pack(
+        "!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + payload), 0, seq,
+    ) + payload
+    start = time.perf_counter()
+    sock.sendto(packet, (host, 0))
+    deadline = start + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        sock.settimeout(remaining)
+        try:
+            data, addr = sock.recvfrom(1024)
+        except TimeoutError:
+            return None
+        # En sockets datagram el kernel entrega el ICMP sin cabecera IP y
+        # reescribe el identifier con el puerto local del socket
+        if len(data) >= 8 and addr[0] == host:
+            icmp_type, _code, _csum, _ident, reply_seq = struct.unpack("!BBHHH", data[:8])
+            if icmp_type == ICMP_ECHO_REPLY and reply_seq == seq:
+                return (time.perf_counter() - start) * 1000
+
+
+def _tcp_once(host, port, timeout):
+    start = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    except ConnectionRefusedError:
+        pass  # RST: el host respondio aunque el puerto este cerrado
+    except OSError:
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+def _summary(host, method, rtts, error=None):
+    received = [r for r in rtts if r is not None]
+    result = {
+        "host": host,
+        "method": method,
+        "sent": len(rtts),
+        "received": len(received),
+        "loss_pct": round(100.0 * (len(rtts) - len(received)) / len(rtts), 1),
+        "reachable": bool(received),
+        "rtt_ms": None,
+    }
+    if received:
+        result["rtt_ms"] = {
+            "min": round(min(received), 3),
+            "avg": round(sum(received) / len(received), 3),
+            "max": round(max(received), 3),
+        }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def icmp_probe(host, count=1, timeout=3.0):
+    """Echo ICMP sin privilegios; lanza PermissionError si el kernel no lo permite.
+
+    Si el kernel rechaza el envio (broadcast, sin ruta) el host se reporta
+    como no alcanzable con el error en "error".
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP) as sock:
+        try:
+            rtts = [_icmp_once(sock, host, seq, timeout) for seq in range(1, count + 1)]
+        except OSError as exc:
+            return _summary(host, "icmp", [None] * count, error=exc.strerror or str(exc))
+    return _summary(host, "icmp", rtts)
+
+
+def tcp_probe(host, port=80, count=1, timeout=3.0):
+    """Alcanzabilidad via TCP connect: SYN-ACK o RST cuentan como respuesta."""
+    rtts = [_tcp_once(host, port, timeout) for _ in range(count)]
+    result = _summary(host, "tcp", rtts)
+    result["port"] = port
+    return result
+
+
+def make_native_probe(mode, count=1, timeout=3.0, tcp_port=80):
+    """Construye probe(host) para PING_MODE tcp | icmp | auto (icmp si se puede)."""
+    if mode not in PROBE_MODES - {"exec"}:
+        raise ValueError(f"Modo de probe invalido: {mode}")
+    if mode == "auto":
+        mode = "icmp" if icmp_available() else "tcp"
+    if mode == "icmp":
+        return lambda host: icmp_probe(host, count=count, timeout=timeout)
+    return lambda host: tcp_probe(host, port=tcp_port, count=count, timeout=timeout)
@@ -0,0 +1,365 @@
+# =============================================================================
+# Rate limiting y admision de requests para app_secure.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - Token bucket por (ruta, cliente): un cliente ruidoso recibe 429
+#   - Token bucket por ruta (todos los clientes): protege la CPU -> 503
+#   - Limite de requests en vuelo por ruta (load shedding) -> 503
+#   - Backend en memoria (por worker) o SQLite compartido entre workers
+# Todas las respuestas de rechazo llevan Retry-After. Los dos buckets se
+# verifican antes de consumir: un request rechazado no gasta tokens.
+# =============================================================================
+
+import collections
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Rutas caras de app_secure / app_secure_asgi -> costo en tokens por request
+EXPENSIVE_ROUTES = {
+    "/ping": 1,
+    "/ping/batch": 5,   # un barrido equivale a varios pings
+    "/fetch": 1,
+    "/file": 1,
+}
+
+
+def _refill(state, rate, burst, cost, now):
+    """Aplica el token bucket: retorna (tokens restantes, segundos a esperar)."""
+    tokens, updated = state if state is not None else (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+def _take_all(states, buckets, cost, now):
+    """Token bucket sobre varios buckets a la vez: todos admiten o ninguno consume.
+
+    `states` son los (tokens, updated) actuales (None si no existe) y
+    `buckets` los (key, rate, burst). Retorna (esperas por bucket, tokens a
+    guardar por bucket); si algun bucket rechaza, los tokens quedan solo
+    recargados.
+    """
+    results = [_refill(state, rate, burst, cost, now) for state, (_, rate, burst) in zip(states, buckets)]
+    waits = [wait for _, wait in results]
+    if any(waits):
+        # Sin consumir: se devuelve `cost` a los buckets que si admitian
+        return waits, [tokens + (cost if not wait else 0) for tokens, wait in results]
+    return waits, [tokens for tokens, _ in results]
+
+
+class MemoryBucketStore:
+    """Buckets en un dict del proceso: ~1us por take, no compartido entre workers.
+
+    El dict esta en orden de uso (LRU): cada take mueve sus buckets al final
+    y los del principio se descartan cuando ya se recargaron por completo
+    (inactivos mas de burst/rate de ese bucket) o cuando hay mas de
+    `max_keys`. O(1) amortizado: cada bucket se descarta una sola vez.
+    """
+
+    def __init__(self, max_keys=10000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = collections.OrderedDict()   # key -> (tokens, updated, rate, burst)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1.0):
+        """Consume `cost` tokens; retorna 0.0 si se admite o los segundos a esperar."""
+        return self.take_all([(key, rate, burst)], cost)[0]
+
+    def take_all(self, buckets, cost=1.0):
+        """Consume `cost` de cada (key, rate, burst) solo si todos admiten.
+
+        Retorna la espera de cada bucket: todas 0.0 si se admite.
+        """
+        now = self.clock()
+        with self._lock:
+            states = [self._buckets.get(key) for key, _, _ in buckets]
+            waits, tokens = _take_all([s and s[:2] for s in states], buckets, cost, now)
+            for (key, rate, burst), left in zip(buckets, tokens):
+                self._buckets[key] = (left, now, rate, burst)
+                self._buckets.move_to_end(key)
+            self._evict(now)
+        return waits
+
+    def _evict(self, now):
+        while self._buckets:
+            key, (_, updated, rate, burst) = next(iter(self._buckets.items()))
+            # Un bucket inactivo mas de burst/rate ya esta lleno: equivale a no tenerlo
+            if len(self._buckets) <= self.max_keys and now - updated <= burst / rate:
+                return
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Buckets en un archivo SQLite: el mismo limite para todos los workers.
+
+    Cada take es una transaccion BEGIN IMMEDIATE (~20-50us en disco local;
+    usar /dev/shm para evitar I/O). Usa time.time() porque el reloj debe
+    ser comun a todos los procesos.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path, timeout=0.5, max_idle=3600.0, clock=time.time):
+        self.path = str(path)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.clock = clock
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # El estado de los buckets no es critico: sin fsync por take
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.takes = 0
+        return conn
+
+    def take(self, key, rate, burst, cost=1.0):
+        return self.take_all([(key, rate, burst)], cost)[0]
+
+    def take_all(self, buckets, cost=1.0):
+        """Igual que MemoryBucketStore.take_all, en una sola transaccion."""
+        conn = self._connection()
+        now = self.clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            states = [
+                conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                for key, _, _ in buckets
+            ]
+            waits, tokens = _take_all(states, buckets, cost, now)
+            conn.executemany(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                [(key, left, now) for (key, _, _), left in zip(buckets, tokens)],
+            )
+            self._local.takes += 1
+            if self._local.takes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.max_idle,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return waits
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+    """Admision por ruta: bucket por cliente, bucket global y tope en vuelo.
+
+    `routes` mapea la regla de URL (p.ej. "/ping") al costo en tokens de un
+    request; las rutas que no estan en el dict no se limitan. Si el backend
+    falla (DB bloqueada, disco lleno) el request se admite: el limitador no
+    debe tumbar la app.
+    """
+
+    def __init__(self, store, routes, client_rate=5.0, client_burst=20,
+                 route_rate=50.0, route_burst=100, max_inflight=32):
+        self.store = store
+        self.routes = dict(routes)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.max_inflight = max_inflight
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "allowed": 0,
+            "limited_client": 0,
+            "limited_route": 0,
+            "shed_inflight": 0,
+            "store_errors": 0,
+        }
+
+    @classmethod
+    def from_settings(cls, settings, routes=EXPENSIVE_ROUTES):
+        """Limitador configurado con los campos rate_limit_* de Settings."""
+        if settings.rate_limit_backend == "sqlite":
+            store = SQLiteBucketStore(settings.rate_limit_db)
+        else:
+            store = MemoryBucketStore()
+        return cls(
+            store,
+            routes,
+            client_rate=settings.rate_limit_client_rate,
+            client_burst=settings.rate_limit_client_burst,
+            route_rate=settings.rate_limit_route_rate,
+            route_burst=settings.rate_limit_route_burst,
+            max_inflight=settings.rate_limit_max_inflight,
+        )
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _rejection(status, wait):
+        error = "Rate limit exceeded" if status == 429 else "Server busy, retry later"
+        return {"error": error}, status, {"Retry-After": str(max(1, math.ceil(wait)))}
+
+    def admit(self, route, client):
+        """None si se admite (y se reserva un slot en vuelo) o (payload, status, headers)."""
+        cost = self.routes.get(route)
+        if cost is None:
+            return None
+
+        with self._lock:
+            inflight = self._inflight.get(route, 0)
+            if inflight >= self.max_inflight:
+                self._counters["shed_inflight"] += 1
+                return self._rejection(503, 1)
+            self._inflight[route] = inflight + 1
+
+        try:
+            client_wait, route_wait = self.store.take_all([
+                (f"c|{route}|{client}", self.client_rate, self.client_burst),
+                (f"r|{route}", self.route_rate, self.route_burst),
+            ], cost)
+            if client_wait:
+                self._count("limited_client")
+                self.release(route)
+                return self._rejection(429, client_wait)
+            if route_wait:
+                self._count("limited_route")
+                self.release(route)
+                return self._rejection(503, route_wait)
+        except sqlite3.Error:
+            logger.exception("Rate limit store error; admitting request")
+            self._count("store_errors")
+        self._count("allowed")
+        return None
+
+    def release(self, route):
+        with self._lock:
+            self._inflight[route] -= 1
+
+    def init_app(self, app):
+        """Hooks de Flask: admite en before_request y libera al cerrar la respuesta.
+
+        teardown_request corre antes de que termine un cuerpo en streaming
+        (/ping/batch): el slot en vuelo se libera con call_on_close, cuando
+        el servidor termino de enviar la respuesta. teardown solo libera si
+        no hubo respuesta.
+        """
+        from flask import g, jsonify, request
+
+        def before():
+            rule = request.url_rule
+            if rule is None or rule.rule not in self.routes:
+                return None
+            # remote_addr: detras de un proxy usar ProxyFix para que sea el cliente
+            rejection = self.admit(rule.rule, request.remote_addr or "-")
+            if rejection is not None:
+                payload, status, headers = rejection
+                return jsonify(payload), status, headers
+            g._rate_limited_route = rule.rule
+            return None
+
+        def after(response):
+            route = g.pop("_rate_limited_route", None)
+            if route is not None:
+                response.call_on_close(lambda: self.release(route))
+            return response
+
+        def teardown(_exc):
+            route = g.pop("_rate_limited_route", None)
+            if route is not None:
+                self.release(route)
+
+        app.before_request(before)
+        app.after_request(after)
+        app.teardown_request(teardown)
+        return self
+
+    def init_quart(self, app):
+        """Hooks de Quart, con la misma semantica que init_app.
+
+        Quart envia el cuerpo despues de cerrar el contexto del request: el
+        slot se libera al salir del cuerpo de la respuesta (_ReleasingBody).
+        """
+        from quart import g, jsonify, request
+
+        async def before():
+            rule = request.url_rule
+            if rule is None or rule.rule not in self.routes:
+                return None
+            rejection = self.admit(rule.rule, request.remote_addr or "-")
+            if rejection is not None:
+                payload, status, headers = rejection
+                return jsonify(payload), status, headers
+            g._rate_limited_route = rule.rule
+            return None
+
+        async def after(response):
+            route = g.pop("_rate_limited_route", None)
+            if route is not None:
+                response.response = _ReleasingBody(response.response, lambda: self.release(route))
+            return response
+
+        async def teardown(_exc):
+            route = g.pop("_rate_limited_route", None)
+            if route is not None:
+                self.release(route)
+
+        app.before_request(before)
+        app.after_request(after)
+        app.teardown_request(teardown)
+        return self
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["inflight"] = {route: n for route, n in self._inflight.items() if n}
+        stats["backend"] = type(self.store).__name__
+        return stats
+
+
+class _ReleasingBody:
+    """Cuerpo de respuesta Quart que llama `release` (una vez) al terminar de enviarse."""
+
+    def __init__(self, body, release):
+        self._body = body
+        self._release = release
+        self._entered = None
+
+    def _release_once(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    async def __aenter__(self):
+        try:
+            self._entered = await self._body.__aenter__()
+        except BaseException:
+            self._release_once()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self._body.__aexit__(exc_type, exc, tb)
+        finally:
+            self._release_once()
+
+    def __aiter__(self):
+        return self._entered.__aiter__()
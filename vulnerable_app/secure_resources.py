@@ -0,0 +1,280 @@
+# =============================================================================
+# Recursos y helpers comunes de app_secure.py (WSGI) y app_secure_asgi.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+#   - Resources: pools, caches, executors, compresor y limitador de una app,
+#     creados en su primer uso
+#   - Queries parametrizadas (FIX 2), probe con /bin/ping (FIX 3) y lectura
+#     de archivos (FIX 5), con sus sub-tiempos en las metricas
+#   - Registro de metricas del proceso, expuesto en /metrics por ambas apps
+# No depende de Flask ni de Quart: cada app solo agrega sus rutas y hooks.
+# =============================================================================
+
+import json
+import logging
+import threading
+from typing import ClassVar
+
+from secure_cache import FileContentCache, ReadThroughCache, TTLCache
+from secure_db import ConnectionPool, database_version, ensure_unique_index
+from secure_http import ResponseCompressor
+from secure_metrics import Metrics
+from secure_ratelimit import RateLimiter
+from secure_validation import fetch_url_error
+
+logger = logging.getLogger(__name__)
+
+# Metricas por ruta + sub-tiempos de dependencias, expuestas en /metrics
+metrics = Metrics()
+SQLITE_SECONDS = metrics.histogram(
+    "app_sqlite_query_seconds", "Tiempo de queries SQLite.", ("query",))
+SUBPROCESS_SECONDS = metrics.histogram(
+    "app_subprocess_seconds", "Tiempo de procesos externos.", ("command",))
+FETCH_SECONDS = metrics.histogram(
+    "app_upstream_fetch_seconds", "Tiempo de fetch saliente por host.", ("host",))
+
+# Dominios permitidos para fetch (FIX 6)
+ALLOWED_FETCH_DOMAINS = {"api.github.com", "httpbin.org"}
+ALLOWED_SCHEMES = {"http", "https"}
+
+PING_TIMEOUT = 5
+
+
+# ── FIX 2: SQL Injection -> Parameterized queries ────────────
+# Severidad original: Medium (CWE-89, B608)
+# Antes: f"SELECT * FROM users WHERE username = '{username}'"
+def fetch_user_row(db_pool, username):
+    """Seguro: parameterized query previene SQL injection."""
+    with db_pool.connection() as conn, metrics.timer(SQLITE_SECONDS, ("user_by_name",)):
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM users WHERE username = ?",
+            (username,),
+        )
+        return cursor.fetchone()
+
+
+def fetch_user_rows(db_pool, usernames):
+    """Seguro: la lista viaja como UN solo parametro JSON, sin armar SQL dinamico."""
+    with db_pool.connection() as conn, metrics.timer(SQLITE_SECONDS, ("users_batch",)):
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM users WHERE username IN (SELECT value FROM json_each(?))",
+            (json.dumps(usernames),),
+        )
+        column = [d[0] for d in cursor.description].index("username")
+        return {row[column]: row for row in cursor.fetchall()}
+
+
+def iter_user_batch(resources, usernames):
+    """Resuelve los usernames por chunks (una query por chunk) en orden."""
+    chunk_size = resources.settings.users_batch_chunk
+    pool = resources.db_pool
+    for i in range(0, len(usernames), chunk_size):
+        chunk = usernames[i:i + chunk_size]
+        rows = resources.user_cache.get_many(chunk, lambda keys: fetch_user_rows(pool, keys))
+        for username in chunk:
+            yield username, rows[username]
+
+
+# ── FIX 3: Command Injection -> Sin shell, input validado ────
+# Severidad original: HIGH (CWE-78, B602)
+# Antes: subprocess.run(f"ping -c 1 {host}", shell=True, ...)
+# PING_MODE: exec = fork de /bin/ping (salida cruda) | tcp | icmp | auto
+def run_ping(host):
+    """Seguro: argumentos como lista, sin shell. Solo recibe IPs ya validadas."""
+    import subprocess
+
+    from secure_ping import ProbeTimeout
+
+    try:
+        with metrics.timer(SUBPROCESS_SECONDS, ("ping",)):
+            result = subprocess.run(
+                ["ping", "-c", "1", "-W", "3", host],
+                capture_output=True,
+                text=True,
+                timeout=PING_TIMEOUT,
+                check=False,
+            )
+    except subprocess.TimeoutExpired as exc:
+        raise ProbeTimeout("Ping timed out") from exc
+    return {"output": result.stdout}
+
+
+def probe_line(host, future):
+    """Linea NDJSON de /ping/batch para un Future ya terminado."""
+    try:
+        return {"host": host, **future.result()}
+    except TimeoutError:
+        return {"host": host, "error": "Ping timed out"}
+    except Exception:
+        logger.exception("Error probing %s", host)
+        return {"host": host, "error": "Probe failed"}
+
+
+# ── FIX 5: Path Traversal -> Ruta sanitizada ─────────────────
+def read_text(path):
+    with open(path) as f:
+        return f.read()
+
+
+class _lazy:
+    """Como functools.cached_property, pero con lock: un solo build por app.
+
+    Despues del primer acceso el valor queda en el __dict__ de la instancia
+    y el descriptor ya no participa (lectura sin costo extra).
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.name = build.__name__
+        self.__doc__ = build.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        with obj._lock:
+            if self.name not in obj.__dict__:
+                obj.__dict__[self.name] = self.build(obj)
+        return obj.__dict__[self.name]
+
+
+class Resources:
+    """Pools, caches y executors de una app, creados en su primer uso."""
+
+    # recurso lazy -> clave en /stats
+    LAZY: ClassVar[dict[str, str]] = {
+        "db_pool": "db_pool",
+        "user_cache": "user_cache",
+        "ping_executor": "ping",
+        "ping_batch_executor": "ping_batch",
+        "file_cache": "file_cache",
+        "fetch_client": "fetch",
+    }
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._lock = threading.RLock()
+        self.compressor = ResponseCompressor(
+            min_size=settings.compress_min_bytes,
+            level=settings.compress_level,
+        )
+        # Rate limiting de /ping, /ping/batch, /fetch y /file (EXPENSIVE_ROUTES)
+        self.rate_limiter = RateLimiter.from_settings(settings)
+
+    def built(self):
+        """Recursos ya creados, en el orden de LAZY."""
+        return {name: self.__dict__[name] for name in self.LAZY if name in self.__dict__}
+
+    def stats(self):
+        """Contadores para /stats (los lazy aparecen tras su primer uso)."""
+        stats = {self.LAZY[name]: resource.stats() for name, resource in self.built().items()}
+        stats["compression"] = self.compressor.stats()
+        stats["rate_limit"] = self.rate_limiter.stats()
+        return stats
+
+    # ── FIX 2 ──
+    @_lazy
+    def db_pool(self):
+        """Pool SQLite (las conexiones se abren en su primer uso)."""
+        return ConnectionPool(
+            self.settings.users_db_path,
+            max_size=self.settings.db_pool_size,
+            timeout=self.settings.db_pool_timeout,
+        )
+
+    def check_indexes(self):
+        """Chequeo del indice UNIQUE de users.username, una vez al crear la app."""
+        return ensure_unique_index(self.db_pool, "users", "username")
+
+    @_lazy
+    def user_cache(self):
+        """Cache read-through username -> fila, invalidado al cambiar users.db."""
+        pool = self.db_pool
+        return ReadThroughCache(
+            lambda username: fetch_user_row(pool, username),
+            TTLCache(max_entries=self.settings.user_cache_size, ttl=self.settings.user_cache_ttl),
+            version=lambda: database_version(pool.database),
+        )
+
+    # ── FIX 3 ──
+    @_lazy
+    def _ping(self):
+        from secure_ping import make_native_probe
+
+        settings = self.settings
+        probe = run_ping if settings.ping_mode == "exec" else make_native_probe(
+            settings.ping_mode,
+            count=settings.ping_count,
+            # Todos los intentos deben caber dentro de PING_TIMEOUT
+            timeout=min(3.0, PING_TIMEOUT / settings.ping_count),
+            tcp_port=settings.ping_tcp_port,
+        )
+        cache = TTLCache(max_entries=settings.ping_cache_size, ttl=settings.ping_cache_ttl)
+        return probe, cache
+
+    @_lazy
+    def ping_executor(self):
+        """Pool acotado de pings: coalescing + cache de resultados."""
+        from secure_ping import ProbeExecutor
+
+        probe, cache = self._ping
+        return ProbeExecutor(
+            probe,
+            max_workers=self.settings.ping_workers,
+            max_pending=self.settings.ping_max_pending,
+            cache=cache,
+            negative_ttl=self.settings.ping_negative_ttl,
+        )
+
+    @_lazy
+    def ping_batch_executor(self):
+        """Barridos /ping/batch: pool propio (fan-out) que comparte el cache de /ping."""
+        from secure_ping import ProbeExecutor
+
+        probe, cache = self._ping
+        fanout = self.settings.ping_batch_fanout
+        return ProbeExecutor(
+            probe,
+            max_workers=fanout,
+            max_pending=fanout * 4,
+            cache=cache,
+            negative_ttl=self.settings.ping_negative_ttl,
+        )
+
+    # ── FIX 5 ──
+    @_lazy
+    def file_cache(self):
+        """Cache LRU de archivos calientes (modo JSON), validado por inode/mtime/size."""
+        return FileContentCache(
+            read_text,
+            max_bytes=self.settings.file_cache_bytes,
+            max_entry_bytes=self.settings.file_cache_max_entry,
+            poll_interval=self.settings.file_cache_poll,
+        )
+
+    # ── FIX 6 ──
+    @_lazy
+    def fetch_client(self):
+        """Cliente saliente con keep-alive, limite de tamano y cache HTTP."""
+        from secure_fetch import HTTPClient, HTTPConnectionPool
+
+        return HTTPClient(
+            HTTPConnectionPool(max_idle_per_host=self.settings.fetch_pool_idle, timeout=5.0),
+            cache=TTLCache(max_entries=self.settings.fetch_cache_size, ttl=0),
+            max_bytes=self.settings.fetch_max_bytes,
+            # Los redirects solo se siguen si el destino pasa la misma validacion
+            url_allowed=lambda url: fetch_url_error(url, ALLOWED_SCHEMES, ALLOWED_FETCH_DOMAINS) is None,
+        )
+
+    def close(self):
+        built = self.built()
+        for name in ("ping_executor", "ping_batch_executor"):
+            if name in built:
+                built[name].shutdown(wait=False)
+        if "file_cache" in built:
+            built["file_cache"].stop()
+        if "fetch_client" in built:
+            built["fetch_client"].pool.close_all()
+        if "db_pool" in built:
+            built["db_pool"].close_all()
@@ -0,0 +1,121 @@
+# =============================================================================
+# Configuracion de app_secure.py / app_secure_asgi.py
+# Bunker DevSecOps Workshop
+# =============================================================================
+# Las variables de entorno se leen UNA vez (Settings.from_env) a un objeto
+# inmutable: los workers no vuelven a parsear el entorno y los tests crean
+# apps con Settings(...) o dataclasses.replace() sin tocar os.environ.
+# Todas las variables estan documentadas en .env.example.
+# =============================================================================
+
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+MIB = 1024 * 1024
+
+# Variable de entorno de cada campo (el resto: nombre del campo en mayusculas)
+_ENV_NAMES = {
+    "debug": "FLASK_DEBUG",
+    "host": "FLASK_HOST",
+    "port": "FLASK_PORT",
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    # ── FIX 1: Secrets desde variables de entorno ──
+    secret_key: str = "change-me-in-production"
+    database_password: str | None = None
+    api_key: str | None = None
+
+    # ── FIX 2: usuarios ──
+    users_db_path: str = "users.db"
+    db_pool_size: int = 8
+    db_pool_timeout: float = 5.0
+    user_cache_size: int = 1024
+    user_cache_ttl: float = 30.0
+    users_batch_max: int = 1000
+    users_batch_chunk: int = 200
+    users_batch_stream_min: int = 200
+
+    # ── FIX 3: ping ──
+    ping_mode: str = "exec"
+    ping_count: int = 1
+    ping_tcp_port: int = 80
+    ping_workers: int = 4
+    ping_max_pending: int = 16
+    ping_cache_size: int = 256
+    ping_cache_ttl: float = 5.0
+    ping_negative_ttl: float = 2.0
+    ping_batch_max_hosts: int = 256
+    ping_batch_fanout: int = 64
+
+    # ── FIX 4: body de /load y resto de requests ──
+    max_body_bytes: int = MIB
+    compress_min_bytes: int = 1024
+    compress_level: int = 6
+
+    # ── FIX 5: archivos ──
+    base_data_dir: Path = Path("/app/data")
+    file_json_max_bytes: int = MIB
+    file_max_age: int = 60
+    file_cache_bytes: int = 16 * MIB
+    file_cache_max_entry: int | None = None   # None: file_json_max_bytes
+    file_cache_poll: float = 0.0
+
+    # ── FIX 6: fetch ──
+    fetch_max_bytes: int = MIB
+    fetch_cache_size: int = 64
+    fetch_pool_idle: int = 4
+
+    # ── Rate limiting (/ping, /ping/batch, /fetch, /file), opt-in ──
+    rate_limit_enabled: bool = False
+    rate_limit_backend: str = "memory"     # memory | sqlite
+    rate_limit_db: str = "ratelimit.db"
+    rate_limit_client_rate: float = 5.0    # tokens/s por cliente y ruta
+    rate_limit_client_burst: int = 20
+    rate_limit_route_rate: float = 50.0    # tokens/s por ruta (todos los clientes)
+    rate_limit_route_burst: int = 100
+    rate_limit_max_inflight: int = 32      # por ruta y worker
+
+    # ── FIX 7: servidor de desarrollo ──
+    debug: bool = False
+    host: str = "127.0.0.1"
+    port: int = 5000
+
+    def __post_init__(self):
+        from secure_ping import PROBE_MODES
+
+        # Un PING_MODE invalido falla al crear la app, no en el primer /ping
+        if self.ping_mode not in PROBE_MODES:
+            raise ValueError(f"PING_MODE invalido: {self.ping_mode!r} (opciones: {sorted(PROBE_MODES)})")
+        # Los token buckets dividen por el rate (refill y desalojo)
+        for name in ("rate_limit_client_rate", "rate_limit_client_burst",
+                     "rate_limit_route_rate", "rate_limit_route_burst"):
+            if getattr(self, name) <= 0:
+                raise ValueError(f"{name.upper()} debe ser > 0")
+        # frozen: normalizar via object.__setattr__
+        object.__setattr__(self, "base_data_dir", Path(self.base_data_dir).resolve())
+        if self.file_cache_max_entry is None:
+            object.__setattr__(self, "file_cache_max_entry", self.file_json_max_bytes)
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Settings desde el entorno; las variables ausentes usan el default."""
+        environ = os.environ if environ is None else environ
+        values = {}
+        for field in fields(cls):
+            raw = environ.get(_ENV_NAMES.get(field.name, field.name.upper()))
+            if raw is None:
+                continue
+            kind = type(field.default) if field.default is not None else str
+            if field.name == "file_cache_max_entry":
+                kind = int
+            if kind is bool:
+                values[field.name] = raw.lower() == "true"
+            elif kind in (int, float):
+                values[field.name] = kind(raw)
+            else:
+                values[field.name] = raw
+        return cls(**values)
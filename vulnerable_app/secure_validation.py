@@ -0,0 +1,103 @@
+# =============================================================================
+# Validacion de input compartida por app_secure.py (WSGI) y
+# app_secure_asgi.py (ASGI)
+# Bunker DevSecOps Workshop
+# =============================================================================
+# Funciones puras, sin dependencia de Flask/Quart: retornan el valor
+# validado o un error (payload, status) listo para serializar como JSON.
+# =============================================================================
+
+import ipaddress
+import re
+from urllib.parse import urlparse
+
+# Compilada una vez al importar; fullmatch + ASCII: sin "\n" final ni
+# digitos Unicode que int() aceptaria
+_IPV4_RE = re.compile(r"\d{1,3}(?:\.\d{1,3}){3}", re.ASCII)
+
+
+# ── FIX 2: usernames para el lookup batch ────────────────────
+def parse_usernames(data, max_batch):
+    """Retorna (usernames sin duplicados, None) o (None, (payload, status))."""
+    usernames = data.get("usernames") if isinstance(data, dict) else None
+    if not isinstance(usernames, list) or not all(isinstance(u, str) for u in usernames):
+        return None, ({"error": 'Body must be {"usernames": [str, ...]}'}, 400)
+    if len(usernames) > max_batch:
+        return None, ({"error": f"Batch too large (max {max_batch})"}, 413)
+    return list(dict.fromkeys(usernames)), None
+
+
+# ── FIX 3: Command Injection -> solo IPv4 validas ────────────
+def validate_ipv4(host):
+    """Retorna el mensaje de error, o None si host es una IPv4 valida."""
+    # Validar formato de IP (solo IPv4)
+    if not _IPV4_RE.fullmatch(host):
+        return "Invalid IP address format"
+
+    # Validar rango de octetos (0-255)
+    octets = host.split(".")
+    if any(int(o) > 255 for o in octets):
+        return "Invalid IP address range"
+    return None
+
+
+def parse_ping_batch(data, max_hosts):
+    """Retorna (hosts, None) o (None, (payload, status)) para /ping/batch.
+
+    Acepta {"hosts": [...]} o {"cidr": "a.b.c.d/n"}; cada IP pasa por
+    validate_ipv4, igual que en /ping.
+    """
+    usage = {"error": 'Body must be {"hosts": [...]} or {"cidr": "a.b.c.d/n"}'}
+    if not isinstance(data, dict):
+        return None, (usage, 400)
+
+    if "cidr" in data:
+        try:
+            network = ipaddress.IPv4Network(str(data["cidr"]), strict=False)
+        except ValueError:
+            return None, ({"error": "Invalid CIDR"}, 400)
+        if network.num_addresses > max_hosts:
+            return None, ({"error": f"Too many hosts (max {max_hosts})"}, 413)
+        hosts = [str(ip) for ip in network.hosts()]
+    else:
+        hosts = data.get("hosts")
+        if not isinstance(hosts, list) or not all(isinstance(h, str) for h in hosts):
+            return None, (usage, 400)
+        hosts = list(dict.fromkeys(hosts))
+        if len(hosts) > max_hosts:
+            return None, ({"error": f"Too many hosts (max {max_hosts})"}, 413)
+
+    for host in hosts:
+        error = validate_ipv4(host)
+        if error:
+            return None, ({"error": error, "host": host}, 400)
+    return hosts, None
+
+
+# ── FIX 5: Path Traversal -> ruta dentro del directorio base ─
+def resolve_data_path(base_dir, filename):
+    """Retorna (ruta resuelta, None) o (None, (payload, status))."""
+    # Rechazar patrones de traversal obvios
+    if ".." in filename or filename.startswith("/"):
+        return None, ({"error": "Invalid filename"}, 400)
+
+    # Resolver la ruta completa y verificar que no escape del directorio base
+    requested_path = (base_dir / filename).resolve()
+    if not str(requested_path).startswith(str(base_dir)):
+        return None, ({"error": "Access denied"}, 403)
+    return requested_path, None
+
+
+# ── FIX 6: SSRF -> Allowlist de dominios ─────────────────────
+def fetch_url_error(url, allowed_schemes, allowed_domains):
+    """Retorna (payload, status) si la URL no esta permitida, o None."""
+    parsed = urlparse(url)
+
+    # Solo permitir esquemas HTTP/HTTPS (bloquea file://, gopher://, etc.)
+    if parsed.scheme not in allowed_schemes:
+        return {"error": f"Scheme not allowed. Use: {allowed_schemes}"}, 400
+
+    # Solo permitir dominios en la allowlist
+    if parsed.hostname not in allowed_domains:
+        return {"error": f"Domain not allowed. Allowed: {allowed_domains}"}, 403
+    return None